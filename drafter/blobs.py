@@ -0,0 +1,260 @@
+"""
+A content-addressed store for the binary values in the state (e.g., images and bytes).
+
+Without it, every snapshot of the state would carry its own encoded copy of every image, which quickly
+adds up to megabytes of JSON in the history and in restorable state. Instead, each binary value is stored
+once, under a key derived from its content, and the state's JSON only holds a short reference to that key.
+Small values are not worth a reference, so they are kept inline in the JSON (as base64) instead; that way,
+the state stays self-contained whenever it can be.
+
+Every stored blob is written through to a folder on disk, and recently used blobs are also kept in memory.
+Unless the server's ``blob_folder`` is set, that folder is a temporary one that is removed when the server
+stops. So a restore link (e.g., in the debug information's page load history) whose state refers to a large
+blob only keeps working until the server restarts; set ``blob_folder`` to keep the blobs between runs.
+Either way, once the folder holds more than ``BLOB_DISK_LIMIT`` bytes, the blobs that were used least
+recently are deleted from it, so very old restore links can stop working too.
+"""
+import atexit
+import base64
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional, Set
+
+from drafter.constants import BLOB_REFERENCE_SYMBOL
+from drafter.image_support import image_fingerprint, encode_png
+
+# How many bytes of blobs are kept in memory; the others are read back from disk when they are needed
+BLOB_MEMORY_LIMIT = 64 * 2 ** 20
+# How many bytes of blobs are kept on disk; past that, the least recently used blobs are deleted
+BLOB_DISK_LIMIT = 2 ** 30
+# Values up to this many bytes are kept inline in the state's JSON, instead of in the blob store
+BLOB_INLINE_LIMIT = 2 ** 12
+# Marks a reference that holds its (base64 encoded) data itself
+INLINE_BLOB_PREFIX = "base64,"
+
+
+class BlobStore:
+    """
+    Keeps blobs of bytes in a folder on disk, along with the most recently used ones in memory
+    (until their total size passes the memory limit). Blobs are never changed, so a blob that is
+    no longer in memory is simply read back from its file. When the folder grows past the disk limit,
+    the files that were used least recently (and are not in memory) are deleted.
+
+    :param memory_limit: The most bytes to keep in memory at once.
+    :type memory_limit: int
+    :param folder: The folder that blobs are written to. If None, a temporary folder is created when
+        the first blob is stored, and removed when the program exits.
+    :type folder: Optional[str]
+    :param disk_limit: The most bytes to keep in the folder.
+    :type disk_limit: int
+    """
+
+    def __init__(self, memory_limit: int = BLOB_MEMORY_LIMIT, folder: Optional[str] = None,
+                 disk_limit: int = BLOB_DISK_LIMIT):
+        self.memory_limit = memory_limit
+        self.folder = folder
+        self.disk_limit = disk_limit
+        self.memory_size = 0
+        # Only an estimate of the folder's size, which is corrected whenever the folder is pruned
+        self.disk_size = 0
+        self._blobs: "OrderedDict[str, bytes]" = OrderedDict()
+        # Blobs that could not be written to disk, which therefore have to stay in memory
+        self._unwritten: Set[str] = set()
+        self._lock = Lock()
+
+    def put(self, key: str, data: bytes) -> str:
+        """
+        Stores the data under the given key, unless it is already stored.
+
+        :param key: The key of the data, which must be derived from its content.
+        :param data: The data to store.
+        :return: The key, for convenience.
+        """
+        with self._lock:
+            if key in self._blobs:
+                self._blobs.move_to_end(key)
+                return key
+            if not self._write(key, data):
+                # The disk is not available, so this blob can only be kept in memory
+                self._unwritten.add(key)
+            self._blobs[key] = data
+            self.memory_size += len(data)
+            while self.memory_size > self.memory_limit and len(self._blobs) > 1:
+                oldest = next(iter(self._blobs))
+                if oldest in self._unwritten:
+                    break
+                self.memory_size -= len(self._blobs.pop(oldest))
+            if self.disk_size > self.disk_limit:
+                self._prune()
+        return key
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Gets the data stored under the given key, from memory or from disk.
+
+        :param key: The key of the data.
+        :return: The data, or None if nothing was stored under that key.
+        """
+        with self._lock:
+            data = self._blobs.get(key)
+            if data is not None:
+                self._blobs.move_to_end(key)
+                return data
+        try:
+            path = self._path(key)
+            with open(path, 'rb') as blob_file:
+                data = blob_file.read()
+            # Marks the blob as recently used, so that it is not pruned
+            os.utime(path)
+            return data
+        except (OSError, ValueError):
+            return None
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._blobs:
+                return True
+        return _is_valid_key(key) and os.path.exists(self._path(key))
+
+    def use_folder(self, folder: str):
+        """
+        Changes the folder that blobs are written to, copying over the blobs already written to the old one.
+        The new folder may still hold blobs from earlier runs, so it is pruned to the disk limit right away.
+
+        :param folder: The new folder; it is created if needed.
+        """
+        with self._lock:
+            previous, self.folder = self.folder, folder
+            os.makedirs(folder, exist_ok=True)
+            # The previous folder may never have been created, if nothing was written to it
+            if (previous is not None and os.path.isdir(previous)
+                    and os.path.abspath(previous) != os.path.abspath(folder)):
+                for name in os.listdir(previous):
+                    if _is_valid_key(name) and not os.path.exists(os.path.join(folder, name)):
+                        shutil.copyfile(os.path.join(previous, name), os.path.join(folder, name))
+            self._prune()
+
+    def _path(self, key: str) -> str:
+        if not _is_valid_key(key):
+            raise ValueError(f"Invalid blob key {key!r}")
+        if self.folder is None:
+            self.folder = tempfile.mkdtemp(prefix='drafter_blobs_')
+            atexit.register(shutil.rmtree, self.folder, True)
+        return os.path.join(self.folder, key)
+
+    def _write(self, key: str, data: bytes) -> bool:
+        try:
+            path = self._path(key)
+            if os.path.exists(path):
+                return True
+            os.makedirs(self.folder, exist_ok=True)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, 'wb') as blob_file:
+                blob_file.write(data)
+            os.replace(temporary, path)
+            self.disk_size += len(data)
+            return True
+        except OSError:
+            return False
+
+    def _prune(self):
+        # Must be called while holding the lock. Prunes down to three quarters of the limit,
+        # so that the folder does not have to be listed again on the very next write.
+        try:
+            names = [name for name in os.listdir(self.folder) if _is_valid_key(name)]
+        except (OSError, TypeError):
+            return
+        files = []
+        for name in names:
+            try:
+                stats = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            files.append((stats.st_mtime, name, stats.st_size))
+        self.disk_size = sum(size for _, _, size in files)
+        if self.disk_size <= self.disk_limit:
+            return
+        for _, name, size in sorted(files):
+            if self.disk_size <= self.disk_limit * 3 // 4:
+                break
+            if name in self._blobs:
+                continue
+            try:
+                os.remove(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            self.disk_size -= size
+
+    def __repr__(self):
+        return f"BlobStore(blobs={len(self._blobs)}, memory_size={self.memory_size}, folder={self.folder!r})"
+
+
+def _is_valid_key(key: str) -> bool:
+    # Keys end up in file names, so only allow the characters that they are made of
+    return bool(key) and all(character.isalnum() or character == '-' for character in key)
+
+
+BLOBS = BlobStore()
+
+
+def store_blob(data: bytes) -> str:
+    """
+    Stores some bytes in the blob store, returning the reference to put in the state's JSON instead.
+    Small values are kept in the reference itself.
+    """
+    if len(data) <= BLOB_INLINE_LIMIT:
+        return make_inline_reference(data)
+    key = "bin-" + hashlib.sha256(data).hexdigest()
+    BLOBS.put(key, bytes(data))
+    return BLOB_REFERENCE_SYMBOL + key
+
+
+def store_image_blob(image) -> str:
+    """
+    Stores a PIL image (as a PNG) in the blob store, returning the reference to put in the state's JSON instead.
+    The key is based on the image's pixels, so an image that is already stored is not encoded again.
+    Small images are kept in the reference itself.
+    """
+    key = "png-" + image_fingerprint(image)
+    if key not in BLOBS:
+        data = encode_png(image)
+        if len(data) <= BLOB_INLINE_LIMIT:
+            return make_inline_reference(data)
+        BLOBS.put(key, data)
+    return BLOB_REFERENCE_SYMBOL + key
+
+
+def make_inline_reference(data: bytes) -> str:
+    return BLOB_REFERENCE_SYMBOL + INLINE_BLOB_PREFIX + base64.b64encode(data).decode('ascii')
+
+
+def is_blob_reference(value) -> bool:
+    return isinstance(value, str) and value.startswith(BLOB_REFERENCE_SYMBOL)
+
+
+def _missing_blob(reference: str) -> ValueError:
+    return ValueError(f"Error while restoring state: The stored data {reference!r} is no longer available. "
+                      f"Unless the blob_folder setting is used, large images and bytes in a restored state "
+                      f"are only kept until the server stops.")
+
+
+def load_blob(reference: str) -> bytes:
+    """
+    Gets the bytes that a reference (made by ``store_blob`` or ``store_image_blob``) refers to.
+
+    :param reference: The reference, as it appears in the state's JSON.
+    :return: The stored bytes.
+    :raises ValueError: If the blob is no longer stored (e.g., the server restarted without a ``blob_folder``).
+    """
+    key = reference[len(BLOB_REFERENCE_SYMBOL):]
+    if key.startswith(INLINE_BLOB_PREFIX):
+        return base64.b64decode(key[len(INLINE_BLOB_PREFIX):])
+    data = BLOBS.get(key)
+    if data is None:
+        raise _missing_blob(reference)
+    return data
+
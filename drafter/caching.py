@@ -0,0 +1,205 @@
+"""
+Small caching utilities shared by the server and the components.
+
+Everything in here is deliberately simple: the caches are in-memory, bounded, and safe to use
+from multiple threads. They are meant to avoid repeating expensive work between requests,
+not to be a general purpose caching layer.
+"""
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Hashable, Optional
+
+_MISSING = object()
+
+# Caches that were given a name, so that their statistics can be shown in the debug information
+NAMED_CACHES: Dict[str, "BoundedCache"] = {}
+
+
+class BoundedCache:
+    """
+    A thread-safe, least-recently-used cache that holds at most ``maxsize`` entries.
+    When a new entry would exceed that limit, the entry that was used least recently is evicted.
+
+    The number of hits and misses is tracked, which is useful for checking whether a cache
+    is actually helping.
+
+    :param maxsize: The maximum number of entries to keep in the cache.
+    :type maxsize: int
+    :param name: If given, the cache's statistics will be shown in the debug information under this name.
+    :type name: Optional[str]
+    :param ttl: If given, entries expire this many seconds after they were stored.
+    :type ttl: Optional[float]
+    :param maxbytes: If given, the values (which must support ``len``, like ``bytes``) can take up at most
+        this many bytes in total, although the most recently stored entry is always kept.
+    :type maxbytes: Optional[int]
+    """
+
+    def __init__(self, maxsize: int = 128, name: Optional[str] = None, ttl: Optional[float] = None,
+                 maxbytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.name = name
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.total_bytes = 0
+        self._sizes: Dict[Hashable, int] = {}
+        self._expires: Dict[Hashable, float] = {}
+        if name is not None:
+            NAMED_CACHES[name] = self
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Looks up the given key, marking it as recently used if it is found.
+
+        :param key: The key to look up.
+        :param default: The value to return if the key is not in the cache.
+        :return: The cached value, or the default if the key was missing.
+        """
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is not _MISSING and self._expired(key):
+                value = _MISSING
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> Any:
+        """
+        Stores the value under the given key, evicting the oldest entries if the cache is full.
+
+        :param key: The key to store the value under.
+        :param value: The value to store.
+        :return: The value that was stored, for convenience.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            if self.ttl is not None:
+                self._expires[key] = monotonic() + self.ttl
+            if self.maxbytes is not None:
+                self.total_bytes += len(value) - self._sizes.get(key, 0)
+                self._sizes[key] = len(value)
+            while len(self._entries) > self.maxsize or (
+                    self.maxbytes is not None and self.total_bytes > self.maxbytes and len(self._entries) > 1):
+                self._remove(next(iter(self._entries)))
+        return value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Removes the given key from the cache, returning its value (or the default if it was missing or expired).
+        This counts as a hit or a miss, just like ``get``.
+        """
+        with self._lock:
+            if key not in self._entries or self._expired(key):
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._remove(key)
+
+    def clear(self):
+        """
+        Removes every entry from the cache and resets the hit and miss counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._expires.clear()
+            self._sizes.clear()
+            self.total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def _expired(self, key: Hashable) -> bool:
+        # Must be called while holding the lock; expired entries are removed as they are found
+        if key not in self._expires or self._expires[key] > monotonic():
+            return False
+        self._remove(key)
+        return True
+
+    def _remove(self, key: Hashable) -> Any:
+        # Must be called while holding the lock, with a key that is in the cache
+        self._expires.pop(key, None)
+        self.total_bytes -= self._sizes.pop(key, 0)
+        return self._entries.pop(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries and not self._expired(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self):
+        return f"BoundedCache(size={len(self)}, maxsize={self.maxsize}, hits={self.hits}, misses={self.misses})"
+
+
+class GenerationalCache:
+    """
+    A cache that only remembers the entries used during the current and the previous generation.
+    Call ``advance`` after each unit of work (e.g., rendering a page); any entry that was not used
+    during the last generation is then forgotten, so the cache never grows past the size of
+    two generations' worth of entries.
+
+    This suits caching parts of a page between renders: pieces that appear again are reused,
+    and pieces that have disappeared do not linger.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._previous: Dict[Hashable, Any] = {}
+        self._current: Dict[Hashable, Any] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Looks up the given key in the current or previous generation. Entries found in the
+        previous generation are carried over into the current one.
+
+        :param key: The key to look up.
+        :param default: The value to return if the key is not in the cache.
+        :return: The cached value, or the default if the key was missing.
+        """
+        value = self._current.get(key, _MISSING)
+        if value is _MISSING:
+            value = self._previous.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._current[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> Any:
+        """
+        Stores the value under the given key in the current generation.
+
+        :return: The value that was stored, for convenience.
+        """
+        self._current[key] = value
+        return value
+
+    def advance(self):
+        """
+        Starts a new generation, forgetting every entry that was not used in the one that just ended.
+        """
+        self._previous, self._current = self._current, {}
+
+    def clear(self):
+        """
+        Removes every entry from the cache and resets the hit and miss counters.
+        """
+        self._previous, self._current = {}, {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._current.keys() | self._previous.keys())
+
+    def __repr__(self):
+        return f"GenerationalCache(size={len(self)}, hits={self.hits}, misses={self.misses})"
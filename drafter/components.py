@@ -1,15 +1,23 @@
 from dataclasses import dataclass, is_dataclass, fields
-from typing import Any, Union, Optional, List, Dict, Tuple
+from functools import lru_cache
+from typing import Any, Union, Optional, List, Dict, Tuple, Sequence, Callable, Hashable
 import io
 import base64
-# from urllib.parse import quote_plus
+import hashlib
+from urllib.parse import quote
 import json
 import html
 
-from drafter.constants import LABEL_SEPARATOR, SUBMIT_BUTTON_KEY, JSON_DECODE_SYMBOL
-from drafter.urls import remap_attr_styles, friendly_urls, check_invalid_external_url, merge_url_query_params
-from drafter.image_support import HAS_PILLOW, PILImage
-from drafter.history import safe_repr
+from drafter.constants import LABEL_SEPARATOR, SUBMIT_BUTTON_KEY, JSON_DECODE_SYMBOL, ARGUMENT_TOKEN_KEY
+from drafter.urls import remap_attr_styles, friendly_urls, check_invalid_external_url, merge_url_query_params, \
+    make_submit_url
+from drafter.image_support import HAS_PILLOW, PILImage, store_generated_image, encode_png, RESPONSIVE_WIDTHS, \
+    GENERATED_IMAGE_ROUTE, GENERATED_IMAGES, PENDING_IMAGES, has_generated_image
+from drafter.downloads import DOWNLOAD_ROUTE, register_download, is_pil_image
+from drafter.plotting import PLOT_RENDERS, fingerprint_figure, render_figure, render_figure_in_pool
+from drafter.history import safe_repr, dehydrate_json, store_argument_token
+from drafter.caching import BoundedCache
+from drafter.search import get_option_index
 
 try:
     import matplotlib.pyplot as plt
@@ -59,6 +67,25 @@ def validate_parameter_name(name: str, component_type: str):
         raise ValueError(base_error + f" The name `{name}` is not a valid Python identifier name.")
 
 
+class _FrozenSettings(dict):
+    """
+    A dictionary that cannot be modified, used as the shared ``extra_settings`` of every component
+    that was not given any extra settings (which is most of them). Sharing one instance saves
+    a dictionary per component; ``update_style`` and ``update_attr`` swap in a real dictionary first.
+    """
+    __slots__ = ()
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("The extra settings of this component cannot be modified directly. "
+                        "Use update_style or update_attr instead.")
+
+    __setitem__ = __delitem__ = _read_only  # type: ignore
+    clear = pop = popitem = setdefault = update = _read_only  # type: ignore
+
+
+EMPTY_SETTINGS: dict = _FrozenSettings()
+
+
 class PageContent:
     """
     Base class for all content that can be added to a page.
@@ -72,8 +99,14 @@ class PageContent:
     Ultimately, the ``PageContent`` object is converted to a string when it is rendered.
 
     This class also has some helpful methods for verifying URLs and handling attributes/styles.
+
+    Components use ``__slots__`` to keep their memory footprint small, since pages can have
+    many thousands of them; subclasses should list any new attributes in their own ``__slots__``.
     """
+    __slots__ = ()
     EXTRA_ATTRS: List[str] = []
+    # Settings that every instance starts with; the instance's own extra settings take precedence
+    DEFAULT_SETTINGS: Dict[str, Any] = EMPTY_SETTINGS
     extra_settings: dict
 
     def verify(self, server) -> bool:
@@ -89,6 +122,38 @@ class PageContent:
         """
         return True
 
+    def children(self) -> "Sequence[Any]":
+        """
+        Provides the content nested inside of this component, so that it can be verified along with the rest
+        of the page. Components that do not contain other content have no children.
+
+        :return: The nested strings and components, if any.
+        """
+        return ()
+
+    def render_key(self) -> Optional[Hashable]:
+        """
+        Describes this component in a way that is cheap to compare, so that its rendered HTML can be
+        reused when an identical component appears on the next render of the same page.
+        By default, this is the component's type along with the values of all of its attributes.
+
+        Components whose HTML depends on anything besides their attributes (e.g., a global plot)
+        should return ``None``, which means that they will always be rendered again.
+
+        :return: A hashable key, or ``None`` if this component should not be cached.
+        """
+        if hasattr(self, '__dict__'):
+            # Attributes outside of the slots could be anything, so be conservative
+            return None
+        parts: List[Hashable] = [type(self)]
+        for name in _slot_names(type(self)):
+            value = getattr(self, name, _UNSET_SLOT)
+            part = _UNSET_SLOT if value is _UNSET_SLOT else structural_key(value)
+            if part is None:
+                return None
+            parts.append(part)
+        return tuple(parts)
+
     def parse_extra_settings(self, **kwargs):
         """
         Parses and combines extra settings into valid attribute and style formats.
@@ -106,8 +171,9 @@ class PageContent:
             if any styles are provided.
         :rtype: str
         """
-        extra_settings = self.extra_settings.copy()
-        extra_settings.update(kwargs)
+        if not kwargs and not self.extra_settings and not self.DEFAULT_SETTINGS:
+            return ""
+        extra_settings = {**self.DEFAULT_SETTINGS, **self.extra_settings, **kwargs}
         raw_styles, raw_attrs = remap_attr_styles(extra_settings)
         styles, attrs = [], []
         for key, value in raw_attrs.items():
@@ -135,6 +201,8 @@ class PageContent:
         :return: Returns the instance of the object after updating the style
         :rtype: self
         """
+        if self.extra_settings is EMPTY_SETTINGS:
+            self.extra_settings = {}
         self.extra_settings[f"style_{style}"] = value
         return self
 
@@ -154,6 +222,8 @@ class PageContent:
         :return: The instance of the object after the update.
         :rtype: Self
         """
+        if self.extra_settings is EMPTY_SETTINGS:
+            self.extra_settings = {}
         self.extra_settings[attr] = value
         return self
 
@@ -174,6 +244,89 @@ class PageContent:
 
 Content = Union[PageContent, str]
 
+
+def render_chunk(chunk: Content, current_state, configuration) -> str:
+    """
+    Renders a single piece of page content to HTML. Strings are wrapped in paragraph tags, while
+    components are rendered with the current state and configuration (if available).
+
+    :param chunk: The string or component to render.
+    :param current_state: The current state of the server.
+    :param configuration: The configuration of the server, or ``None`` if it is not available.
+    :return: The HTML representation of the content.
+    """
+    if isinstance(chunk, str):
+        return f"<p>{chunk}</p>"
+    if configuration is None:
+        return str(chunk)
+    return chunk.render(current_state, configuration)
+
+
+_SIMPLE_VALUE_TYPES = (int, float, bool, bytes, type(None))
+_UNSET_SLOT = ("<unset>",)
+
+
+@lru_cache(maxsize=None)
+def _slot_names(component_type: type) -> Tuple[str, ...]:
+    names = []
+    for klass in reversed(component_type.__mro__):
+        slots = klass.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        names.extend(name for name in slots if name not in names)
+    return tuple(names)
+
+
+def structural_key(value: Any) -> Optional[Hashable]:
+    """
+    Builds a cheap, hashable description of a piece of content that is equal for any two pieces of
+    content that will render to the same HTML. Components are described by their type and the values
+    of their attributes (including their extra settings), recursively.
+
+    Some content cannot be described this way, such as PIL images, plots, or components whose
+    attributes are not all known (e.g., custom components without ``__slots__``); for these,
+    ``None`` is returned, and the content should always be rendered again.
+
+    :param value: The string, component, or attribute value to describe.
+    :return: A hashable key, or ``None`` if the value cannot be cached safely.
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, _SIMPLE_VALUE_TYPES):
+        return type(value), value
+    if isinstance(value, PageContent):
+        return value.render_key()
+    if isinstance(value, (list, tuple)):
+        parts = []
+        for item in value:
+            part = structural_key(item)
+            if part is None:
+                return None
+            parts.append(part)
+        return type(value), tuple(parts)
+    if isinstance(value, dict):
+        parts = []
+        for name, item in value.items():
+            part = structural_key(item)
+            if part is None:
+                return None
+            parts.append((name, part))
+        return dict, tuple(parts)
+    return None
+
+def uses_generated_image_route(image, configuration) -> bool:
+    """
+    Determines whether a PIL image should be served from the server's image route, rather than
+    being embedded directly in the page as a (much larger) data URL.
+
+    :param image: The image, or any other value (e.g., a URL), in which case the answer is no.
+    :param configuration: The configuration of the server.
+    :return: Whether to link to the image on the server.
+    """
+    return (HAS_PILLOW and isinstance(image, PILImage.Image)
+            and configuration.serve_generated_images and not configuration.skulpt)
+
+
 def make_safe_json_argument(value):
     """
     Converts the given value to a JSON-compatible string and escapes special
@@ -231,6 +384,7 @@ class LinkContent:
     :ivar text: The display text of the link.
     :type text: str
     """
+    __slots__ = ()
     url: str
     text: str
 
@@ -243,13 +397,11 @@ class LinkContent:
         return url, external
 
     def verify(self, server) -> bool:
-        if self.url not in server._handle_route:
-            invalid_external_url_reason = check_invalid_external_url(self.url)
-            if invalid_external_url_reason == "is a valid external url":
-                return True
-            elif invalid_external_url_reason:
-                raise ValueError(f"Link `{self.url}` is not a valid external url.\n{invalid_external_url_reason}.")
+        problem = server.check_url(self.url)
+        if problem is None:
             raise ValueError(f"Link `{self.text}` points to non-existent page `{self.url}`.")
+        elif problem:
+            raise ValueError(f"Link `{self.url}` is not a valid external url.\n{problem}.")
         return True
 
 
@@ -261,6 +413,34 @@ class LinkContent:
                              for name, value in parameters.items())
         return ""
 
+    def make_url(self, token: Optional[str] = None) -> str:
+        """
+        Creates the URL that this button or link submits to, including its text (so that the server knows
+        which one was pressed) and the token of its arguments, if any.
+
+        :param token: The token of the arguments, if they are stored on the server.
+        :return: The complete URL.
+        """
+        if token is not None:
+            return merge_url_query_params(self.url, {SUBMIT_BUTTON_KEY: self.text, ARGUMENT_TOKEN_KEY: token})
+        try:
+            return make_submit_url(self.url, self.text)
+        except TypeError:
+            # The text was not hashable, so it cannot be cached
+            return merge_url_query_params(self.url, {SUBMIT_BUTTON_KEY: self.text})
+
+    def create_argument_token(self, arguments) -> str:
+        """
+        Stores the arguments on the server instead of in hidden inputs, so that only a short token
+        has to be sent along with the button or link.
+
+        :param arguments: The arguments of the button or link.
+        :return: The token that refers to the arguments.
+        """
+        parameters = {name.split(LABEL_SEPARATOR, 1)[-1]: value
+                      for name, value in self.parse_arguments(arguments, "").items()}
+        return store_argument_token(parameters)
+
     def parse_arguments(self, arguments, label_namespace):
         if arguments is None:
             return {}
@@ -284,6 +464,7 @@ class LinkContent:
 
 @dataclass
 class Argument(PageContent):
+    __slots__ = ('name', 'value', 'extra_settings')
     name: str
     value: Any
 
@@ -293,7 +474,7 @@ class Argument(PageContent):
         if not isinstance(value, (str, int, float, bool)):
             raise ValueError(f"Argument values must be strings, integers, floats, or booleans. Found {type(value)}")
         self.value = value
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
     def __str__(self) -> str:
         value = make_safe_json_argument(self.value)
@@ -302,32 +483,54 @@ class Argument(PageContent):
 
 @dataclass
 class Link(PageContent, LinkContent):
+    __slots__ = ('text', 'url', 'external', 'arguments', 'extra_settings')
+    # PageContent.verify would otherwise take precedence over the URL check
+    verify = LinkContent.verify
     text: str
     url: str
 
     def __init__(self, text: str, url: str, arguments=None, **kwargs):
         self.text = text
         self.url, self.external = self._handle_url(url)
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
         self.arguments = arguments
 
+    def render(self, current_state, configuration):
+        if configuration.argument_tokens and self.arguments:
+            token = self.create_argument_token(self.arguments)
+            return self._render_html("", token)
+        return str(self)
+
+    def _render_html(self, precode, token=None) -> str:
+        url = self.make_url(token)
+        return f"{precode}<a href='{url}' {self.parse_extra_settings()}>{self.text}</a>"
+
     def __str__(self) -> str:
         precode = self.create_arguments(self.arguments, self.text)
-        url = merge_url_query_params(self.url, {SUBMIT_BUTTON_KEY: self.text})
-        return f"{precode}<a href='{url}' {self.parse_extra_settings()}>{self.text}</a>"
+        return self._render_html(precode)
 
 
 @dataclass
 class Button(PageContent, LinkContent):
+    """
+    A button that submits the page's form to the given route.
+
+    When the server's ``scoped_forms`` option is enabled, the button is rendered with the names of
+    the parameters that the target route accepts; then only those fields are sent when this button
+    is pressed, rather than every field on the page.
+    """
+    __slots__ = ('text', 'url', 'arguments', 'external', 'extra_settings')
+    # PageContent.verify would otherwise take precedence over the URL check
+    verify = LinkContent.verify
     text: str
     url: str
     arguments: List[Argument]
-    external: bool = False
+    external: bool
 
     def __init__(self, text: str, url: str, arguments=None, **kwargs):
         self.text = text
         self.url, self.external = self._handle_url(url)
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
         self.arguments = arguments
 
     def __repr__(self):
@@ -335,13 +538,27 @@ class Button(PageContent, LinkContent):
             return f"Button(text={self.text!r}, url={self.url!r}, arguments={self.arguments!r})"
         return f"Button(text={self.text!r}, url={self.url!r})"
 
-    def __str__(self) -> str:
-        precode = self.create_arguments(self.arguments, self.text)
-        url = merge_url_query_params(self.url, {SUBMIT_BUTTON_KEY: self.text})
+    def render(self, current_state, configuration):
+        fields = None
+        if configuration.scoped_forms and not self.external:
+            fields = configuration.route_fields.get(friendly_urls(self.url.split('?', 1)[0]))
+        if configuration.argument_tokens and self.arguments:
+            token = self.create_argument_token(self.arguments)
+            return self._render_html("", token, fields)
+        return self._render_html(self.create_arguments(self.arguments, self.text), fields=fields)
+
+    def _render_html(self, precode, token=None, fields=None) -> str:
+        url = self.make_url(token)
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
+        if fields is not None:
+            parsed_settings += f" data-btlw-fields='{html.escape(' '.join(fields), True)}'"
         value = make_safe_argument(self.text)
         return f"{precode}<button type='submit' name='{SUBMIT_BUTTON_KEY}' value='{value}' formaction='{url}' {parsed_settings}>{self.text}</button>"
 
+    def __str__(self) -> str:
+        precode = self.create_arguments(self.arguments, self.text)
+        return self._render_html(precode)
+
 
 SubmitButton = Button
 
@@ -351,6 +568,7 @@ BASE_IMAGE_FOLDER = "/__images"
 
 @dataclass
 class Image(PageContent, LinkContent):
+    __slots__ = ('url', 'width', 'height', 'base_image_folder', 'extra_settings')
     url: str
     width: int
     height: int
@@ -359,7 +577,7 @@ class Image(PageContent, LinkContent):
         self.url = url
         self.width = width
         self.height = height
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
         self.base_image_folder = BASE_IMAGE_FOLDER
 
     def open(self, *args, **kwargs):
@@ -374,33 +592,62 @@ class Image(PageContent, LinkContent):
 
     def render(self, current_state, configuration):
         self.base_image_folder = configuration.deploy_image_path
+        if uses_generated_image_route(self.url, configuration):
+            return self._render_image(store_generated_image(self.url))
+        if configuration.responsive_images and not configuration.skulpt and isinstance(self.url, str):
+            url, external = self._handle_url(self.url)
+            if not external:
+                return self._render_image(*self._make_responsive(self.base_image_folder + url))
         return super().render(current_state, configuration)
 
+    def _make_responsive(self, url: str) -> Tuple[str, str]:
+        """
+        Points the image at smaller WebP copies of the file, which the server creates on demand.
+        With a fixed width, copies are offered for normal and high density screens; otherwise,
+        the browser picks from a few standard widths.
+        """
+        def variant(width):
+            params = {'w': width, 'format': 'webp'}
+            if isinstance(self.height, int) and isinstance(self.width, int):
+                params['h'] = self.height * width // self.width
+            return merge_url_query_params(url, params)
+
+        if isinstance(self.width, int):
+            source = variant(self.width)
+            srcset = f"srcset='{source} 1x, {variant(self.width * 2)} 2x'"
+        else:
+            source = url
+            candidates = ", ".join(f"{variant(width)} {width}w" for width in RESPONSIVE_WIDTHS)
+            srcset = f"srcset='{candidates}' sizes='100vw'"
+        return source, f"{srcset} loading='lazy'"
+
     def _handle_pil_image(self, image):
         if not HAS_PILLOW or isinstance(image, str):
             return False, image
 
-        image_data = io.BytesIO()
-        image.save(image_data, format="PNG")
-        image_data.seek(0)
-        figure = base64.b64encode(image_data.getvalue()).decode('utf-8')
+        figure = base64.b64encode(encode_png(image)).decode('utf-8')
         figure = f"data:image/png;base64,{figure}"
         return True, figure
 
-    def __str__(self) -> str:
+    def _render_image(self, url: str, extra_attributes: str = "") -> str:
         extra_settings = {}
         if self.width is not None:
             extra_settings['width'] = self.width
         if self.height is not None:
             extra_settings['height'] = self.height
+        parsed_settings = self.parse_extra_settings(**extra_settings)
+        if extra_attributes:
+            parsed_settings = f"{extra_attributes} {parsed_settings}"
+        return f"<img src='{url}' {parsed_settings}>"
+
+    def __str__(self) -> str:
         was_pil, url = self._handle_pil_image(self.url)
         if was_pil:
-            return f"<img src='{url}' {self.parse_extra_settings(**extra_settings)}>"
+            return self._render_image(url)
         url, external = self._handle_url(self.url)
         if not external:
             url = self.base_image_folder + url
-        parsed_settings = self.parse_extra_settings(**extra_settings)
-        return f"<img src='{url}' {parsed_settings}>"
+        return self._render_image(url)
 
 
 Picture = Image
@@ -408,6 +655,7 @@ Picture = Image
 
 @dataclass
 class TextBox(PageContent):
+    __slots__ = ('name', 'kind', 'default_value', 'extra_settings')
     name: str
     kind: str
     default_value: Optional[str]
@@ -417,7 +665,7 @@ class TextBox(PageContent):
         self.name = name
         self.kind = kind
         self.default_value = str(default_value) if default_value is not None else ""
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
     def __str__(self) -> str:
         extra_settings = {}
@@ -430,6 +678,7 @@ class TextBox(PageContent):
 
 @dataclass
 class TextArea(PageContent):
+    __slots__ = ('name', 'default_value', 'extra_settings')
     name: str
     default_value: str
     EXTRA_ATTRS = ["rows", "cols", "autocomplete", "autofocus", "disabled", "placeholder", "readonly", "required"]
@@ -438,7 +687,7 @@ class TextArea(PageContent):
         validate_parameter_name(name, "TextArea")
         self.name = name
         self.default_value = str(default_value) if default_value is not None else ""
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
     def __str__(self) -> str:
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
@@ -447,16 +696,48 @@ class TextArea(PageContent):
 
 @dataclass
 class SelectBox(PageContent):
+    """
+    A dropdown list of options. If there are more than ``max_options`` options, then only the
+    first ``max_options`` are sent with the page; the box instead becomes a text field that
+    suggests matching options, searching the rest of the options on the server as the user types.
+    Without a server to search (e.g., in Skulpt), all of the options are always included.
+
+    :param name: The name of the parameter that will hold the selected option.
+    :param options: The options to choose from; each will be converted to a string.
+    :param default_value: The option that is initially selected, if any.
+    :param max_options: The maximum number of options to include in the page, or ``None`` for no limit.
+    """
+    __slots__ = ('name', 'options', 'default_value', 'max_options', 'extra_settings')
     name: str
     options: List[str]
     default_value: Optional[str]
+    max_options: Optional[int]
 
-    def __init__(self, name: str, options: List[str], default_value: Optional[str] = None, **kwargs):
+    def __init__(self, name: str, options: List[str], default_value: Optional[str] = None,
+                 max_options: Optional[int] = None, **kwargs):
         validate_parameter_name(name, "SelectBox")
         self.name = name
         self.options = [str(option) for option in options]
         self.default_value = str(default_value) if default_value is not None else ""
-        self.extra_settings = kwargs
+        self.max_options = max_options
+        self.extra_settings = kwargs or EMPTY_SETTINGS
+
+    def is_searchable(self) -> bool:
+        return self.max_options is not None and len(self.options) > self.max_options
+
+    def render_key(self):
+        # Rendering a searchable box keeps its option index from being evicted, so it cannot be skipped
+        if self.is_searchable():
+            return None
+        return super().render_key()
+
+    def render(self, current_state, configuration):
+        if self.is_searchable() and not configuration.skulpt:
+            extra_settings = {}
+            if self.default_value is not None:
+                extra_settings['value'] = html.escape(self.default_value)
+            return self._render_searchable(extra_settings)
+        return str(self)
 
     def __str__(self) -> str:
         extra_settings = {}
@@ -468,9 +749,20 @@ class SelectBox(PageContent):
                             for option in self.options)
         return f"<select name='{self.name}' {parsed_settings}>{options}</select>"
 
+    def _render_searchable(self, extra_settings):
+        index = get_option_index(self.options)
+        list_id = f"{self.name}--options"
+        parsed_settings = self.parse_extra_settings(**extra_settings)
+        options = "".join(f"<option value='{html.escape(option)}'></option>"
+                          for option in self.options[:self.max_options])
+        return (f"<input name='{self.name}' list='{list_id}' autocomplete='off' "
+                f"data-btlw-search='{index.url}' data-btlw-search-limit='{self.max_options}' {parsed_settings}>"
+                f"<datalist id='{list_id}'>{options}</datalist>")
+
 
 @dataclass
 class CheckBox(PageContent):
+    __slots__ = ('name', 'default_value', 'extra_settings')
     EXTRA_ATTRS = ["checked"]
     name: str
     default_value: bool
@@ -479,7 +771,7 @@ class CheckBox(PageContent):
         validate_parameter_name(name, "CheckBox")
         self.name = name
         self.default_value = bool(default_value)
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
     def __str__(self) -> str:
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
@@ -490,31 +782,46 @@ class CheckBox(PageContent):
 
 @dataclass
 class LineBreak(PageContent):
+    __slots__ = ()
+
     def __str__(self) -> str:
         return "<br />"
 
 
 @dataclass
 class HorizontalRule(PageContent):
+    __slots__ = ()
+
     def __str__(self) -> str:
         return "<hr />"
 
 
 @dataclass
 class _HtmlGroup(PageContent):
+    __slots__ = ('content', 'extra_settings')
     content: List[Any]
     extra_settings: Dict
     kind: str
 
     def __init__(self, *args, **kwargs):
         self.content = list(args)
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
+
+    def children(self):
+        return self.content
 
     def __repr__(self):
         if self.extra_settings:
             return f"{self.kind.capitalize()}({', '.join(repr(item) for item in self.content)}, {self.extra_settings})"
         return f"{self.kind.capitalize()}({', '.join(repr(item) for item in self.content)})"
 
+    def render(self, current_state, configuration):
+        # Nested components are rendered with the configuration too (e.g., so that buttons are scoped)
+        parsed_settings = self.parse_extra_settings(**self.extra_settings)
+        content = ''.join(item.render(current_state, configuration) if isinstance(item, PageContent) else str(item)
+                          for item in self.content)
+        return f"<{self.kind} {parsed_settings}>{content}</{self.kind}>"
+
     def __str__(self) -> str:
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
         return f"<{self.kind} {parsed_settings}>{''.join(str(item) for item in self.content)}</{self.kind}>"
@@ -522,20 +829,22 @@ class _HtmlGroup(PageContent):
 
 @dataclass
 class Span(_HtmlGroup):
+    __slots__ = ()
     kind = 'span'
 
     def __init__(self, *args, **kwargs):
         self.content = args
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
 
 @dataclass
 class Div(_HtmlGroup):
+    __slots__ = ()
     kind = 'div'
 
     def __init__(self, *args, **kwargs):
         self.content = args
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
 
 Division = Div
@@ -544,9 +853,14 @@ Box = Div
 
 @dataclass
 class Pre(PageContent):
+    __slots__ = ('content', 'extra_settings')
+
     def __init__(self, *args, **kwargs):
         self.content = args
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
+
+    def children(self):
+        return self.content
 
     def __str__(self) -> str:
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
@@ -558,22 +872,34 @@ PreformattedText = Pre
 
 @dataclass
 class Row(Div):
+    __slots__ = ()
+    # Added when the row is rendered, so that a row without extra settings can share EMPTY_SETTINGS
+    DEFAULT_SETTINGS = {'style_display': "flex", 'style_flex_direction': "row", 'style_align_items': "center"}
+
     def __init__(self, *args, **kwargs):
         self.content = args
-        self.extra_settings = kwargs
-        self.extra_settings['style_display'] = "flex"
-        self.extra_settings['style_flex_direction'] = "row"
-        self.extra_settings['style_align_items'] = "center"
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
 
 @dataclass
 class _HtmlList(PageContent):
+    __slots__ = ('items', 'extra_settings')
     items: List[Any]
     kind: str = ""
 
     def __init__(self, items: List[Any], **kwargs):
         self.items = items
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
+
+    def children(self):
+        return self.items
+
+    def render(self, current_state, configuration):
+        parsed_settings = self.parse_extra_settings(**self.extra_settings)
+        items = "\n".join("<li>{}</li>".format(item.render(current_state, configuration)
+                                               if isinstance(item, PageContent) else item)
+                          for item in self.items)
+        return f"<{self.kind} {parsed_settings}>{items}</{self.kind}>"
 
     def __str__(self) -> str:
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
@@ -582,17 +908,24 @@ class _HtmlList(PageContent):
 
 
 class NumberedList(_HtmlList):
+    __slots__ = ()
     kind = "ol"
 
 
 class BulletedList(_HtmlList):
+    __slots__ = ()
     kind = "ul"
 
 
 @dataclass
 class Header(PageContent):
+    __slots__ = ('body', 'level')
     body: str
-    level: int = 1
+    level: int
+
+    def __init__(self, body: str, level: int = 1):
+        self.body = body
+        self.level = level
 
     def __str__(self):
         return f"<h{self.level}>{self.body}</h{self.level}>"
@@ -600,12 +933,13 @@ class Header(PageContent):
 
 @dataclass
 class Table(PageContent):
+    __slots__ = ('rows', 'header', 'extra_settings')
     rows: List[List[str]]
 
     def __init__(self, rows: List[List[str]], header=None, **kwargs):
         self.rows = rows
         self.header = header
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
         self.reformat_as_tabular()
 
     def reformat_as_single(self):
@@ -650,12 +984,13 @@ class Table(PageContent):
 
 @dataclass
 class Text(PageContent):
+    __slots__ = ('body', 'extra_settings')
     body: str
     extra_settings: dict
 
     def __init__(self, body: str, **kwargs):
         self.body = body
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
     def __str__(self):
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
@@ -666,36 +1001,81 @@ class Text(PageContent):
 
 @dataclass
 class MatPlotLibPlot(PageContent):
+    """
+    Shows a matplotlib figure as an image. The figure can be given explicitly (e.g., one made with
+    ``matplotlib.figure.Figure()``, without pyplot); otherwise, pyplot's current figure is used, as it
+    is when the component is created. Each figure is drawn with its own Agg canvas, so routes in
+    different threads can plot at the same time as long as they each use their own figure.
+    """
+    __slots__ = ('extra_matplotlib_settings', 'close_automatically', 'extra_settings', 'figure')
     extra_matplotlib_settings: dict
     close_automatically: bool
 
-    def __init__(self, extra_matplotlib_settings=None, close_automatically=True, **kwargs):
+    def __init__(self, extra_matplotlib_settings=None, close_automatically=True, figure=None, **kwargs):
         if not _has_matplotlib:
             raise ImportError("Matplotlib is not installed. Please install it to use this feature.")
+        # Capture the current figure right away, rather than whatever figure is current when the page is rendered
+        if figure is None and hasattr(plt, 'gcf'):
+            figure = plt.gcf()
+        self.figure = figure
         if extra_matplotlib_settings is None:
             extra_matplotlib_settings = {}
         self.extra_matplotlib_settings = extra_matplotlib_settings
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
         if "format" not in extra_matplotlib_settings:
             extra_matplotlib_settings["format"] = "png"
         if "bbox_inches" not in extra_matplotlib_settings:
             extra_matplotlib_settings["bbox_inches"] = "tight"
         self.close_automatically = close_automatically
 
+    def render_key(self):
+        # Figures can be changed after they are shown, so the plot has to be checked every time
+        return None
+
+    def render(self, current_state, configuration):
+        if configuration.skulpt or not configuration.serve_generated_images:
+            return super().render(current_state, configuration)
+        figure = self.figure
+        image_format = self.extra_matplotlib_settings["format"]
+        if image_format not in ("png", "svg"):
+            raise ValueError(f"Unsupported format {image_format}")
+        key = fingerprint_figure(figure, self.extra_matplotlib_settings)
+        if image_format == "svg":
+            figure_data = PLOT_RENDERS.get(key) if key is not None else None
+            if figure_data is None:
+                figure_data = render_figure(figure, self.extra_matplotlib_settings).decode()
+                if key is not None:
+                    PLOT_RENDERS.set(key, figure_data)
+        elif key is None:
+            # The figure cannot be fingerprinted, so it has to be drawn to find out what it looks like
+            data = render_figure(figure, self.extra_matplotlib_settings)
+            key = hashlib.sha1(data).hexdigest()
+            GENERATED_IMAGES.set(key, data)
+        elif not has_generated_image(key):
+            if configuration.plot_processes > 0:
+                PENDING_IMAGES.set(key, render_figure_in_pool(figure, self.extra_matplotlib_settings,
+                                                              configuration.plot_processes))
+            else:
+                GENERATED_IMAGES.set(key, render_figure(figure, self.extra_matplotlib_settings))
+        if self.close_automatically:
+            plt.close(figure)
+        if image_format == "svg":
+            return figure_data
+        parsed_settings = self.parse_extra_settings(**self.extra_settings)
+        return f"<img src='{GENERATED_IMAGE_ROUTE}/{key}.png' {parsed_settings}/>"
+
     def __str__(self):
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
         # Handle image processing
-        image_data = io.BytesIO()
-        plt.savefig(image_data, **self.extra_matplotlib_settings)
+        image_data = render_figure(self.figure, self.extra_matplotlib_settings)
         if self.close_automatically:
-            plt.close()
-        image_data.seek(0)
+            plt.close(self.figure)
         if self.extra_matplotlib_settings["format"] == "png":
-            figure = base64.b64encode(image_data.getvalue()).decode('utf-8')
+            figure = base64.b64encode(image_data).decode('utf-8')
             figure = f"data:image/png;base64,{figure}"
             return f"<img src='{figure}' {parsed_settings}/>"
         elif self.extra_matplotlib_settings["format"] == "svg":
-            figure = image_data.read().decode()
+            figure = image_data.decode()
             return figure
         else:
             raise ValueError(f"Unsupported format {self.extra_matplotlib_settings['format']}")
@@ -703,10 +1083,11 @@ class MatPlotLibPlot(PageContent):
 
 @dataclass
 class Download(PageContent):
+    __slots__ = ('text', 'filename', 'content', 'content_type')
     text: str
     filename: str
     content: str
-    content_type: str = "text/plain"
+    content_type: str
 
     def __init__(self, text: str, filename: str, content: str, content_type: str = "text/plain"):
         self.text = text
@@ -714,22 +1095,29 @@ class Download(PageContent):
         self.content = content
         self.content_type = content_type
 
-    def _handle_pil_image(self, image):
-        if not HAS_PILLOW or isinstance(image, str):
-            return False, image
+    def render_key(self):
+        # Rendering registers the content, so reusing the HTML would let the link expire
+        return None
 
-        image_data = io.BytesIO()
-        image.save(image_data, format="PNG")
-        image_data.seek(0)
-        figure = base64.b64encode(image_data.getvalue()).decode('utf-8')
-        figure = f"data:image/png;base64,{figure}"
-        return True, figure
+    def render(self, current_state, configuration):
+        if configuration.skulpt or not configuration.stream_downloads:
+            return str(self)
+        content_type = "image/png" if is_pil_image(self.content) else self.content_type
+        token = register_download(self.content, content_type, self.filename)
+        return self._render_link(f"{DOWNLOAD_ROUTE}/{token}/{quote(self.filename)}")
+
+    def _render_link(self, url: str) -> str:
+        return f'<a download="{html.escape(self.filename)}" href="{html.escape(url)}">{self.text}</a>'
 
     def __str__(self):
-        was_pil, url = self._handle_pil_image(self.content)
-        if was_pil:
-            return f'<a download="{self.filename}" href="{url}">{self.text}</a>'
-        return f'<a download="{self.filename}" href="data:{self.content_type},{self.content}">{self.text}</a>'
+        content = self.content
+        if is_pil_image(content):
+            return self._render_link(f"data:image/png;base64,{base64.b64encode(encode_png(content)).decode('utf-8')}")
+        if isinstance(content, (bytes, bytearray)):
+            return self._render_link(f"data:{self.content_type};base64,{base64.b64encode(content).decode('utf-8')}")
+        if not isinstance(content, str):
+            content = "".join(content)
+        return self._render_link(f"data:{self.content_type},{quote(content)}")
 
 
 @dataclass
@@ -747,13 +1135,13 @@ class FileUpload(PageContent):
     To have multiple files uploaded, use the `multiple` attribute, which will cause
     the corresponding parameter to be a list of files.
     """
+    __slots__ = ('name', 'extra_settings')
     name: str
     EXTRA_ATTRS = ["accept", "capture", "multiple", "required"]
 
     def __init__(self, name: str, accept: Union[str, List[str], None] = None, **kwargs):
         validate_parameter_name(name, "FileUpload")
         self.name = name
-        self.extra_settings = kwargs
 
         # Parse accept options
         if accept is not None:
@@ -761,7 +1149,8 @@ class FileUpload(PageContent):
                 accept = [accept]
             accept= [f".{ext}" if "/" not in ext and not ext.startswith(".") else ext
                      for ext in accept]
-            self.extra_settings['accept'] = ", ".join(accept)
+            kwargs['accept'] = ", ".join(accept)
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
     def __str__(self):
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
@@ -770,6 +1159,7 @@ class FileUpload(PageContent):
 
 @dataclass
 class Script(PageContent):
+    __slots__ = ('text',)
     text: str
 
     def __str__(self):
@@ -778,6 +1168,7 @@ class Script(PageContent):
 
 @dataclass
 class ScriptButton(PageContent):
+    __slots__ = ('label', 'jsfunction', 'extra_settings')
     label: str
     jsfunction: str
     extra_settings: dict
@@ -785,8 +1176,111 @@ class ScriptButton(PageContent):
     def __init__(self, label: str, jsfunction: str, **kwargs):
         self.label = label
         self.jsfunction = jsfunction
-        self.extra_settings = kwargs
+        self.extra_settings = kwargs or EMPTY_SETTINGS
 
     def __str__(self):
         parsed_settings = self.parse_extra_settings(**self.extra_settings)
-        return f"<input type='button' value='{self.label}' onClick='{self.jsfunction}' {parsed_settings}/>"
\ No newline at end of file
+        return f"<input type='button' value='{self.label}' onClick='{self.jsfunction}' {parsed_settings}/>"
+
+MEMO_CACHE = BoundedCache(256, name="Memo")
+
+
+class _SameObject:
+    """
+    Compares an unhashable value by identity, holding on to it so that its ``id`` cannot be reused while
+    the cache key exists.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return id(self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, _SameObject) and other.value is self.value
+
+
+def _captured_key(value: Any) -> Hashable:
+    # Checking captured values by identity is cheap, even when a builder captures a large list of data
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return _SameObject(value)
+
+
+@dataclass
+class Memo(PageContent):
+    """
+    Caches the rendered HTML of some content that is expensive to create, but rarely changes (such as a
+    large table or a long block of help text). The ``builder`` is a function that takes no arguments
+    and returns a list of strings and components, just like the content of a ``Page``. The first time
+    a ``Memo`` with a given ``key`` is shown, the builder is called and its content is rendered; after
+    that, the same HTML is reused without calling the builder again.
+
+    The ``key`` should describe everything the content depends on. It can be any value, such as
+    a string, a number, or even a dataclass; if the content should change, use a different key.
+    Links and buttons inside of a ``Memo`` are not verified, since the content is not always built.
+
+    :param key: A value identifying the version of the content to show.
+    :param builder: A function with no parameters that returns a list of content.
+    """
+    __slots__ = ('key', 'builder')
+    key: Any
+    builder: Callable[[], List[Content]]
+
+    def __init__(self, key: Any, builder: Callable[[], List[Content]]):
+        self.key = key
+        self.builder = builder
+
+    def cache_key(self, configuration=None) -> Hashable:
+        """
+        Creates the key that is used to store this content in the cache. This combines the key itself
+        (or a fingerprint of it, if it is not hashable) with the builder and the configuration it is
+        rendered with. Builders are compared by their code and the values they capture (their closure,
+        default arguments, and bound object), so that a closure created anew on every render can still
+        be reused, while two closures with the same code but different captured values are kept apart.
+        Captured values that are not hashable (like lists) are compared by identity, so changing one
+        in place does not change the key; that is what the ``key`` is for.
+
+        :param configuration: The configuration that the content is rendered with, if any.
+        :return: A hashable key for the cache.
+        """
+        try:
+            hash(self.key)
+            fingerprint = self.key
+        except TypeError:
+            try:
+                fingerprint = json.dumps(dehydrate_json(self.key), sort_keys=True)
+            except (ValueError, TypeError):
+                fingerprint = repr(self.key)
+        builder = self.builder
+        code = getattr(builder, '__code__', None)
+        if code is None:
+            builder_key = builder
+        else:
+            captured = [cell.cell_contents for cell in getattr(builder, '__closure__', None) or ()]
+            captured.extend(getattr(builder, '__defaults__', None) or ())
+            captured.append(getattr(builder, '__self__', None))
+            builder_key = code, tuple(_captured_key(value) for value in captured)
+        return builder_key, repr(configuration), type(self.key).__name__, fingerprint
+
+    def render_key(self):
+        # Already cached by the memo itself
+        return None
+
+    def render(self, current_state, configuration):
+        cache_key = self.cache_key(configuration)
+        rendered = MEMO_CACHE.get(cache_key)
+        if rendered is None:
+            content = self.builder()
+            if not isinstance(content, (list, tuple)):
+                content = [content]
+            rendered = "\n".join(render_chunk(chunk, current_state, configuration) for chunk in content)
+            MEMO_CACHE.set(cache_key, rendered)
+        return rendered
+
+    def __str__(self) -> str:
+        return self.render(None, None)
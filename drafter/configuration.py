@@ -6,8 +6,9 @@ Download/upload state button
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import os
+import tempfile
 
 from drafter.setup import DEFAULT_BACKEND
 
@@ -37,7 +38,52 @@ class ServerConfiguration:
     additional_css_content: List[str] = field(default_factory=list)
     src_image_folder: str = ''
     save_uploaded_files: bool = not skulpt
+    # The largest uploaded file (in bytes) that a route will accept; 0 allows any size
+    max_upload_size: int = 0
+    # Where uploaded files are copied to for parameters annotated as pathlib.Path
+    upload_folder: str = os.path.join(tempfile.gettempdir(), 'drafter_uploads')
+    # How many files can be converted at the same time, for parameters that take a list of uploaded files
+    upload_workers: int = 4
+    # Uploaded images (for PIL.Image parameters) are decoded at most this many pixels wide or tall; 0 keeps them as is
+    max_upload_image_size: int = 0
+    # Uploaded images with more pixels than this are refused before they are decoded; 0 allows any number
+    max_upload_image_pixels: int = 64_000_000
+    # Where large images and bytes in the state are kept; if empty, a temporary folder is used and removed
+    # when the server stops, so restoring a state that refers to them only works until then
+    blob_folder: str = ""
     deploy_image_path: str = 'website' if skulpt else 'images'
+    # Serve images created with PIL from the server, instead of embedding them in the page
+    serve_generated_images: bool = True
+    # Send the content of Download links from the server when they are clicked, instead of embedding it in the page
+    stream_downloads: bool = True
+    # Give images a srcset of smaller WebP copies (made by the server), and load them lazily
+    responsive_images: bool = False
+    image_cache_folder: str = os.path.join(tempfile.gettempdir(), 'drafter_image_cache')
+    # The Cache-Control header sent with files from the image folder; the default makes browsers check
+    # whether the file changed (a cheap 304 response), and e.g. "public, max-age=3600" skips even that
+    image_cache_control: str = "no-cache"
+    # Behind a reverse proxy, let the proxy send image files: "X-Sendfile" (Apache, lighttpd) or
+    # "X-Accel-Redirect" (nginx, where the file's absolute path is added to image_sendfile_prefix)
+    image_sendfile_header: str = ""
+    image_sendfile_prefix: str = ""
+    # Reuse the HTML of components that are unchanged since the previous render of the same route
+    cache_static_chunks: bool = False
+    # Draw MatPlotLibPlot images in this many separate processes, so that the page can be sent without waiting
+    plot_processes: int = 0
+    # Buttons and links fetch only the new page content, instead of reloading the whole document
+    partial_navigation: bool = False
+    # Like partial_navigation, but only the parts of the page that changed are sent
+    patch_navigation: bool = False
+    # Prepare the pages that links point to ahead of time: "" (never), "hover", or "visible"
+    prefetch_links: str = ""
+    # Show the result of each form submission through a redirect, so refreshing does not submit it again
+    post_redirect_get: bool = False
+    # Keep the arguments of buttons and links on the server, sending only a short token with each one
+    argument_tokens: bool = False
+    # Only send the fields that the target route of the pressed button actually accepts
+    scoped_forms: bool = False
+    # Filled in by the server: the names of the parameters that each route accepts, for scoped_forms
+    route_fields: Dict[str, Optional[Tuple[str, ...]]] = field(default_factory=dict, repr=False, compare=False)
 
     # Test Deployment CDN configurations
     cdn_skulpt: str = os.environ.get("DRAFTER_CDN_SKULPT", "https://drafter-edu.github.io/drafter-cdn/skulpt/skulpt.js")
@@ -3,3 +3,11 @@ SUBMIT_BUTTON_KEY = '--submit-button'
 PREVIOUSLY_PRESSED_BUTTON = "--last-button"
 LABEL_SEPARATOR = "$@~@$"
 JSON_DECODE_SYMBOL = "$@JSON~@$"
+BLOB_REFERENCE_SYMBOL = "$@BLOB~@$"
+PARTIAL_NAVIGATION_HEADER = "X-Drafter-Partial"
+PAGE_VERSION_HEADER = "X-Drafter-Version"
+PREFETCH_HEADER = "X-Drafter-Prefetch"
+# Result pages are served from a single path segment (e.g., /--page-1a2b), so that the relative URLs on them
+# (like the --reset link) still resolve against the root, just as they do on every other page
+RESULT_PAGE_ROUTE = "/--page-"
+ARGUMENT_TOKEN_KEY = "--arguments"
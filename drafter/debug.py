@@ -10,6 +10,7 @@ from drafter.urls import merge_url_query_params
 from drafter.testing import bakery, _bakery_tests, DIFF_WRAP_WIDTH, diff_tests
 from drafter.components import Table
 from drafter.configuration import ServerConfiguration
+from drafter.caching import NAMED_CACHES
 
 @dataclass
 class DebugInformation:
@@ -32,6 +33,7 @@ class DebugInformation:
             *self.available_routes(),
             *self.page_load_history(),
             *self.test_status(),
+            *self.cache_statistics(),
             *self.test_deployment(),
             "</div>"
         ]
@@ -144,6 +146,20 @@ class DebugInformation:
             else:
                 yield "<div><strong>No Tests</strong></div>"
 
+    def cache_statistics(self):
+        # Caches
+        if not NAMED_CACHES:
+            return
+        yield "<details><summary><strong>Caches</strong></summary>"
+        yield f"{self.INDENTATION_START_HTML}"
+        rows = [[html.escape(name), f"{len(cache)} / {cache.maxsize}"
+                 + (f" ({cache.total_bytes} / {cache.maxbytes} bytes)" if cache.maxbytes is not None else ""),
+                 str(cache.hits), str(cache.misses)]
+                for name, cache in NAMED_CACHES.items()]
+        yield str(Table(rows, header=["Cache", "Entries", "Hits", "Misses"]))
+        yield f"{self.INDENTATION_END_HTML}"
+        yield "</details>"
+
     def render_state(self, state):
         if is_dataclass(state):
             return str(Table(state))
@@ -0,0 +1,136 @@
+"""
+Serving the content of ``Download`` links from the server, instead of embedding it in the page.
+
+A ``data:`` URL puts the whole file into the page's HTML, every time the page is shown, whether or not
+anyone clicks the link. Instead, the content is registered under a short token when the page is
+rendered, and the link points to a route that sends the content only when it is actually requested.
+Text, bytes, and PIL images are registered under a token derived from their content, so showing the
+same download again reuses the same token; generators are registered under a random token, and can
+only be downloaded once (since they can only be read once).
+"""
+import hashlib
+import secrets
+from dataclasses import dataclass
+from typing import Any, Iterator
+from urllib.parse import quote
+
+from drafter.caching import BoundedCache
+from drafter.image_support import HAS_PILLOW, PILImage, image_fingerprint, encode_png
+
+DOWNLOAD_ROUTE = "/--download"
+# How long a download link keeps working after the page was shown, in seconds
+DOWNLOAD_TTL = 30 * 60
+# The size of the pieces that downloads are sent in
+DOWNLOAD_CHUNK_SIZE = 2 ** 16
+
+# How much memory the registered downloads can take up in total, in bytes; the oldest are forgotten first
+DOWNLOAD_BYTES = 64 * 2 ** 20
+
+DOWNLOADS = BoundedCache(256, name="Downloads", ttl=DOWNLOAD_TTL, maxbytes=DOWNLOAD_BYTES)
+
+
+@dataclass
+class DownloadPayload:
+    """
+    The content of a ``Download`` link, waiting to be requested.
+
+    :ivar content: The text, bytes, PIL image, or iterator of text/bytes to send.
+    :ivar content_type: The MIME type to send the content with.
+    :ivar filename: The name that the browser should save the file as.
+    """
+    content: Any
+    content_type: str
+    filename: str
+
+    @property
+    def is_stream(self) -> bool:
+        return not isinstance(self.content, (str, bytes, bytearray, memoryview)) and not is_pil_image(self.content)
+
+    def __len__(self) -> int:
+        """
+        Estimates how many bytes of memory the content takes up, so that ``DOWNLOADS`` can be bounded
+        by size. Images are measured by their pixels, and streams (which have not been read yet) count as empty.
+        """
+        if is_pil_image(self.content):
+            return self.content.width * self.content.height * len(self.content.getbands())
+        if self.is_stream:
+            return 0
+        return len(self.content)
+
+    def to_bytes(self) -> bytes:
+        """
+        Converts the (non-streaming) content to the bytes that will be sent.
+        """
+        if is_pil_image(self.content):
+            return encode_png(self.content)
+        if isinstance(self.content, str):
+            return self.content.encode('utf-8')
+        return bytes(self.content)
+
+    def iterate(self) -> Iterator[bytes]:
+        """
+        Produces the bytes of streaming content, one piece at a time, as the generator provides them.
+        """
+        for chunk in self.content:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else bytes(chunk)
+
+
+def is_pil_image(value) -> bool:
+    return HAS_PILLOW and isinstance(value, PILImage.Image)
+
+
+def register_download(content, content_type: str, filename: str) -> str:
+    """
+    Registers the content of a download, so that it can be requested later through the download route.
+
+    :param content: The text, bytes, PIL image, or generator of text/bytes to download.
+    :param content_type: The MIME type of the content.
+    :param filename: The name that the browser should save the file as.
+    :return: The token that the content can be requested with.
+    """
+    payload = DownloadPayload(content, content_type, filename)
+    if payload.is_stream:
+        token = secrets.token_urlsafe(16)
+    else:
+        if is_pil_image(content):
+            # Hashing the pixels is much faster than encoding the image, which waits until it is requested
+            digest = hashlib.sha1(image_fingerprint(content).encode('utf-8'))
+        else:
+            digest = hashlib.sha1(content.encode('utf-8') if isinstance(content, str) else content)
+        digest.update(f"\0{content_type}\0{filename}".encode('utf-8'))
+        token = digest.hexdigest()[:24]
+    # Storing the content again (even under an existing token) keeps the link working for another DOWNLOAD_TTL
+    DOWNLOADS.set(token, payload)
+    return token
+
+
+def take_download(token: str):
+    """
+    Gets the content registered under the given token. Streaming content can only be read once,
+    so it is removed from the store when it is taken.
+
+    :param token: The token of the download.
+    :return: The ``DownloadPayload``, or None if there is no (longer a) download with that token.
+    """
+    payload = DOWNLOADS.get(token)
+    if payload is not None and payload.is_stream:
+        DOWNLOADS.pop(token)
+    return payload
+
+
+def make_content_disposition(filename: str) -> str:
+    """
+    Creates the ``Content-Disposition`` header that makes the browser save the download as the given
+    filename, including a plain ASCII version of the name for browsers that do not understand the UTF-8 one.
+    """
+    fallback = filename.encode('ascii', 'replace').decode('ascii').replace('"', '').replace('\\', '')
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
+
+
+def iterate_bytes(data: bytes, start: int, end: int) -> Iterator[bytes]:
+    """
+    Produces part of the given bytes in pieces, without copying the whole range at once.
+    """
+    view = memoryview(data)
+    for offset in range(start, end, DOWNLOAD_CHUNK_SIZE):
+        yield bytes(view[offset:min(offset + DOWNLOAD_CHUNK_SIZE, end)])
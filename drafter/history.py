@@ -1,16 +1,20 @@
+import hashlib
 import json
 import html
 import base64
 import os
 import io
-from urllib.parse import unquote
+from urllib.parse import unquote, parse_qsl
 from dataclasses import dataclass, is_dataclass, replace, asdict, fields
 from dataclasses import field as dataclass_field
 from datetime import timezone, timedelta, datetime
+from functools import lru_cache
 from typing import Any, Optional, Callable, Dict
 import pprint
 
-from drafter.constants import LABEL_SEPARATOR, JSON_DECODE_SYMBOL
+from drafter.blobs import store_blob, store_image_blob, is_blob_reference, load_blob
+from drafter.caching import BoundedCache
+from drafter.constants import LABEL_SEPARATOR, JSON_DECODE_SYMBOL, ARGUMENT_TOKEN_KEY
 from drafter.setup import request
 from drafter.testing import DIFF_INDENT_WIDTH
 from drafter.image_support import HAS_PILLOW, PILImage
@@ -154,12 +158,72 @@ def format_page_content(content, width=80):
         return safe_repr(content), False
 
 
+# The arguments of buttons and links rendered with ``argument_tokens`` enabled, keyed by their token
+ARGUMENT_TOKENS = BoundedCache(100_000, name="Argument tokens")
+
+
+def store_argument_token(arguments: Dict[str, Any]) -> str:
+    """
+    Stores the arguments of a button or link on the server, returning a short token that refers to them.
+    The token is derived from the arguments themselves, so identical arguments always get the same token
+    (even across different renders of the page).
+
+    :param arguments: The names and values of the arguments.
+    :return: The token for the arguments.
+    """
+    token = hashlib.sha1(json.dumps(arguments, sort_keys=True).encode('utf-8')).hexdigest()[:20]
+    if token not in ARGUMENT_TOKENS:
+        ARGUMENT_TOKENS.set(token, arguments)
+    return token
+
+
+def resolve_argument_token(token: str) -> Dict[str, Any]:
+    """
+    Looks up the arguments that were stored under the given token.
+
+    :param token: The token, as sent by the browser.
+    :return: The names and values of the arguments.
+    :raises ValueError: If the token is not known (e.g., because the server restarted).
+    """
+    arguments = ARGUMENT_TOKENS.get(token)
+    if arguments is None:
+        raise ValueError(f"The arguments for this button or link are no longer available (token {token!r}). "
+                         f"Try reloading the page.")
+    return arguments
+
+
+@lru_cache(maxsize=1024)
+def decode_button_label(raw_label: str):
+    """
+    Decodes the label of a button from the start of one of its hidden argument names. Every argument of
+    every button on the page carries its button's label, so the same few labels are decoded over and over;
+    they are cached to avoid repeating that work.
+
+    :param raw_label: The label as it appears in the field name.
+    :return: The decoded label.
+    """
+    return json.loads(unquote(raw_label))
+
+
+def parse_button_pressed(value: str):
+    """
+    Decodes the text of the button (or link) that was pressed. Buttons send their text as JSON, while
+    links put their plain text in the URL; so text that is not valid JSON is used as it is.
+
+    :param value: The value of the submit button parameter.
+    :return: The text of the button or link.
+    """
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
 def extract_button_label(full_key: str):
     if LABEL_SEPARATOR not in full_key:
         return None, full_key
     button_pressed, key = full_key.split(LABEL_SEPARATOR, 1)
-    button_pressed = json.loads(unquote(button_pressed))
-    return button_pressed, key
+    return decode_button_label(button_pressed), key
 
 
 def add_unless_present(a_dictionary, key, value, from_button=False):
@@ -176,22 +240,31 @@ def add_unless_present(a_dictionary, key, value, from_button=False):
 def remap_hidden_form_parameters(kwargs: dict, button_pressed: str):
     renamed_kwargs: Dict[Any, Any] = {}
     for key, value in kwargs.items():
+        # Most fields are plain, so check for that first, without splitting or decoding anything
+        if LABEL_SEPARATOR not in key:
+            if key == ARGUMENT_TOKEN_KEY:
+                for name, argument in resolve_argument_token(value).items():
+                    add_unless_present(renamed_kwargs, name, argument, from_button=True)
+            elif key.startswith(JSON_DECODE_SYMBOL):
+                key = key[len(JSON_DECODE_SYMBOL):]
+                try:
+                    new_value = json.loads(value)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Could not decode JSON for {key}={value!r}") from e
+                add_unless_present(renamed_kwargs, key, new_value)
+            else:
+                add_unless_present(renamed_kwargs, key, value)
+            continue
+        # Otherwise, it is an argument of a button, which only matters if that button was pressed
+        if not button_pressed:
+            continue
         possible_button_pressed, possible_key = extract_button_label(key)
-        if button_pressed and possible_button_pressed == button_pressed:
+        if possible_button_pressed == button_pressed:
             try:
                 new_value = json.loads(value)
             except json.JSONDecodeError as e:
                 raise ValueError(f"Could not decode JSON for {possible_key}={value!r}") from e
             add_unless_present(renamed_kwargs, possible_key, new_value, from_button=True)
-        elif key.startswith(JSON_DECODE_SYMBOL):
-            key = key[len(JSON_DECODE_SYMBOL):]
-            try:
-                new_value = json.loads(value)
-            except json.JSONDecodeError as e:
-                raise ValueError(f"Could not decode JSON for {key}={value!r}") from e
-            add_unless_present(renamed_kwargs, key, new_value)
-        elif LABEL_SEPARATOR not in key:
-            add_unless_present(renamed_kwargs, key, value)
     return renamed_kwargs
 
 
@@ -245,7 +318,9 @@ def dehydrate_json(value, seen=None):
         return {f.name: dehydrate_json(getattr(value, f.name), seen)
                 for f in fields(value)}
     elif HAS_PILLOW and isinstance(value, PILImage.Image):
-        return image_to_bytes(value).decode('latin1')
+        return store_image_blob(value)
+    elif isinstance(value, (bytes, bytearray)):
+        return store_blob(value)
     raise ValueError(
         f"Error while serializing state: The {value!r} is not a int, str, float, bool, list, or dataclass.")
 
@@ -274,7 +349,14 @@ def rehydrate_json(value, new_type):
         elif hasattr(new_type, '__origin__') and getattr(new_type, '__origin__') == list:
             return value
     elif isinstance(value, str):
+        if new_type is not str and is_blob_reference(value):
+            if HAS_PILLOW and isinstance(new_type, type) and issubclass(new_type, PILImage.Image):
+                # The blob is read into memory, so no file is left open, but the pixels are only decoded when first used
+                return PILImage.open(io.BytesIO(load_blob(value)))
+            data = load_blob(value)
+            return bytearray(data) if new_type is bytearray else data
         if HAS_PILLOW and issubclass(new_type, PILImage.Image):
+            # States from before the blob store held the whole PNG as a latin1 string
             return bytes_to_image(value.encode('latin1'))
         return value
     elif isinstance(value, (int, float, bool)) or value is None:
@@ -298,10 +380,34 @@ def rehydrate_json(value, new_type):
     raise ValueError(f"Error while restoring state: Could not create {new_type!r} from {value!r}")
 
 
-def get_params():
-    params = request.params
-    if hasattr(params, 'decode'):
-        params = params.decode('utf-8')
-    for file_object in request.files:
-        params[file_object] = request.files[file_object]
+# Where the parsed parameters of the current request are kept, so that they are only parsed once
+PARSED_PARAMS_KEY = 'drafter.params'
+
+
+def get_params() -> Dict[str, Any]:
+    """
+    Gets the parameters of the current request (from the query string, the form, and any uploaded files),
+    decoded as UTF-8. They are parsed on the first call and then shared for the rest of the request, so
+    removing a parameter (e.g., once it has been handled) removes it for later callers too.
+
+    :return: The parameters of the current request.
+    """
+    params = request.environ.get(PARSED_PARAMS_KEY)
+    if params is None:
+        if request.content_type.startswith('multipart/'):
+            raw_params = request.params
+            if hasattr(raw_params, 'decode'):
+                raw_params = raw_params.decode('utf-8')
+            params = dict(raw_params.items())
+            for name in request.files:
+                # A FileUpload with the multiple attribute sends each of its files under the same name
+                uploads = request.files.getall(name)
+                params[name] = uploads[0] if len(uploads) == 1 else uploads
+        else:
+            # Without any files, the parameters can be decoded directly, skipping Bottle's re-encoding
+            params = dict(parse_qsl(request.query_string, keep_blank_values=True))
+            if request.content_type.startswith('application/x-www-form-urlencoded'):
+                body = request.body.read().decode('latin-1')
+                params.update(parse_qsl(body, keep_blank_values=True))
+        request.environ[PARSED_PARAMS_KEY] = params
     return params
@@ -1,3 +1,11 @@
+import hashlib
+import io
+import mimetypes
+import os
+from typing import Optional
+
+from drafter.caching import BoundedCache
+
 try:
     from PIL import Image as PILImage
     HAS_PILLOW = True
@@ -5,3 +13,218 @@ except ImportError:
     HAS_PILLOW = False
     PILImage = None # type: ignore
 
+
+GENERATED_IMAGE_ROUTE = "/--img"
+# The PNG data of images created in Python (rather than loaded from files), keyed by their fingerprint.
+# This is limited by size rather than count, so that a page with many small images can still show all of them.
+GENERATED_IMAGE_BYTES = 64 * 2 ** 20
+GENERATED_IMAGES = BoundedCache(4096, name="Generated images", maxbytes=GENERATED_IMAGE_BYTES)
+# Images that are still being drawn (e.g., plots rendered in another process), as futures of their PNG data;
+# they are only removed once they are requested, so this is just a safety limit
+PENDING_IMAGES = BoundedCache(1024, name="Pending images")
+
+
+def image_fingerprint(image) -> str:
+    """
+    Computes a fingerprint of a PIL image's pixels, which is the same for any two identical images.
+    Hashing the pixels is much faster than encoding them as a PNG.
+
+    :param image: The PIL image.
+    :return: A hexadecimal fingerprint.
+    """
+    digest = hashlib.sha1(f"{image.mode}:{image.size}".encode('utf-8'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def encode_png(image) -> bytes:
+    """
+    Encodes a PIL image as a PNG file.
+
+    :param image: The PIL image.
+    :return: The bytes of the PNG file.
+    """
+    image_data = io.BytesIO()
+    image.save(image_data, format="PNG")
+    return image_data.getvalue()
+
+
+def store_generated_image(image) -> str:
+    """
+    Stores a PIL image so that it can be served by the server, encoding it only if an identical
+    image has not been stored recently.
+
+    :param image: The PIL image.
+    :return: The URL that the image will be served from.
+    """
+    key = image_fingerprint(image)
+    if GENERATED_IMAGES.get(key) is None:
+        GENERATED_IMAGES.set(key, encode_png(image))
+    return f"{GENERATED_IMAGE_ROUTE}/{key}.png"
+
+
+def get_generated_image(key: str) -> Optional[bytes]:
+    """
+    Gets the PNG data of a previously stored image. If the image is still being drawn,
+    this waits for it to be finished.
+
+    :param key: The fingerprint of the image, as given in its URL.
+    :return: The PNG data, or None if the image is no longer stored.
+    """
+    data = GENERATED_IMAGES.get(key)
+    if data is None:
+        pending = PENDING_IMAGES.get(key)
+        if pending is not None:
+            # Wait for the image to finish being drawn (raising any error that happened along the way)
+            data = GENERATED_IMAGES.set(key, pending.result())
+            PENDING_IMAGES.pop(key)
+    return data
+
+
+def has_generated_image(key: str) -> bool:
+    """
+    Checks whether an image is stored (or being drawn) under the given fingerprint.
+    """
+    return key in GENERATED_IMAGES or key in PENDING_IMAGES
+
+
+# The formats that images can be converted to when they are resized, and their MIME types
+DERIVATIVE_FORMATS = {"png": ("PNG", "image/png"), "webp": ("WEBP", "image/webp"),
+                      "jpeg": ("JPEG", "image/jpeg"), "jpg": ("JPEG", "image/jpeg")}
+MAXIMUM_DERIVATIVE_SIZE = 4096
+# The widths offered to the browser for images without a fixed width
+RESPONSIVE_WIDTHS = (320, 640, 1280)
+
+
+def parse_derivative_request(width: Optional[str], height: Optional[str], image_format: Optional[str]):
+    """
+    Checks the size and format requested for a variant of an image.
+
+    :param width: The requested maximum width, as given in the URL (or None).
+    :param height: The requested maximum height, as given in the URL (or None).
+    :param image_format: The requested format, as given in the URL (or None).
+    :return: A tuple of the width, height (each an int or None), and format name (or None).
+    :raises ValueError: If any of the values are not allowed.
+    """
+    sizes = []
+    for name, value in (("width", width), ("height", height)):
+        if value is None or value == "":
+            sizes.append(None)
+            continue
+        if not value.isdigit() or not 0 < int(value) <= MAXIMUM_DERIVATIVE_SIZE:
+            raise ValueError(f"The image {name} must be a whole number from 1 to {MAXIMUM_DERIVATIVE_SIZE}, "
+                             f"not {value!r}.")
+        sizes.append(int(value))
+    if image_format:
+        image_format = image_format.lower()
+        if image_format not in DERIVATIVE_FORMATS:
+            raise ValueError(f"The image format must be one of {', '.join(DERIVATIVE_FORMATS)}, not {image_format!r}.")
+    return sizes[0], sizes[1], image_format or None
+
+
+def make_image_derivative(source: str, cache_folder: str, width: Optional[int], height: Optional[int],
+                          image_format: Optional[str]) -> str:
+    """
+    Creates a resized and/or converted copy of an image file, or reuses the copy made by an earlier request.
+    Copies are stored in the cache folder under a name based on the source file's path, modification time,
+    and the requested variant, so that editing the source file automatically makes new copies.
+    Images are only ever made smaller, keeping their aspect ratio.
+
+    :param source: The path of the original image file.
+    :param cache_folder: The folder to keep the copies in.
+    :param width: The maximum width of the copy, if any.
+    :param height: The maximum height of the copy, if any.
+    :param image_format: The format of the copy (e.g., ``"webp"``), or None to keep the original format.
+    :return: The path of the copy.
+    """
+    stat = os.stat(source)
+    if image_format is None:
+        image_format = os.path.splitext(source)[1].lstrip('.').lower()
+        if image_format not in DERIVATIVE_FORMATS:
+            image_format = "png"
+    identity = f"{os.path.abspath(source)}:{stat.st_mtime_ns}:{stat.st_size}:{width}:{height}"
+    name = f"{hashlib.sha1(identity.encode('utf-8')).hexdigest()}.{image_format}"
+    target = os.path.join(cache_folder, name)
+    if os.path.exists(target):
+        return target
+    pillow_format, _ = DERIVATIVE_FORMATS[image_format]
+    with PILImage.open(source) as image:
+        image.thumbnail((width or MAXIMUM_DERIVATIVE_SIZE * 4, height or MAXIMUM_DERIVATIVE_SIZE * 4))
+        if pillow_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        os.makedirs(cache_folder, exist_ok=True)
+        # Write to a temporary file first, so that a half-written copy is never served
+        temporary = f"{target}.{os.getpid()}.tmp"
+        image.save(temporary, format=pillow_format)
+    os.replace(temporary, target)
+    return target
+
+
+def open_limited_image(file, max_size: int = 0, max_pixels: int = 0):
+    """
+    Opens an image file, refusing images with too many pixels and decoding large images at a reduced size.
+    Only the header is read before the checks, so a huge image (e.g., a decompression bomb) is refused before
+    any memory is spent on its pixels. JPEG images are shrunk while they are decoded (with ``draft``); other
+    formats are decoded and then reduced by a whole factor, which is much faster than resampling.
+
+    :param file: The image file (a path or a file object).
+    :param max_size: The largest width or height to decode the image at; 0 keeps the original size.
+    :param max_pixels: The most pixels that the original image may have; 0 allows any number.
+    :return: The PIL image, no larger than ``max_size`` on either side.
+    :raises ValueError: If the image has more than ``max_pixels`` pixels.
+    """
+    image = PILImage.open(file)
+    width, height = image.size
+    if max_pixels > 0 and width * height > max_pixels:
+        raise ValueError(f"The image is {width}x{height}, which is more than the {max_pixels} pixels allowed. "
+                         f"You can change the max_upload_image_pixels setting to allow larger images.")
+    if max_size <= 0 or max(width, height) <= max_size:
+        return image
+    if image.format == "JPEG":
+        # The decoder can scale by 1/2, 1/4, or 1/8, picking the smallest that is still at least this big
+        image.draft(image.mode, (max_size, max_size))
+    factor = max(image.size) // max_size
+    if factor > 1:
+        image = image.reduce(factor)
+    if max(image.size) > max_size:
+        image.thumbnail((max_size, max_size))
+    return image
+
+
+# Older versions of Python do not know about the newer image formats
+mimetypes.add_type("image/webp", ".webp")
+mimetypes.add_type("image/avif", ".avif")
+
+
+def make_file_etag(path: str, stat: os.stat_result) -> str:
+    """
+    Creates a strong ETag for a file, based on its path, size, and modification time (to the nanosecond).
+    Any change to the file gives it a new ETag, so browsers can safely reuse their copy while it matches.
+
+    :param path: The absolute path of the file.
+    :param stat: The result of ``os.stat`` on the file.
+    :return: The ETag, including its surrounding quotes.
+    """
+    identity = f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+    return f'"{hashlib.sha1(identity.encode("utf-8")).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Checks whether the browser's ``If-None-Match`` header accepts the given ETag, meaning that the
+    browser already has this version of the file. The header may list several ETags, or be ``*``.
+
+    :param if_none_match: The value of the header, if it was sent.
+    :param etag: The current ETag of the file.
+    :return: Whether the browser's copy is still current.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        # Weak comparison is used for conditional GET requests
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
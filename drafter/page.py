@@ -1,9 +1,14 @@
+import re
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, List, Optional
 
 from drafter.configuration import ServerConfiguration
 from drafter.constants import RESTORABLE_STATE_KEY
-from drafter.components import PageContent, Link
+from drafter.caching import GenerationalCache
+from drafter.components import PageContent, Link, Button, render_chunk, structural_key
+
+# Finds file inputs in the rendered content, however they were created (e.g., by a FileUpload inside a Table)
+FILE_INPUT_PATTERN = re.compile(r"""<input[^>]*\btype\s*=\s*['"]?file\b""", re.IGNORECASE)
 
 
 @dataclass
@@ -43,32 +48,89 @@ class Page:
                     raise ValueError("The content of a page must be a list of strings or components."
                                      f" Found {incorrect_type} at index {index} instead.")
 
-    def render_content(self, current_state, configuration: ServerConfiguration) -> str:
+    def render_content(self, current_state, configuration: ServerConfiguration,
+                       render_cache: Optional[GenerationalCache] = None) -> str:
         """
         Renders the content of the page to HTML. This will include the state of the page, if it is restorable.
         Users should not call this method directly; it will be called on their behalf by the server.
 
         :param current_state: The current state of the server. This will be used to restore the page if needed.
         :param configuration: The configuration of the server. This will be used to determine how the page is rendered.
+        :param render_cache: If given, the HTML of components that were already rendered on the previous
+            render of this route is reused (see ``render_chunks``).
+        :return: A string of HTML representing the content of the page.
+        """
+        return self.wrap_chunks(self.render_chunks(current_state, configuration, render_cache), configuration)
+
+    @staticmethod
+    def form_encoding(chunks: List[str]) -> str:
+        """
+        Chooses the encoding of the page's form. Multipart forms are only needed for uploading files,
+        and are much slower to parse otherwise.
+
+        :param chunks: The HTML of each piece of content, as made by ``render_chunks``.
+        :return: The value of the form's ``enctype`` attribute.
+        """
+        if any(FILE_INPUT_PATTERN.search(chunk) for chunk in chunks):
+            return "multipart/form-data"
+        return "application/x-www-form-urlencoded"
+
+    def wrap_chunks(self, chunks: List[str], configuration: ServerConfiguration,
+                    encoding: Optional[str] = None) -> str:
+        """
+        Combines the rendered chunks of content into the page's form, along with the header if the
+        page is framed.
+
+        :param chunks: The HTML of each piece of content, as made by ``render_chunks``.
+        :param configuration: The configuration of the server.
+        :param encoding: The encoding of the form; if not given, it is chosen from the chunks
+            (see ``form_encoding``).
         :return: A string of HTML representing the content of the page.
         """
+        if encoding is None:
+            encoding = self.form_encoding(chunks)
         # TODO: Decide if we want to dump state on the page
         chunked = [
             # f'<input type="hidden" name="{RESTORABLE_STATE_KEY}" value={current_state!r}/>'
         ]
-        for chunk in self.content:
-            if isinstance(chunk, str):
-                chunked.append(f"<p>{chunk}</p>")
-            else:
-                chunked.append(chunk.render(current_state, configuration))
+        chunked.extend(chunks)
         content = "\n".join(chunked)
-        content = f"<form method='POST' enctype='multipart/form-data' accept-charset='utf-8'>{content}</form>"
+        content = f"<form method='POST' enctype='{encoding}' accept-charset='utf-8'>{content}</form>"
         if configuration.framed:
             reset_button = self.make_reset_button()
             content = (f"<div class='container btlw-header'>{configuration.title}{reset_button}</div>"
                        f"<div class='container btlw-container'>{content}</div>")
         return content
 
+    def render_chunks(self, current_state, configuration: ServerConfiguration,
+                      render_cache: Optional[GenerationalCache] = None) -> List[str]:
+        """
+        Renders each piece of the page's content to HTML separately.
+
+        If a render cache is given, then each component is first described by its ``structural_key``;
+        components that are identical to one rendered on the previous render of the same route reuse
+        that HTML, so that only the parts of the page that actually changed are rendered again.
+
+        :param current_state: The current state of the server.
+        :param configuration: The configuration of the server.
+        :param render_cache: The cache of the route being rendered, or ``None`` to render everything.
+        :return: The HTML of each piece of content, in order.
+        """
+        if render_cache is None:
+            return [render_chunk(chunk, current_state, configuration) for chunk in self.content]
+        rendered = []
+        for chunk in self.content:
+            key = structural_key(chunk) if isinstance(chunk, PageContent) else None
+            if key is None:
+                rendered.append(render_chunk(chunk, current_state, configuration))
+                continue
+            chunk_html = render_cache.get(key)
+            if chunk_html is None:
+                chunk_html = render_cache.set(key, render_chunk(chunk, current_state, configuration))
+            rendered.append(chunk_html)
+        render_cache.advance()
+        return rendered
+
     def make_reset_button(self) -> str:
         """
         Creates a reset button that has the "reset" icon and title text that says "Resets the page to its original state.".
@@ -83,14 +145,26 @@ class Page:
 
     def verify_content(self, server) -> bool:
         """
-        Verifies that the content of the page is valid. This will check that all links are valid and that
-        all components are valid.
+        Verifies that the content of the page is valid. This will check that the content is still made of
+        strings and components, and that every link and button (including those nested inside other
+        components) points to a valid page, all in a single pass over the content.
         This is not meant to be called by the user; it will be called by the server.
 
         :param server: The server to verify the content against.
-        :return: True if the content is valid, False otherwise.
+        :return: True if the content is valid; otherwise a ValueError is raised.
         """
-        for chunk in self.content:
-            if isinstance(chunk, Link):
-                chunk.verify(server)
+        for index, chunk in enumerate(self.content):
+            if isinstance(chunk, PageContent):
+                self._verify_component(chunk, server)
+            elif not isinstance(chunk, str):
+                incorrect_type = type(chunk).__name__
+                raise ValueError("The content of a page must be a list of strings or components."
+                                 f" Found {incorrect_type} at index {index} instead:\n {chunk!r}")
         return True
+
+    def _verify_component(self, component: PageContent, server):
+        if isinstance(component, (Link, Button)):
+            component.verify(server)
+        for child in component.children():
+            if isinstance(child, PageContent):
+                self._verify_component(child, server)
@@ -0,0 +1,79 @@
+"""
+Patches between consecutive renders of a page, used when ``patch_navigation`` is enabled.
+
+Each piece of a page's content is rendered inside its own ``btlw-chunk`` element. When the browser
+asks for the next page (through partial navigation), the server compares the new list of chunks
+with the list it sent last time, and replies with only the chunks that changed. The script in
+``global.js`` then splices those chunks into the existing page.
+"""
+import json
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from typing import List, Optional
+
+CHUNK_TEMPLATE = "<div class='btlw-chunk' style='display: contents'>{}</div>"
+
+
+@dataclass
+class RenderedPage:
+    """
+    The HTML that was most recently sent to the browser, remembered so that the next page can be
+    sent as a patch against it.
+
+    :ivar version: Increases with every render; the browser reports which version it is showing.
+    :ivar frame: The HTML surrounding the chunks (e.g., the header and form), which must not change for a patch.
+    :ivar chunks: The HTML of each chunk of content, in order.
+    """
+    version: int
+    frame: str
+    chunks: List[str]
+
+
+def mark_chunks(chunks: List[str]) -> List[str]:
+    """
+    Wraps each chunk of rendered content in its own element, so that the browser can find and
+    replace it later. The wrapper uses ``display: contents``, so it does not affect the layout.
+
+    :param chunks: The rendered HTML of each piece of content.
+    :return: The wrapped chunks.
+    """
+    return [CHUNK_TEMPLATE.format(chunk) for chunk in chunks]
+
+
+def diff_chunks(old: List[str], new: List[str]) -> List[list]:
+    """
+    Finds the changes needed to turn the old list of chunks into the new one. Each change is a
+    splice ``[start, end, added]``: the old chunks from ``start`` up to (but not including) ``end``
+    are replaced by the ``added`` chunks. The positions all refer to the old list, so the browser
+    should apply the splices from last to first.
+
+    :param old: The chunks currently shown in the browser.
+    :param new: The chunks of the new page.
+    :return: The list of splices, in order of their position.
+    """
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    return [[old_start, old_end, new[new_start:new_end]]
+            for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes()
+            if tag != 'equal']
+
+
+def make_patch(previous: Optional[RenderedPage], current: RenderedPage, client_version: Optional[str],
+               debug: str, full_size: int) -> Optional[str]:
+    """
+    Creates the JSON patch that turns the previously sent page into the current one. A patch is only
+    possible if the browser is still showing the previous page and the frame has not changed; even then,
+    if the patch would be at least as large as the full content, the full content should be sent instead.
+
+    :param previous: The page that was sent last time, if any.
+    :param current: The page that is being sent now.
+    :param client_version: The version of the page that the browser says it is showing.
+    :param debug: The HTML of the debug information, which is always sent in full.
+    :param full_size: The size of the full content (including debug information), for comparison.
+    :return: The JSON of the patch, or None if the full content should be sent instead.
+    """
+    if previous is None or client_version != str(previous.version) or previous.frame != current.frame:
+        return None
+    patch = json.dumps({"ops": diff_chunks(previous.chunks, current.chunks), "debug": debug})
+    if len(patch) >= full_size:
+        return None
+    return patch
@@ -0,0 +1,113 @@
+"""
+Rendering of matplotlib figures for the ``MatPlotLibPlot`` component.
+
+Rasterizing a figure is slow, and most pages show the same plot again and again (e.g., while the user
+clicks buttons that do not change the data). So each figure is first fingerprinted, by pickling all of
+its artists and their data (which is much faster than drawing them), and the rendered image is reused
+for as long as a figure with the same fingerprint keeps being shown. Rendered PNGs are served from the
+same content-addressed route as generated PIL images, instead of being embedded in the page.
+
+Expensive plots can also be drawn in a pool of separate processes (see the ``plot_processes`` setting):
+the page is then sent right away, and the request for the image waits for the drawing to finish.
+"""
+import hashlib
+import io
+import pickle
+from concurrent.futures import Future, ProcessPoolExecutor
+from threading import Lock
+from typing import Optional
+
+from drafter.caching import BoundedCache
+
+try:
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    from matplotlib.transforms import TransformNode
+    HAS_MATPLOTLIB = True
+except ImportError:
+    HAS_MATPLOTLIB = False
+
+# The rendered SVG text of recent figures, keyed by their fingerprint (PNGs are kept with the generated images)
+PLOT_RENDERS = BoundedCache(64, name="Plot renders")
+
+_plot_pool: Optional[ProcessPoolExecutor] = None
+_plot_pool_lock = Lock()
+
+
+def _fingerprint_node(name):
+    # Only used to name the stand-ins below; fingerprints are never unpickled
+    return name
+
+
+class _FingerprintPickler(pickle.Pickler):
+    """
+    Pickles a figure in a way that only depends on what it shows. Transforms normally keep their
+    parents in a dictionary keyed by ``id()``, and figures remember their pyplot number; both differ
+    between two otherwise identical figures, so they are left out.
+    """
+
+    def reducer_override(self, obj):
+        if isinstance(obj, TransformNode):
+            state = obj.__getstate__()
+            state['_parents'] = list(state['_parents'].values())
+            return _fingerprint_node, (type(obj).__name__,), state
+        if isinstance(obj, Figure):
+            state = obj.__getstate__()
+            state.pop('_number', None)
+            state.pop('_restore_to_pcf', None)
+            return _fingerprint_node, ("Figure",), state
+        return NotImplemented
+
+
+def fingerprint_figure(figure, settings: dict) -> Optional[str]:
+    """
+    Computes a fingerprint of everything that a figure shows, along with the settings it will be saved with.
+
+    :param figure: The matplotlib figure.
+    :param settings: The keyword arguments for ``savefig``.
+    :return: A hexadecimal fingerprint, or None if the figure could not be pickled (e.g., it holds a lambda).
+    """
+    output = io.BytesIO()
+    try:
+        _FingerprintPickler(output, protocol=pickle.HIGHEST_PROTOCOL).dump((figure, sorted(settings.items())))
+    except Exception:
+        return None
+    return hashlib.sha1(output.getvalue()).hexdigest()
+
+
+def render_figure(figure, settings: dict) -> bytes:
+    """
+    Saves the figure in the given format (e.g., PNG or SVG). The figure is drawn on its own Agg canvas,
+    rather than through pyplot, so that figures can be drawn in several threads at once.
+
+    :param figure: The matplotlib figure.
+    :param settings: The keyword arguments for ``savefig``.
+    :return: The bytes of the saved image.
+    """
+    canvas = figure.canvas if isinstance(figure.canvas, FigureCanvasAgg) else FigureCanvasAgg(figure)
+    output = io.BytesIO()
+    canvas.print_figure(output, **settings)
+    return output.getvalue()
+
+
+def _render_pickled_figure(pickled: bytes, settings: dict) -> bytes:
+    # Runs in a separate process, which gets its own copy of the figure
+    return render_figure(pickle.loads(pickled), settings)
+
+
+def render_figure_in_pool(figure, settings: dict, processes: int) -> Future:
+    """
+    Starts saving the figure in a separate process, so that the current thread can carry on.
+    The pool of processes is created the first time that it is needed.
+
+    :param figure: The matplotlib figure; a copy of it is sent to the other process.
+    :param settings: The keyword arguments for ``savefig``.
+    :param processes: How many processes the pool should have.
+    :return: The future bytes of the saved image.
+    """
+    global _plot_pool
+    pickled = pickle.dumps(figure)
+    with _plot_pool_lock:
+        if _plot_pool is None:
+            _plot_pool = ProcessPoolExecutor(max_workers=processes)
+    return _plot_pool.submit(_render_pickled_figure, pickled, settings)
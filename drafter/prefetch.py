@@ -0,0 +1,30 @@
+"""
+Prefetching of pages that the user is likely to visit next, used when ``prefetch_links`` is enabled.
+
+When the user hovers over a link (or it scrolls into view), the browser asks the server to prepare
+the linked page ahead of time. The server runs the route against a copy of the current state, and
+keeps the resulting ``Page`` for a few seconds. If the user then follows the link while the state is
+still the same, the prepared page is used instead of running the route again.
+"""
+from dataclasses import dataclass
+from typing import Any, List
+
+# How long a prefetched page is kept, in seconds
+PREFETCH_TTL = 15.0
+PREFETCH_MODES = ("hover", "visible")
+
+
+@dataclass
+class PrefetchedPage:
+    """
+    The result of running a route ahead of time.
+
+    :ivar page: The page that the route returned, whose state is a copy of the original state.
+    :ivar arguments: The representation of the arguments that the route was called with.
+    :ivar button_pressed: The button that was pressed to reach the route, if any.
+    :ivar conversion_record: The records of how each parameter was converted.
+    """
+    page: Any
+    arguments: str
+    button_pressed: Any
+    conversion_record: List[Any]
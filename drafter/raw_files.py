@@ -12,7 +12,7 @@ class RawFiles:
 
 RAW_FILES = {}
 RAW_FILES['global'] = RawFiles({}, {}, {})
-RAW_FILES['global'].scripts['global.js'] = 'H4sIAHSZt2cC/51Ty27bMBC8+ytYXShBLq2eZRtojQA9pD0Z6CHIQY+1zJYmBZFKYhQC8iH9iB7bc9EfyZdkqYcl1XIb1AdbpmZmZ3eHAgzRkuc5GE1WJFVJeQBpWAbmSoB91O+OGxFp/TE6gEsTlR+jWAD1wlmipDYkLo1RcgsPBvnOr++/fzw9fnt6/Ok0ACWACZW5XRHk7VRBXIGFOTKCEH+WJw9MgMzMHg993yNfZwQ/iUoBkR3kht8yg+U2Shr0F9aYxWL4OrGGr7k2LEpTl+7FZ42GEUQixMiU2DZa58QokhdATJTVSkMdLiUU77cfrrE8Xbb4WnzlWInXzZGzpn4/Bp8uF82/NSX+tN4FL2cGLqxhVNy7CW5tn1d3CLNNAxZBiODJF2dOdqVMDEffbjdP+zF7rhs77eboBiW5zBij4QklozueRUYVOFGexyoqUnZfcAOW5Nq9eOHfJTmkrwaC7QhXNbg/1mC2/ACqNO603Z47qtAPvdeq5uRNEARefVChv2o2s2GDhzySqc3ui4Lew23UcVtv5ZFoPCP33OzRPwwUm0zgGyFIjFEqCwkp4RKj5TDGcAuRXTSSY4vFxUBqNfF9I1LrFYDXSe3q56QJN5u8LINWpu7LuFukDfAYqvAEaouMEOdXi++I29lpqpG1HfFwP9N8FO6IGpsGN5g3RJ9QNgragK/NEb+TstDYOYYoVzhHKKbBZ7Gn9XTppdh3/Uz7ZXgd9Sdcr1vb8/5kvqTTcMSoCAgN/yHzr4HV4n3m22tYzapn+KNMMNEFAAA='
+RAW_FILES['global'].scripts['global.js'] = 'H4sIAD3s1WoC/61aXXLcxhF+5ylGTErAlpYQnaq8kKZskqJiJbTIEmknKYalwgKzXIhYzHoG4HpLZi6QxxwgV8wR0t3zgxn8LOkkfLC1QE/PTP9+3Y1MVKpms6auRXXNf67ZEdv997/++Y/dw52deVNldSEqpnjdrE7FapPOSq5iKUQ9YV92GPyVvGaqKlYrXitYi6+SO16flXzJq1qdbE7LVKkP6ZLHUWY4RJNDWjsXksXIoICV+4fwv68dr6Tk1V29gIevXtm97H6ZyDmssKQ3xW1Sw9FPRVXDnoeO9vVrnyTDg5wXqk7SPI+jRflZwUGAiKVAU+UMj2ckwWrBVpKzOr1z3HxeRVVx+d319+dwjOhrs4Y2ONpFNnv60e6b6FUr2lfR16/1rzcRezXMb+Q8g4cYEXNwgMnN/i3e9+wByPDyHDYCkrLI7nenzGk49mWMf/WiUPpYxioi1H9R3SVJdBhQVulDcZfWQoKEi9VMpDJP1rKoOS6MUVeTw6dZFzx/0WGMqjaiPaJF4WswyutiyUVTx+PXwD/NI9ixVUrI83HKvtrf35+4h4/m7I87jzs7oJrjasPUKq3YuqgXcCjO+M/wM0ez1gYAb8qSzcB2GlnxnBUV2NJukiQg7hS1CotnSAsa4DnyhPeaCfGTHPxRzOnfmbbopOOJZ27Lvi+2x3nSHVvSbQ7pMdzmk54Yjvw1YKiHHeelOwVUw+5bzFlsJaB3Zm9QPV0dD/OBDexiBbLm8f5UL37FoqRnxB4PVW/gv1kjFUgDjHMlQIVcji/ouVdEyo22uZe93/DZE3B/9WewsJiOOhla/ZybH/ZWPTJeKv5fsnuOILWzBL8893/sOVNRrZpae1PK8rRO92Z1ud5TPJUZPKprWYCzclYoeH/FS57VJ+Jn435CsGUKTMQKpazQkxSIDnmn4ERVxqdMCbbmLFX35FGKywcuydCXaZ0tIKC51akikgZoWL1Zgb13/O6KDjWSA9t31u9+arjc6CMLeVyWcUSXvene8nZrPmz5bnO/lgwTY7um5364eQmGCmS5yBqMCl6AONm8z+N2Ob45tiqII1wHxhgyLItlUQebJrgHCCzBO2qZnSNRuA5THEr/iFVNWbbvPD59xyIBbnWsrIT1Ni+YPTr5p9352SkED9zI8qlrokt889MRZndeYeb74eP7U7FciQpu4cv1IS0bDh406IbRS5LpGBt6Oel73ZyDPcdwykkCZlx5N4KUAmsVHwsjkmOuYpYs+axEFQ/s8NjjbFxnjLE1tkTyVZlm/HRRlLkEDhA3zNJkma56DMf4uWSjrdW34UzytObGjONI84kGLuGCnSbVqgBOesU4vRGSWTZM9zgZllqGoca7JZdSyLFLQrBVAmyEiGLARk2Zs0pYH6cYZYR3AK6geQ1t24c2v9/3Y3EH2lxU5Qa8ubqnOCpgG8lW6R3EM0IjEIAVgDqLX+aiLMUa8A1GYnAgkE8pUvIriGKAnckceX5ICAcj74pnRVoalmDF99ziHYoi1f2EqTqVJhns7u3tEl5aNoiH8GyyAdgF9mexkxeeC3UFZzsHJrHmpEVrdPYCnyXAG8IZe/nS/F6kyottuVhXeIFoghREIGRxVwD2PDqCI1VAkJQCNAn72VcvXzppap5hvFyAFKJJQrcy6fw3aJJa3u/nfkbiFQaG3EkOBDnF9xURaaHVi7Q2GiJQgnpKoUqBNSv4f87SBU9zUhdENdxjbRlQUlsI2AnUifvBwyW4m5xCBma7D4UqYPtdtoRoM8VMqASIVWfEDW2iMgkqt4D2oeDrSbKTUfV4+fHs3dn16Xefvjs7fnv2EUHTX/beynQOsGnv0lwIcAKFffPze13Dxc6Bg2wJuAejqpcq7TpIluyXX9gXE3wP2JdHcDA/FNsNw/14/oMsMTVXfA04osb45r+/mBlF2HzUGpclCUwLwVvIGw0q1pYFzwPMpu3QuhvloHApVqTtUoMG3J70dMq+oHZBgXDnm47Ibw9Y9FX0+JxQMxpe7JGcwXWjy6M23RATXbb2GmAilM8LX9nb5eGLU5sGeF1kzDIip+1pCh5G7xGaK04Hsi8iNGntsf6mQ5oGWxji4MuvAnfmvQxnHicA2c7SUODwZjMK9/FlUqh2U0AnI3mge96kqYT+p2GjA9pIinNG+wTtFqw+8RU0gmjTG7RNcMoBSfju4kyC7DkrhYIy13i59ugXvRgOD4l6ldaLCirWIJC+3tvr10W+XYWXI0Z9PLkUEBg5lXfbQGUYAfoi6lqwVdkYH6dSq9Au3y3+Bo4ZONpQb+6wfdPrFXjvevWM967n13SW9gg2bsNzTDQn1FBR/UJuXvAyV14hR6m84pBIlFhy2+kwZKJNdywmoFOZvGdgRCHBEpFNmmV8VasJFXhESYDFbgcJKy+UTqmfEUGUApAJr0Rzh3UjoMj0geskiODFnEI1s2WhFGZ4k9rOj0/Ozj9dnV0efzy+vqDU9ttv//7tbyGbaYI/Xl18+PT27PTi7dmnq79+f3JxrmnwuabzUco7PN4HuDzPYzTpqTnwVG9d163NoD31rL5r9Abg1LLh3WjaXds/aMAJyTEi0ioq8/sLTAFq44JuJbi9iiormxxMqSOzYBus+uUdWQ7hyhR0Lesia8pUmq7cFFBLgbW/9IwFccecQaFZ6CId7ELDoTVgFHArpXgelJc3ZTrjJUAZs9utu9yqLOruGafsd577GakSB0pETjmmWoDMo/VGOd9uEcZLzcMjw921FznM0w9IeqcgGHGkCFoN9jTYQ3ugvox9ctjm3pYK4mh7AR8pvdPOgjdsqpzPi4rn29M0bm9crEVS25gbcUfM9Q2oCWFd84jdmP7EsZTpJplLsdQXNhkrMfWWGkow5l03x9jKjkwaVGWrxRe+JglSWEp3Hg/QE6gPPdZnPOS5PZDQZX/keaqrkc3LZNWohbvSUC54VtPbsXuWuEZOOU/BsweQwJRhAQn/w2uYyD9SxqBXQ7VnhgMFujVVMzOTKLC006UMFReoH8odlHR0pxzocQPDGVsIgLg0FYV03BZt0HaUTRDH5HGoIwf+RFskkhTMW7I7nFOZdkQ+Rf4FhHFTNrU1LK5cLwAnuw4Di3VuK0ukLIALNYr1TaA4KjAbYQID85UbXaMmyB+jLxwKkXVHGvZqy3TjToFH2+hLuitkiwYFBdvaq1Log9Rd3WEZbKqw44/X74/Ph4swrQ6XtX48+3j1HsL7EO2PgEyxd6Lro1ZyXrPlqVpN70Z9TeLRSAnLDGPTT9ZMv2n/HUQPS3vQRiZTr2neH5wk36VFYLQo8iutDgbxlaMdSUr77dAuF1TxyKay8GHDFgQIBPY2JNfdpDyoAbHE/sDXpiseYLARcKytYhAbizLXh+w2csGg9YstzS3Lt/VQL3o6zonDXIPB073txgN3gkT53QxHb8Jf+1s3M4dRccssnCi0pxwc/bSvjasShHHMvIK0BawOGHdQ8zpdnVobs/Mke2ewlevWDwEtAbKEXG1di6wDBwwAlCH4SL87g0ikEoQr4QWUEfOmHCrtqSFtu6mtsfsT5GBa07c0t8i1jlCVTKy4JA+w4Uz5wQJtwfTTcL4IMSqGe1XNcsaxUzTjYBGc7qbvCrGLgg4GVATdFBqtb2CITlcYf3PNuEwV8Z0XUvnjSSTaXFILgiKeD1tgw6Xv+90ogu8jDySYixz5xo00SWa6yGDVRVkH1Tq9GgDI9Nz7AsAcQsURBSzaKupYVTCNodskYmWHMGyPfYUDmjd6ULO31/XjG5L9FCU/1XHo1mfTm8ug0cCdMgTh+uY3sPQWwVs4H9EvDUZvNxlycSLtDUjwIbjVUkDdOeK1eKCaL8Gqar4lDlkSPxLZZ4GB0/2Tz6Ko4uhvQVeeDAPg+yLUs+NiJ49O5+1SsgXQIZf1CVlzb9W0laq/Drdz0uq526SLd3M+a+62GS4lrD0is1dDGEoPAmiGDzqS97pfZBq9RX7EwKse55/B1asaJQvWSxcH9UPF4DM49LteY+Fk6z384YCzKDg7xwBCsdYJuZHl1MagoE6ptfl8Qb4HzNE/6Nx+0MEFj3rHGsBTiOc7rO3fAhxZyI3NEFe4W0x7TlkU0bF88x4afFsWCL2fWm9qXuqvDrRVTSahzgXWpDibnhV3GCTvOV9hSxKjs9mREsudwDQyS7N7/c2IRp9U5GowGHbOnhBDeweMF1uuEGjUIFIekxLNWAm16TUx7aTOtJ9Rozch2DTt59b2O4jvxViF2WF9E+JSjJghJ99p3LzTnftZg8/usBPxR9xbiU+7kkabvi8qxJputTk4Dn7iUCadXiupEFcPtXvBeC6lmEHpBLm20k13MiXbC6GvHzIB4Y3XXkliChGxrnosXcwGmDA4zHUE9K2WvvAWKmrZDvHZZn9OTKEhjrVr+/1olJoWOY4DKMJFQwLchrn8Pw+fYHsrgdCozN2749KxD2VCPDkgtvAGvdpn0HRCu6fWt1f3hDLrhOAOnAyFPtVVUeeEZpqpJ3rXAj/oGRwM/y/TJAplthynY5Qu2uHYkgFctiFvaIw9XueFLRSKVHE4obIfjmnQ7GbBTwmuO+TVUzfb6gi84dc37joo2O9xhTME/QZ0nzZlfSnpJ9wbLGJMJDg8aS/koC3u9GsmJM/pLIbfwsRBN61tA4aTdTxHmunPMSZQ8Ld0+OZYC+tAwzlN1/9iyXQb3wHNW/ip7xbKbeQs1HXtCAE5Jvoj2ziknHZbvZMhUWnRrLRu3mpN+dEmTKpflrxeiBxS5OXF1TVYyEzkmwM6xOO2oRMJRHIAaaq+olO1hx301qeNtP9d4qCNYl+uY6PtyM5N/P4fZks7jdivHQKGzUraxnwVjLBiH5frp1ktyz9BteoegODT4IFaFPM6eJKW5ne37xvOIp/vRs+2DX+w7yzkD2fX0VajGIpRoCrHbItdmKV9q1hBPYqJe7thtErWuB4b6+1Pqh3GcV4/cXbXdlJU2JihTuh9JdYAg2Y4rzOtX/xUWucX6lQUiuZCWVphBppxXRJ5g6HBhOyf5MGHmaMwoKsEncXikQHufwC6Fqg7YjEAAA=='
 RAW_FILES['global'].styles['diff.css'] = 'H4sIAHSZt2cC/22O3WrDMAxG7/MUgrG7ZXgwKDiXe5AhR7Yj5p+iKKyj5N3nds26QT7dScf+jqJL/pk4BDh30BJq0T5g5vRl3+oi7OVp9sJhuJ5dFfJisyde8s8qo0QuvauqNVt49bf9J5NOFl6MeRy6tbuWvE8e23s4Oxw/otSlUD/WVMU+eHOZtVP6T4L6k/aYOBYrHCcdoEF3baWb+RGJuEQL5nj6K/tr1vYw18QELrX6u1RpDXtKo7nMRrXv9yDEEBA3aJziHhRaDocNmhe3D2HL+g2qdw3skwEAAA=='
 RAW_FILES['global'].styles['global.css'] = 'H4sIAHSZt2cC/31Sy26DMBC88xWWenbUSD2ZMx/ix2KsGK9llgKK+u8xwUloi7I37+7Mzmhs3PdJkZ+4ATVadtIYF65GIgzsWrG1Wo+SBEvOdlRvLT2mAZNgEV0gSKWrpL7YhGMwXKNf51PnCMo0SmNcsIJ9xTm3fqrKPG5rDCRdgFROPlfP0G9ohclAJjzHmQ3onWF+lWMTLHW1p+pAmifPW9RrgSvMfnvBPu/KDp18NE1T78VxDy3tFLbZA59g5ReZ15vful4WXW+LPOOG6OWS1z3qy6GP7ZFgACqg/2kchvE2iz9R5CKYKX8BjUmSwyBYwFCWC1x5edd4A7xoHn8xAgAA'
 RAW_FILES['skeleton'] = RawFiles({"credit": "<a href='http://getskeleton.com/' target='_blank'>Skeleton</a> by Dave Gamache"}, {}, {})
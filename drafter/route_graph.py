@@ -0,0 +1,107 @@
+"""
+Static analysis of route functions, used to find broken links before anyone visits a page.
+
+Each route function's source code is parsed, and any ``Button``, ``Link``, or ``Image`` calls that
+have a literal string or a function name as their target are collected. Targets that are computed
+at runtime (e.g., from the state) cannot be known ahead of time, so they are simply skipped; those
+are still verified when the page is actually rendered.
+"""
+import ast
+import inspect
+import textwrap
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from drafter.urls import friendly_urls, check_invalid_external_url
+
+# Maps each component name to the position of its target argument
+LINKING_COMPONENTS = {"Button": 1, "SubmitButton": 1, "Link": 1}
+IMAGE_COMPONENTS = {"Image": 0, "Picture": 0}
+
+
+@dataclass
+class RouteTarget:
+    """
+    A target of a ``Button``, ``Link``, or ``Image`` that was found in a route function's source code.
+
+    :ivar kind: The name of the component (e.g., ``"Button"``).
+    :ivar url: The URL that the component will point to, as it will be rendered.
+    :ivar line: The line number in the original file where the component was created, if known.
+    :ivar is_image: Whether the target is an image file, rather than another page.
+    """
+    kind: str
+    url: str
+    line: Optional[int]
+    is_image: bool = False
+
+
+def _component_name(call: ast.Call) -> Optional[str]:
+    if isinstance(call.func, ast.Name):
+        return call.func.id
+    if isinstance(call.func, ast.Attribute):
+        return call.func.attr
+    return None
+
+
+def _target_argument(call: ast.Call, position: int) -> Optional[ast.expr]:
+    for keyword in call.keywords:
+        if keyword.arg == "url":
+            return keyword.value
+    if len(call.args) > position:
+        return call.args[position]
+    return None
+
+
+def _resolve_target(node: ast.expr, namespace: dict) -> Optional[str]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.Name):
+        value = namespace.get(node.id)
+        if isinstance(value, str):
+            return value
+        if callable(value) and hasattr(value, "__name__"):
+            return value.__name__
+    return None
+
+
+def find_route_targets(function: Callable) -> List[RouteTarget]:
+    """
+    Finds all of the statically known targets of the ``Button``, ``Link``, and ``Image``
+    components created in the given function. If the source code of the function is not
+    available, then no targets are found.
+
+    :param function: The (original, undecorated) route function to analyze.
+    :type function: Callable
+    :return: The targets that could be determined without running the function.
+    :rtype: list[RouteTarget]
+    """
+    try:
+        source_lines, first_line = inspect.getsourcelines(function)
+        tree = ast.parse(textwrap.dedent("".join(source_lines)))
+        closure = inspect.getclosurevars(function)
+    except (OSError, TypeError, SyntaxError, ValueError):
+        return []
+    namespace = {**getattr(function, "__globals__", {}), **closure.nonlocals}
+
+    targets = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Call):
+            continue
+        name = _component_name(node)
+        is_image = name in IMAGE_COMPONENTS
+        if name in LINKING_COMPONENTS:
+            position = LINKING_COMPONENTS[name]
+        elif is_image:
+            position = IMAGE_COMPONENTS[name]
+        else:
+            continue
+        argument = _target_argument(node, position)
+        target = _resolve_target(argument, namespace) if argument is not None else None
+        if target is None:
+            continue
+        if not is_image and not check_invalid_external_url(target):
+            target = friendly_urls(target)
+        line = first_line + node.lineno - 1 if first_line else None
+        targets.append(RouteTarget(name, target, line, is_image))
+    targets.sort(key=lambda found: found.line or 0)
+    return targets
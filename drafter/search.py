@@ -0,0 +1,100 @@
+"""
+Server-side searching of large option lists (e.g., for a ``SelectBox`` with thousands of options).
+
+Instead of sending every option to the browser, the page only includes the first few options,
+and the browser asks the server for more matches as the user types. The matching uses a
+prefix index that is built once per list of options and then cached.
+"""
+import hashlib
+from bisect import bisect_left
+from typing import List, Optional, Sequence, Tuple
+
+from drafter.caching import BoundedCache
+
+SEARCH_ROUTE = "/--select-search"
+DEFAULT_SEARCH_RESULTS = 20
+MAXIMUM_SEARCH_RESULTS = 200
+
+
+class OptionIndex:
+    """
+    A case-insensitive prefix index over a fixed list of options. The options are sorted once
+    when the index is built, so that each search is just a binary search followed by a short scan.
+
+    :param options: The options to index; these should already be strings.
+    :type options: tuple[str, ...]
+    :param key: The key used to refer to this index in search URLs.
+    :type key: str
+    """
+
+    def __init__(self, options: Tuple[str, ...], key: str):
+        self.options = options
+        self.key = key
+        entries = sorted((option.casefold(), position) for position, option in enumerate(options))
+        self._folded = [folded for folded, _ in entries]
+        self._positions = [position for _, position in entries]
+
+    def search(self, prefix: str, limit: int = DEFAULT_SEARCH_RESULTS) -> List[str]:
+        """
+        Finds the options that start with the given prefix (ignoring case), in alphabetical order.
+
+        :param prefix: The text that the options should start with.
+        :type prefix: str
+        :param limit: The maximum number of options to return.
+        :type limit: int
+        :return: Up to ``limit`` matching options.
+        :rtype: list[str]
+        """
+        if not prefix:
+            return list(self.options[:limit])
+        prefix = prefix.casefold()
+        results = []
+        for position in range(bisect_left(self._folded, prefix), len(self._folded)):
+            if len(results) >= limit or not self._folded[position].startswith(prefix):
+                break
+            results.append(self.options[self._positions[position]])
+        return results
+
+    @property
+    def url(self) -> str:
+        return f"{SEARCH_ROUTE}/{self.key}"
+
+
+OPTION_INDEXES = BoundedCache(64, name="SelectBox option indexes")
+
+
+def get_option_index(options: Sequence[str]) -> OptionIndex:
+    """
+    Gets the prefix index for the given options, building it only if an identical list of
+    options has not been indexed recently.
+
+    :param options: The options to index.
+    :type options: Sequence[str]
+    :return: The (possibly cached) index of the options.
+    :rtype: OptionIndex
+    """
+    options = tuple(options)
+    # A digest of the content (unlike ``hash``) is the same in every process, so search URLs stay valid
+    # across server processes and restarts, as long as the same options are indexed again
+    key = hashlib.sha1("\0".join(options).encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    index = OPTION_INDEXES.get(key)
+    # Guard against options that only differ in where their NUL characters are;
+    # comparing identical string objects is only a pointer check
+    if index is None or index.options != options:
+        index = OPTION_INDEXES.set(key, OptionIndex(options, key))
+    return index
+
+
+def search_options(key: str, prefix: str, limit: int = DEFAULT_SEARCH_RESULTS) -> Optional[List[str]]:
+    """
+    Searches a previously indexed list of options.
+
+    :param key: The key of the index, as given in its ``url``.
+    :param prefix: The text that the options should start with.
+    :param limit: The maximum number of options to return.
+    :return: The matching options, or None if the index is no longer cached.
+    """
+    index = OPTION_INDEXES.get(key)
+    if index is None:
+        return None
+    return index.search(prefix, limit)
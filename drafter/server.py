@@ -1,4 +1,9 @@
+import copy
+import email.utils
+import gzip
+import hashlib
 import html
+import mimetypes
 import os
 import traceback
 from dataclasses import dataclass, asdict, replace, field, fields
@@ -6,37 +11,73 @@ from functools import wraps
 from typing import Any, Optional, List, Tuple
 import json
 import inspect
+import itertools
 import pathlib
+import secrets
+from concurrent.futures import ThreadPoolExecutor
 
 import bottle
 
 from drafter import friendly_urls, PageContent
 from drafter.configuration import ServerConfiguration
-from drafter.constants import RESTORABLE_STATE_KEY, SUBMIT_BUTTON_KEY, PREVIOUSLY_PRESSED_BUTTON
+from drafter.constants import RESTORABLE_STATE_KEY, SUBMIT_BUTTON_KEY, PREVIOUSLY_PRESSED_BUTTON, \
+    PARTIAL_NAVIGATION_HEADER, PAGE_VERSION_HEADER, PREFETCH_HEADER, RESULT_PAGE_ROUTE
 from drafter.debug import DebugInformation
-from drafter.setup import Bottle, abort, request, static_file
+from drafter.setup import Bottle, abort, redirect, request, response, static_file
 from drafter.history import VisitedPage, rehydrate_json, dehydrate_json, ConversionRecord, UnchangedRecord, get_params, \
-    remap_hidden_form_parameters, safe_repr
+    remap_hidden_form_parameters, safe_repr, parse_button_pressed
 from drafter.page import Page
+from drafter.patching import RenderedPage, mark_chunks, make_patch
+from drafter.prefetch import PrefetchedPage, PREFETCH_MODES, PREFETCH_TTL
 from drafter.files import TEMPLATE_200, TEMPLATE_404, TEMPLATE_500, INCLUDE_STYLES, TEMPLATE_200_WITHOUT_HEADER, \
     TEMPLATE_SKULPT_DEPLOY, seek_file_by_line
 from drafter.raw_files import get_raw_files, get_themes
-from drafter.urls import remove_url_query_params
-from drafter.image_support import HAS_PILLOW, PILImage
+from drafter.urls import remove_url_query_params, check_invalid_external_url, OTHER_SCHEME_REGEX
+from drafter.image_support import HAS_PILLOW, PILImage, GENERATED_IMAGE_ROUTE, get_generated_image, \
+    DERIVATIVE_FORMATS, parse_derivative_request, make_image_derivative, make_file_etag, etag_matches, \
+    open_limited_image
+from drafter.route_graph import find_route_targets
+from drafter.downloads import DOWNLOAD_ROUTE, take_download, make_content_disposition, iterate_bytes
+from drafter.uploads import check_upload_size, open_upload, read_upload_text, view_upload, save_upload, \
+    is_file_like_type, is_list_type, get_upload_list, convert_uploads
+from drafter.caching import BoundedCache, GenerationalCache
+from drafter.blobs import BLOBS
+from drafter.search import SEARCH_ROUTE, DEFAULT_SEARCH_RESULTS, MAXIMUM_SEARCH_RESULTS, search_options
 
 import logging
 logger = logging.getLogger('drafter')
 
 
 DEFAULT_ALLOWED_EXTENSIONS = ('py', 'js', 'css', 'txt', 'json', 'csv', 'html', 'md')
+# The routes that the server adds on its own (see ``Server.setup``), which links are allowed to point to
+SPECIAL_ROUTES = ("/--reset", "/--test-deployment")
+SPECIAL_ROUTE_PREFIXES = (RESULT_PAGE_ROUTE, f"{SEARCH_ROUTE}/", f"{GENERATED_IMAGE_ROUTE}/", f"{DOWNLOAD_ROUTE}/")
+# Folders that never hold files the website needs, but can hold a great many files
+EXCLUDED_DIRECTORIES = ('.git', '.hg', '.svn', '__pycache__', 'venv', '.venv', 'env', 'node_modules',
+                        '.mypy_cache', '.pytest_cache', '.tox', '.idea', '.vscode')
 
-def bundle_files_into_js(main_file, root_path, allowed_extensions=DEFAULT_ALLOWED_EXTENSIONS):
+
+def make_bundled_file_js(filename, contents):
+    """
+    Creates the line of JavaScript that adds a file to Skulpt's virtual file system. The name and contents
+    are written as JSON strings, with ``</`` escaped so that a file can never end the surrounding script tag.
+
+    :param filename: The name of the file, as Skulpt will see it.
+    :param contents: The text of the file.
+    :return: The line of JavaScript.
+    """
+    filename, contents = (json.dumps(value).replace("</", "<\\/") for value in (filename, contents))
+    return f"Sk.builtinFiles.files[{filename}] = {contents};\n"
+
+
+def bundle_files_into_js(main_file, root_path, allowed_extensions=DEFAULT_ALLOWED_EXTENSIONS, cache=None):
     """
     Bundles all files from a specified directory into a JavaScript-compatible format
     for Skulpt, a Python-to-JavaScript transpiler. The function traverses through the
     given directory, reads files with extensions present in the allowed extensions list,
     and aggregates them into a JavaScript code snippet. It also identifies files to be
-    skipped and keeps a record of successfully added files.
+    skipped and keeps a record of successfully added files. Folders like ``.git``,
+    ``venv``, and ``__pycache__`` (see ``EXCLUDED_DIRECTORIES``) are not searched at all.
 
     :param main_file: The path to the main Python file. This file will be labeled
         as "main.py" in the JavaScript output.
@@ -46,6 +87,9 @@ def bundle_files_into_js(main_file, root_path, allowed_extensions=DEFAULT_ALLOWE
     :param allowed_extensions: A collection of file extensions allowed for inclusion
         in the final JavaScript output. Defaults to a predefined set.
     :type allowed_extensions: set[str]
+    :param cache: If given, a dictionary that remembers each file's modification time, size, and
+        JavaScript from an earlier bundle, so that unchanged files are not read again. It is updated in place.
+    :type cache: dict
     :return: A tuple containing:
         - The combined JavaScript output string with file contents.
         - A list of skipped files that do not match the allowed extensions.
@@ -53,27 +97,53 @@ def bundle_files_into_js(main_file, root_path, allowed_extensions=DEFAULT_ALLOWE
     :rtype: tuple[str, list[str], list[str]]
     """
     skipped_files, added_files = [], []
-    all_files = {}
+    previous = dict(cache) if cache is not None else {}
+    if cache is not None:
+        cache.clear()
+    js_lines = []
     for root, dirs, files in os.walk(root_path):
-        for file in files:
-            is_main = os.path.join(root_path, file) == main_file
-            path = pathlib.Path(os.path.join(root, file)).relative_to(root_path)
+        # Sorted, so that the same files always give the same bundle
+        dirs[:] = sorted(directory for directory in dirs if directory not in EXCLUDED_DIRECTORIES)
+        for file in sorted(files):
+            full_path = os.path.join(root, file)
             if pathlib.Path(file).suffix[1:].lower() not in allowed_extensions:
-                skipped_files.append(os.path.join(root, file))
+                skipped_files.append(full_path)
                 continue
-            with open(os.path.join(root, file), 'r', encoding='utf-8') as f:
-                content = f.read()
+            is_main = os.path.join(root_path, file) == main_file
+            stat = os.stat(full_path)
+            signature = (stat.st_mtime_ns, stat.st_size, is_main)
+            entry = previous.get(full_path)
+            if entry is None or entry[0] != signature:
+                with open(full_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                path = pathlib.Path(full_path).relative_to(root_path)
                 filename = str(path.as_posix()) if not is_main else "main.py"
-                all_files[filename] = content
-                added_files.append(os.path.join(root, file))
-
-    js_lines = []
-    for filename, contents in all_files.items():
-        js_lines.append(f"Sk.builtinFiles.files[{filename!r}] = {contents!r};\n")
+                entry = (signature, make_bundled_file_js(filename, content))
+            if cache is not None:
+                cache[full_path] = entry
+            js_lines.append(entry[1])
+            added_files.append(full_path)
 
     return "\n".join(js_lines), skipped_files, added_files
 
 
+@dataclass
+class DeploymentPage:
+    """
+    The most recently built page for ``/--test-deployment``, kept so that it is only rebuilt
+    (and compressed) when the bundled files change.
+
+    :ivar bundled_js: The bundled files that the page was built from.
+    :ivar html: The page itself.
+    :ivar etag: The ETag of the page.
+    :ivar compressed: The page compressed with gzip, once it has been asked for.
+    """
+    bundled_js: str
+    html: str
+    etag: str
+    compressed: Optional[bytes] = None
+
+
 class Server:
     """
     Represents a server capable of managing routes, states, configurations, and error handling
@@ -110,6 +180,18 @@ class Server:
     :type app: Bottle or None
     :ivar _custom_name: Custom name for the server instance, used in string representations.
     :type _custom_name: str or None
+    :ivar route_graph: Maps each route URL to the URLs its buttons, links, and images are known to point to.
+    :type route_graph: dict
+    :ivar _verified_targets: The URLs in the ``route_graph`` that were proven valid, which are not checked again.
+    :type _verified_targets: set
+    :ivar _render_caches: The rendered HTML of each route's components from its previous render.
+    :type _render_caches: dict
+    :ivar _last_render: The page most recently sent to the browser, when patch navigation is enabled.
+    :type _last_render: RenderedPage or None
+    :ivar _prefetched_pages: Pages that were prepared ahead of time, keyed by their URL and the state they started from.
+    :type _prefetched_pages: BoundedCache
+    :ivar _result_pages: Pages created by form submissions, kept so that they can be shown again after a redirect.
+    :type _result_pages: BoundedCache
     """
     _page_history: List[Tuple[VisitedPage, Any]]
     _custom_name = None
@@ -117,6 +199,7 @@ class Server:
     def __init__(self, _custom_name=None, **kwargs):
         self.routes = {}
         self._handle_route = {}
+        self._url_problems = BoundedCache(1024, name="URL checks")
         self.configuration = ServerConfiguration(**kwargs)
         self._state = None
         self._initial_state = None
@@ -128,6 +211,17 @@ class Server:
         self.original_routes = []
         self.app = None
         self._custom_name = _custom_name
+        self.route_graph = {}
+        self._verified_targets = set()
+        self._render_caches = {}
+        self._last_render = None
+        self._prefetched_pages = BoundedCache(32, name="Prefetched pages", ttl=PREFETCH_TTL)
+        self._result_pages = BoundedCache(64, name="Result pages")
+        self._render_versions = itertools.count(1)
+        self._upload_pool = None
+        self._deployment_main_file = None
+        self._deployment_files = {}
+        self._deployment_page = None
 
     def __repr__(self):
         """
@@ -229,9 +323,81 @@ class Server:
             raise ValueError(f"URL `{url}` already exists for an existing routed function: `{func.__name__}`")
         self.original_routes.append((url, func))
         url = friendly_urls(url)
+        self.configuration.route_fields[url] = self._find_route_fields(func)
         func = self.make_bottle_page(func)
         self.routes[url] = func
         self._handle_route[url] = self._handle_route[func] = func
+        self._url_problems.clear()
+
+    @staticmethod
+    def _find_route_fields(func) -> Optional[Tuple[str, ...]]:
+        try:
+            parameters = inspect.signature(func).parameters.values()
+        except (TypeError, ValueError):
+            return None
+        if any(parameter.kind == inspect.Parameter.VAR_KEYWORD for parameter in parameters):
+            return None
+        return tuple(parameter.name for parameter in parameters if parameter.name != 'state')
+
+    def get_route_fields(self, url: str) -> Optional[Tuple[str, ...]]:
+        """
+        Finds the names of the parameters accepted by the route at the given URL, so that a button
+        targeting that route only needs to send those fields.
+
+        :param url: The URL of the route (any query parameters are ignored).
+        :return: The parameter names, or None if the route is unknown or accepts arbitrary keyword arguments.
+        """
+        return self.configuration.route_fields.get(friendly_urls(url.split('?', 1)[0]))
+
+    def check_url(self, url: str) -> Optional[str]:
+        """
+        Checks whether a link or button's URL refers to one of this server's routes (including the
+        special ``--`` routes, like ``--reset``), or else to a valid external website. Fragments
+        (``#top``) are ignored, and URLs with other schemes (like ``mailto:``) are left to the browser.
+        Targets that ``verify_route_graph`` already proved valid are accepted right away; other results
+        are cached for each URL, since the same links tend to be checked on every page load, and that
+        cache is cleared whenever a new route is added.
+
+        :param url: The URL to check.
+        :type url: str
+        :return: An empty string if the URL is valid, ``None`` if it refers to a page that does not
+            exist, or otherwise a description of why the external URL is invalid.
+        :rtype: Optional[str]
+        """
+        if url in self._verified_targets:
+            return ""
+        problem = self._url_problems.get(url, False)
+        if problem is not False:
+            return problem
+        path = url.split('#', 1)[0].split('?', 1)[0]
+        if path:
+            path = friendly_urls(path)
+        if (url in self._handle_route or path in self._handle_route or not path or (path == '/' and self.routes)
+                or self.is_special_route(path) or OTHER_SCHEME_REGEX.match(path)):
+            problem = ""
+        else:
+            invalid_external_url_reason = check_invalid_external_url(url)
+            if invalid_external_url_reason == "is a valid external url":
+                problem = ""
+            elif invalid_external_url_reason:
+                problem = invalid_external_url_reason
+            else:
+                problem = None
+        return self._url_problems.set(url, problem)
+
+    def is_special_route(self, path: str) -> bool:
+        """
+        Determines whether the path refers to one of the routes that the server adds on its own,
+        like ``/--reset``, rather than to one of the user's routes.
+
+        :param path: The path of the URL, without any query parameters.
+        :type path: str
+        :return: Whether the path is one of the special routes.
+        :rtype: bool
+        """
+        if path == "/--test-deployment" and self.configuration.skulpt:
+            return False
+        return path in SPECIAL_ROUTES or path.startswith(SPECIAL_ROUTE_PREFIXES)
 
     def reset(self):
         """
@@ -249,6 +415,14 @@ class Server:
         self._conversion_record.clear()
         return self.routes['/']()
 
+    def apply_blob_folder(self):
+        """
+        Makes the blob store (which holds the large images and bytes in the state) keep its files
+        in the configured ``blob_folder``, if there is one.
+        """
+        if self.configuration.blob_folder:
+            BLOBS.use_folder(self.configuration.blob_folder)
+
     def setup(self, initial_state=None):
         """
         Initializes and configures the application. Sets up initial state, error
@@ -257,10 +431,15 @@ class Server:
         :param initial_state: The initial state to set up the application.
         :type initial_state: Any
         """
+        self.apply_blob_folder()
         self._state = initial_state
         self._initial_state = self.dump_state()
         self._initial_state_type = type(initial_state)
         self.app = Bottle()
+        self._render_caches.clear()
+        self._last_render = None
+        self._prefetched_pages.clear()
+        self._result_pages.clear()
 
         # Setup error pages
         def handle_404(error):
@@ -305,9 +484,14 @@ class Server:
         if not self.routes:
             raise ValueError("No routes have been defined.\nDid you remember the @route decorator?")
         self.app.route("/--reset", 'GET', self.reset)
+        # Always available, since post_redirect_get can still be turned on when the server is run
+        self.app.route(f"{RESULT_PAGE_ROUTE}<token>", 'GET', self.serve_result_page)
         # If not skulpt, then allow them to test the deployment
         if not self.configuration.skulpt:
             self.app.route("/--test-deployment", 'GET', self.test_deployment)
+        self.app.route(f"{SEARCH_ROUTE}/<key>", 'GET', self.search_options)
+        self.app.route(f"{GENERATED_IMAGE_ROUTE}/<key>.png", 'GET', self.serve_generated_image)
+        self.app.route(f"{DOWNLOAD_ROUTE}/<token>/<filename:path>", 'GET', self.serve_download)
         for url, func in self.routes.items():
             self.app.route(url, 'GET', func)
             self.app.route(url, "POST", func)
@@ -315,6 +499,62 @@ class Server:
             first_route = list(self.routes.values())[0]
             self.app.route('/', 'GET', first_route)
         self.handle_images()
+        self.verify_route_graph()
+
+    def verify_route_graph(self):
+        """
+        Statically analyzes every route function to find the pages and images that its buttons, links,
+        and images point to, building up the ``route_graph``. Any targets that do not exist are reported
+        right away, rather than waiting until someone happens to visit the page. Targets that are proven
+        valid are remembered, so ``check_url`` does not need to check them again on each request.
+
+        :return: A list of warnings about targets that do not exist.
+        :rtype: list[str]
+        """
+        warnings = []
+        self.route_graph.clear()
+        self._verified_targets.clear()
+        for url, original_function in self.original_routes:
+            url = friendly_urls(url)
+            self.route_graph[url] = set()
+            for target in find_route_targets(original_function):
+                self.route_graph[url].add(target.url)
+                if target.is_image:
+                    problem = self.check_image_path(target.url)
+                else:
+                    problem = self.check_url(target.url)
+                    if problem is None:
+                        problem = f"points to non-existent page `{target.url}`"
+                    elif problem:
+                        problem = f"points to an invalid external url `{target.url}`: {problem}"
+                if problem == "" and not target.is_image:
+                    self._verified_targets.add(target.url)
+                if problem:
+                    location = f" (line {target.line})" if target.line else ""
+                    warnings.append(f"The {target.kind} in {original_function.__name__}{location} {problem}.")
+        for warning in warnings:
+            self.flash_warning("Warning: " + warning)
+        return warnings
+
+    def check_image_path(self, url: str) -> str:
+        """
+        Checks whether an image URL refers to either an external website or to a file that exists in the
+        configured source image folder.
+
+        :param url: The URL of the image.
+        :type url: str
+        :return: An empty string if the image can be found, or otherwise a description of the problem.
+        :rtype: str
+        """
+        external_url_reason = check_invalid_external_url(url)
+        if external_url_reason == "is a valid external url":
+            return ""
+        elif external_url_reason:
+            return f"points to an invalid image url `{url}`: {external_url_reason}"
+        path = os.path.join(self.configuration.src_image_folder, url.lstrip('/'))
+        if not os.path.exists(path):
+            return f"points to an image file `{url}` that could not be found"
+        return ""
 
     def run(self, **kwargs):
         """
@@ -333,11 +573,13 @@ class Server:
         safe_kwargs = {key: value for key, value in kwargs.items() if key in safe_key_names}
         updated_configuration = replace(self.configuration, **safe_kwargs)
         self.configuration = updated_configuration
+        self._render_caches.clear()
+        self.apply_blob_folder()
         # Update the final args with the new configuration
         final_args.update(kwargs)
         self.app.run(**final_args)
 
-    def prepare_args(self, original_function, args, kwargs):
+    def prepare_args(self, original_function, args, kwargs, state=None, conversion_record=None):
         """
         Processes and prepares arguments for the route function call, ensuring compatibility
         with expected parameters, handling state insertion, remapping parameters,
@@ -346,6 +588,8 @@ class Server:
         :param original_function: The function whose parameters are being prepared.
         :param args: The positional arguments to be passed to the function.
         :param kwargs: The keyword arguments to be passed to the function.
+        :param state: The state to give to the function, if not the server's current state.
+        :param conversion_record: The list to record each parameter's conversion in, if not the server's own record.
         :return: A tuple containing:
             - Processed positional arguments matching the expected parameters of the
               function.
@@ -354,19 +598,23 @@ class Server:
             - A string representation of the final arguments for logging or debugging.
             - The button pressed if detected and processed.
         """
-        self._conversion_record.clear()
+        if conversion_record is None:
+            conversion_record = self._conversion_record
+            conversion_record.clear()
+        if state is None:
+            state = self._state
         args = list(args)
         kwargs = dict(**kwargs)
         button_pressed = ""
         params = get_params()
         if SUBMIT_BUTTON_KEY in params:
-            button_pressed = json.loads(params.pop(SUBMIT_BUTTON_KEY))
+            button_pressed = parse_button_pressed(params[SUBMIT_BUTTON_KEY])
         elif PREVIOUSLY_PRESSED_BUTTON in params:
-            button_pressed = json.loads(params.pop(PREVIOUSLY_PRESSED_BUTTON))
+            button_pressed = parse_button_pressed(params[PREVIOUSLY_PRESSED_BUTTON])
         # TODO: Handle non-bottle backends
-        param_keys = list(params.keys())
-        for key in param_keys:
-            kwargs[key] = params.pop(key)
+        for key, value in params.items():
+            if key != SUBMIT_BUTTON_KEY and key != PREVIOUSLY_PRESSED_BUTTON:
+                kwargs[key] = value
         signature_parameters = inspect.signature(original_function).parameters
         expected_parameters = list(signature_parameters.keys())
         show_names = {param.name: (param.kind in (inspect.Parameter.KEYWORD_ONLY, inspect.Parameter.VAR_KEYWORD))
@@ -375,7 +623,7 @@ class Server:
         # Insert state into the beginning of args
         if (expected_parameters and expected_parameters[0] == "state") or (
                 len(expected_parameters) - 1 == len(args) + len(kwargs)):
-            args.insert(0, self._state)
+            args.insert(0, state)
         # Check if there are too many arguments
         if len(expected_parameters) < len(args) + len(kwargs):
             self.flash_warning(
@@ -387,11 +635,10 @@ class Server:
             while len(expected_parameters) < len(args) + len(kwargs) and kwargs:
                 kwargs.pop(list(kwargs.keys())[-1])
         # Type conversion if required
-        expected_types = {name: p.annotation for name, p in
-                          inspect.signature(original_function).parameters.items()}
-        args = [self.convert_parameter(param, val, expected_types)
+        expected_types = {name: p.annotation for name, p in signature_parameters.items()}
+        args = [self.convert_parameter(param, val, expected_types, conversion_record)
                 for param, val in zip(expected_parameters, args)]
-        kwargs = {param: self.convert_parameter(param, val, expected_types)
+        kwargs = {param: self.convert_parameter(param, val, expected_types, conversion_record)
                   for param, val in kwargs.items()}
         # Verify all arguments are in expected_parameters
         for key, value in kwargs.items():
@@ -420,23 +667,171 @@ class Server:
 
     def serve_image(self, path):
         """
-        Serves an image file located in the specified directory with the MIME type
-        `image/png`. The method retrieves the image from the path provided, using
+        Serves an image file located in the specified directory, with the MIME type guessed
+        from its extension. The method retrieves the image from the path provided, using
         the configured source image folder as the root directory.
 
+        If the URL has a ``w`` (width), ``h`` (height), or ``format`` query parameter (e.g.,
+        ``?w=320&format=webp``), then a smaller and/or converted copy of the image is served instead.
+        Copies are made with Pillow on the first request, and kept in the ``image_cache_folder``.
+
         :param path: The relative path to the image file within the source image folder.
         :type path: str
         :return: The static file object representing the requested image.
         :rtype: static_file
         """
-        return static_file(path, root='./' + self.configuration.src_image_folder, mimetype='image/png')
+        root = './' + self.configuration.src_image_folder
+        variant = [request.query.get(key) for key in ('w', 'h', 'format')]
+        if HAS_PILLOW and any(variant):
+            try:
+                width, height, image_format = parse_derivative_request(*variant)
+            except ValueError as e:
+                abort(400, str(e))
+            source = os.path.abspath(os.path.join(root, path))
+            # Only files inside of the image folder can be served; anything else is left to static_file to refuse
+            if source.startswith(os.path.abspath(root) + os.sep) and os.path.isfile(source):
+                cache_folder = self.configuration.image_cache_folder
+                try:
+                    derivative = make_image_derivative(source, cache_folder, width, height, image_format)
+                except (OSError, ValueError) as e:
+                    abort(415, f"Could not convert the image {path!r}: {e}")
+                image_format = os.path.splitext(derivative)[1].lstrip('.')
+                return self.send_image_file(os.path.basename(derivative), cache_folder,
+                                            DERIVATIVE_FORMATS[image_format][1])
+        return self.send_image_file(path, root)
+
+    def send_image_file(self, path: str, root: str, mimetype=True):
+        """
+        Sends an image file with validators (a strong ``ETag`` and ``Last-Modified``) and the configured
+        ``Cache-Control`` header, so that repeat loads are answered with a 304 (or not requested at all).
+        Range requests are supported. If ``image_sendfile_header`` is configured, then only the headers
+        are sent, and the reverse proxy in front of the server sends the file itself.
+
+        :param path: The path of the file, relative to the root folder.
+        :param root: The folder that the file must be inside of.
+        :param mimetype: The MIME type of the file, or True to guess it from the file's extension.
+        :return: The response for the file.
+        """
+        cache_control = self.configuration.image_cache_control
+        headers = {'Cache-Control': cache_control} if cache_control else {}
+        root = os.path.join(os.path.abspath(root), '')
+        filename = os.path.abspath(os.path.join(root, path.strip('/\\')))
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            stat = None
+        if stat is None or not filename.startswith(root):
+            # Let static_file give the usual error
+            return static_file(path, root=root, mimetype=mimetype, headers=headers)
+        etag = make_file_etag(filename, stat)
+        if etag_matches(request.get_header('If-None-Match'), etag):
+            return bottle.HTTPResponse(status=304, ETag=etag, **headers)
+        offload = self.configuration.image_sendfile_header
+        if not offload:
+            return static_file(path, root=root, mimetype=mimetype, etag=etag, headers=headers)
+        if mimetype is True:
+            mimetype, _ = mimetypes.guess_type(filename)
+        if offload.lower() == 'x-accel-redirect':
+            location = self.configuration.image_sendfile_prefix.rstrip('/') + pathlib.Path(filename).as_posix()
+        else:
+            location = filename
+        headers.update({offload: location, 'ETag': etag,
+                        'Last-Modified': email.utils.formatdate(stat.st_mtime, usegmt=True)})
+        if mimetype:
+            headers['Content-Type'] = mimetype
+        return bottle.HTTPResponse("", **headers)
+
+    def serve_generated_image(self, key):
+        """
+        Serves an image that was created with PIL (rather than loaded from a file) and shown on a page.
+        The URL of each image is based on its content, so browsers can cache it forever.
+
+        :param key: The fingerprint of the image.
+        :return: The PNG data of the image.
+        """
+        etag = f'"{key}"'
+        if request.get_header('If-None-Match') == etag:
+            response.status = 304
+            return ""
+        try:
+            data = get_generated_image(key)
+        except Exception as e:
+            abort(500, f"Could not draw this image: {e}")
+        if data is None:
+            abort(404, "This image is no longer available. Try reloading the page.")
+        response.content_type = 'image/png'
+        response.set_header('Cache-Control', 'public, max-age=31536000, immutable')
+        response.set_header('ETag', etag)
+        return data
+
+    def serve_download(self, token, filename):
+        """
+        Sends the content of a ``Download`` link, which was registered when its page was rendered.
+        Text, bytes, and images support Range requests (e.g., for resuming a download); generators are
+        streamed as they produce their content, and can only be downloaded once.
+
+        :param token: The token that the content was registered under.
+        :param filename: The name of the file, which is only part of the URL for the browser's benefit.
+        :return: The content, in pieces.
+        """
+        payload = take_download(token)
+        if payload is None:
+            abort(404, "This download is no longer available. Try reloading the page.")
+        response.content_type = payload.content_type
+        response.set_header('Content-Disposition', make_content_disposition(payload.filename))
+        if payload.is_stream:
+            return payload.iterate()
+        etag = f'"{token}"'
+        response.set_header('ETag', etag)
+        response.set_header('Accept-Ranges', 'bytes')
+        if etag_matches(request.get_header('If-None-Match'), etag):
+            response.status = 304
+            return ""
+        data = payload.to_bytes()
+        start, end = 0, len(data)
+        range_header = request.get_header('Range')
+        if range_header:
+            ranges = list(bottle.parse_range_header(range_header, len(data)))
+            if not ranges:
+                response.set_header('Content-Range', f"bytes */{len(data)}")
+                response.status = 416
+                return ""
+            start, end = ranges[0]
+            response.status = 206
+            response.set_header('Content-Range', f"bytes {start}-{end - 1}/{len(data)}")
+        response.set_header('Content-Length', str(end - start))
+        return iterate_bytes(data, start, end)
+
+    def search_options(self, key):
+        """
+        Responds to a search request from a ``SelectBox`` with too many options to send with the page.
+        The text to search for is given by the ``q`` query parameter, and the maximum number of
+        results by the ``limit`` query parameter.
+
+        :param key: The key of the cached option index to search.
+        :type key: str
+        :return: A JSON list of the matching options.
+        :rtype: str
+        """
+        prefix = request.query.getunicode('q', default='')
+        try:
+            limit = min(int(request.query.get('limit', DEFAULT_SEARCH_RESULTS)), MAXIMUM_SEARCH_RESULTS)
+        except ValueError:
+            limit = DEFAULT_SEARCH_RESULTS
+        options = search_options(key, prefix, limit)
+        if options is None:
+            abort(404, "These options are no longer available. Try reloading the page.")
+        response.content_type = 'application/json'
+        return json.dumps(options)
 
     def try_special_conversions(self, value, target_type):
         """
         Attempts to convert the input value to the specified target type using various
         specialized conversion methods. This method is designed to handle specific types
         of input, such as `bottle.FileUpload`, supporting conversion to bytes, string,
-        dictionary, and, if available, `PIL.Image`.
+        dictionary, `memoryview` (mapped from the spooled file), a file object (e.g., `BinaryIO`),
+        `pathlib.Path` (a copy saved in the `upload_folder`), and, if available, `PIL.Image`.
+        Uploads larger than the `max_upload_size` setting are refused before any of them is read.
 
         :param value: The input value to be converted. Typically, this is expected
             to be an instance of `bottle.FileUpload`.
@@ -450,22 +845,31 @@ class Server:
             to the target type directly for conversion.
         :rtype: Any
         :raises ValueError: If the method encounters an error during conversion,
-            such as failure to decode file content as UTF-8, or if a file cannot be
+            such as an upload that is too large, failure to decode file content as UTF-8, or if a file cannot be
             opened as an image using PIL.Image when `HAS_PILLOW` is `True`.
         """
+        uploads = get_upload_list(value)
+        if uploads is not None and getattr(target_type, '__origin__', None) is list:
+            element_type = getattr(target_type, '__args__', None) or (bytes,)
+            return self.convert_uploads(uploads, element_type[0])
         if isinstance(value, bottle.FileUpload):
+            check_upload_size(value, self.configuration.max_upload_size)
             if target_type == bytes:
-                return target_type(value.file.read())
+                return target_type(open_upload(value).read())
             elif target_type == str:
-                try:
-                    return value.file.read().decode('utf-8')
-                except UnicodeDecodeError as e:
-                    raise ValueError(f"Could not decode file {value.filename} as utf-8. Perhaps the file is not the type that you expected, or the parameter type is inappropriate?") from e
+                return read_upload_text(value)
             elif target_type == dict:
-                return {'filename': value.filename, 'content': value.file.read()}
+                return {'filename': value.filename, 'content': open_upload(value).read()}
+            elif target_type == memoryview:
+                return view_upload(value)
+            elif is_file_like_type(target_type):
+                return open_upload(value)
+            elif isinstance(target_type, type) and issubclass(target_type, pathlib.PurePath):
+                return save_upload(value, self.configuration.upload_folder)
             elif HAS_PILLOW and issubclass(target_type, PILImage.Image):
                 try:
-                    image = PILImage.open(value.file)
+                    image = open_limited_image(open_upload(value), self.configuration.max_upload_image_size,
+                                               self.configuration.max_upload_image_pixels)
                     image.filename = value.filename
                     return image
                 except Exception as e:
@@ -473,7 +877,30 @@ class Server:
                     raise ValueError(f"Could not open image file {value.filename} as a PIL.Image. Perhaps the file is not an image, or the parameter type is inappropriate?") from e
         return target_type(value)
 
-    def convert_parameter(self, param, val, expected_types):
+    def convert_uploads(self, uploads, element_type):
+        """
+        Converts several uploaded files (e.g., from a ``FileUpload`` with the ``multiple`` attribute) for a
+        parameter annotated as a list, such as ``list[PIL.Image.Image]``. The files are converted at the same
+        time, in a pool of at most ``upload_workers`` threads.
+
+        :param uploads: The uploaded files.
+        :param element_type: The type that each file should be converted to.
+        :return: The list of converted files.
+        :raises ValueError: If any of the files could not be converted, describing each problem.
+        """
+        def convert(upload):
+            converted = self.try_special_conversions(upload, element_type)
+            if HAS_PILLOW and isinstance(converted, PILImage.Image):
+                # Images are only decoded when they are first used, so decode them now, in the pool
+                converted.load()
+            return converted
+
+        if self._upload_pool is None:
+            self._upload_pool = ThreadPoolExecutor(max_workers=max(1, self.configuration.upload_workers),
+                                                   thread_name_prefix="drafter-upload")
+        return convert_uploads(uploads, convert, self._upload_pool)
+
+    def convert_parameter(self, param, val, expected_types, conversion_record=None):
         """
         Converts a given parameter value to a specified target type if possible, based
         on the expected types provided. Records successful conversions, unchanged
@@ -488,25 +915,32 @@ class Server:
             type. If a parameter does not require conversion, its value is set to
             `inspect.Parameter.empty`.
         :type expected_types: dict
+        :param conversion_record: The list to record the conversion in, if not the server's own record.
+        :type conversion_record: list
         :return: The converted value of the parameter if a conversion is successful;
             otherwise, the original value of the parameter.
         :rtype: Any
         :raises ValueError: If the value cannot be converted to its specified expected
             type, providing detailed information about the attempted conversion.
         """
+        if conversion_record is None:
+            conversion_record = self._conversion_record
+        if isinstance(val, list) and not is_list_type(expected_types.get(param)) and get_upload_list(val):
+            # Only a parameter annotated as a list gets every file; otherwise, the last one is used, as before
+            val = val[-1]
         if param in expected_types:
             expected_type = expected_types[param]
             if expected_type == inspect.Parameter.empty:
-                self._conversion_record.append(UnchangedRecord(param, val, expected_types[param]))
+                conversion_record.append(UnchangedRecord(param, val, expected_types[param]))
                 return val
             if hasattr(expected_type, '__origin__'):
                 # TODO: Ignoring the element type for now, but should really handle that properly
                 expected_type = expected_type.__origin__
-            if not isinstance(val, expected_type):
+            if not isinstance(val, expected_type) or (expected_type is list and get_upload_list(val)):
                 try:
                     target_type = expected_types[param]
                     converted_arg = self.try_special_conversions(val, target_type)
-                    self._conversion_record.append(ConversionRecord(param, val, expected_types[param], converted_arg))
+                    conversion_record.append(ConversionRecord(param, val, expected_types[param], converted_arg))
                 except Exception as e:
                     try:
                         from_name = type(val).__name__
@@ -518,7 +952,7 @@ class Server:
                         f"Could not convert {param} ({val!r}) from {from_name} to {to_name}\n") from e
                 return converted_arg
         # Fall through
-        self._conversion_record.append(UnchangedRecord(param, val))
+        conversion_record.append(UnchangedRecord(param, val))
         return val
 
     def make_bottle_page(self, original_function):
@@ -537,17 +971,27 @@ class Server:
         def bottle_page(*args, **kwargs):
             # TODO: Handle non-bottle backends
             url = remove_url_query_params(request.url, {RESTORABLE_STATE_KEY, SUBMIT_BUTTON_KEY})
+            if self.uses_prefetching() and request.get_header(PREFETCH_HEADER):
+                return self.prefetch_page(original_function, args, kwargs)
             self.restore_state_if_available(original_function)
             original_state = self.dump_state()
-            try:
-                args, kwargs, arguments, button_pressed = self.prepare_args(original_function, args, kwargs)
-            except Exception as e:
-                return self.make_error_page("Error preparing arguments for page", e, original_function)
+            prefetched = None
+            if self.uses_prefetching() and request.method == 'GET':
+                # The full URL includes the text of the link, which is recorded as the button that was pressed
+                prefetched = self._prefetched_pages.pop((request.url, original_state))
+            if prefetched is not None:
+                arguments, button_pressed = prefetched.arguments, prefetched.button_pressed
+                self._conversion_record = prefetched.conversion_record
+            else:
+                try:
+                    args, kwargs, arguments, button_pressed = self.prepare_args(original_function, args, kwargs)
+                except Exception as e:
+                    return self.make_error_page("Error preparing arguments for page", e, original_function)
             # Actually start building up the page
             visiting_page = VisitedPage(url, original_function, arguments, "Creating Page", button_pressed)
             self._page_history.append((visiting_page, original_state))
             try:
-                page = original_function(*args, **kwargs)
+                page = prefetched.page if prefetched is not None else original_function(*args, **kwargs)
             except Exception as e:
                 additional_details = (f"  Arguments: {args!r}\n"
                                       f"  Keyword Arguments: {kwargs!r}\n"
@@ -566,17 +1010,141 @@ class Server:
             self._state = page.state
             visiting_page.update("Rendering Page Content")
             try:
-                content = page.render_content(self.dump_state(), self.configuration)
+                chunks = page.render_chunks(self.dump_state(), self.configuration,
+                                            self.get_render_cache(original_function))
+                if self.uses_patch_navigation():
+                    chunks = mark_chunks(chunks)
+                content = page.wrap_chunks(chunks, self.configuration)
             except Exception as e:
                 return self.make_error_page("Error rendering content", e, original_function)
             visiting_page.finish("Finished Page Load")
-            if self.configuration.debug:
-                content = content + self.make_debug_page()
-            content = self.wrap_page(content)
-            return content
+            rendered = None
+            if self.uses_patch_navigation():
+                # The frame includes the form's encoding, so adding a file upload forces a full render
+                frame = page.wrap_chunks([], self.configuration, page.form_encoding(chunks))
+                rendered = RenderedPage(next(self._render_versions), frame, chunks)
+            if self.uses_post_redirect_get() and request.method == 'POST':
+                token = secrets.token_hex(8)
+                self._result_pages.set(token, (content, rendered))
+                redirect(f"{RESULT_PAGE_ROUTE}{token}", 303)
+            debug = self.make_debug_page() if self.configuration.debug else ""
+            return self.send_page(content, debug, rendered)
 
         return bottle_page
 
+    def send_page(self, content: str, debug: str, rendered: Optional[RenderedPage] = None) -> str:
+        """
+        Decides how to send the rendered page to the browser. Normally, the content is wrapped in a
+        complete HTML document. With partial navigation, requests made by ``global.js`` get only the
+        content; and with patch navigation, they get just the chunks that changed since the last page,
+        if that is smaller.
+
+        :param content: The rendered content of the page.
+        :param debug: The rendered debug information, or an empty string.
+        :param rendered: The chunks of the page, if patch navigation is enabled.
+        :return: The body of the response.
+        """
+        full_content = content + debug
+        if not self.uses_partial_navigation():
+            return self.wrap_page(full_content)
+        response.set_header('Vary', f"{PARTIAL_NAVIGATION_HEADER}, {PAGE_VERSION_HEADER}")
+        previous = self._last_render
+        if rendered is not None:
+            self._last_render = rendered
+            response.set_header(PAGE_VERSION_HEADER, str(rendered.version))
+        if not request.get_header(PARTIAL_NAVIGATION_HEADER):
+            return self.wrap_page(full_content)
+        if rendered is not None:
+            patch = make_patch(previous, rendered, request.get_header(PAGE_VERSION_HEADER),
+                               debug, len(full_content))
+            if patch is not None:
+                response.set_header(PARTIAL_NAVIGATION_HEADER, 'patch')
+                response.content_type = 'application/json'
+                return patch
+        # The browser will swap this into the existing page, so skip the styles and scripts
+        response.set_header(PARTIAL_NAVIGATION_HEADER, '1')
+        return full_content
+
+    def uses_post_redirect_get(self) -> bool:
+        """
+        Determines whether the result of submitting a form should be shown through a redirect, so that
+        refreshing the page or going back to it does not submit the form again.
+
+        :return: Whether the Post/Redirect/Get pattern is enabled.
+        :rtype: bool
+        """
+        return self.configuration.post_redirect_get and not self.configuration.skulpt
+
+    def serve_result_page(self, token: str) -> str:
+        """
+        Serves a page that was created by an earlier form submission, without running its route again.
+        If the page is no longer available, the user is sent back to the index page instead.
+
+        :param token: The token that the page was stored under.
+        :return: The page, as it would have been sent originally.
+        """
+        stored = self._result_pages.get(token)
+        if stored is None:
+            redirect("/", 303)
+        content, rendered = stored
+        debug = self.make_debug_page() if self.configuration.debug else ""
+        return self.send_page(content, debug, rendered)
+
+    def uses_prefetching(self) -> bool:
+        """
+        Determines whether the browser is allowed to ask for pages to be prepared ahead of time.
+        Like partial navigation, this needs a real server, so it is never used with Skulpt.
+
+        :return: Whether link prefetching is enabled.
+        :rtype: bool
+        """
+        return self.configuration.prefetch_links in PREFETCH_MODES and not self.configuration.skulpt
+
+    def prefetch_page(self, original_function, args, kwargs) -> str:
+        """
+        Runs the route ahead of time, against a copy of the current state, and keeps the resulting page
+        for a short while. If the user then visits the same URL before the state changes, the page is
+        used without running the route again. Nothing about the server's state or history is changed,
+        so other requests can be handled at the same time. Errors are only logged here, since they will
+        be reported properly if the user actually visits the page.
+
+        :param original_function: The route function to run.
+        :param args: The positional arguments from the route.
+        :param kwargs: The keyword arguments from the route.
+        :return: An empty response; the browser does not need the page yet.
+        """
+        response.status = 204
+        if RESTORABLE_STATE_KEY in get_params():
+            return ""
+        state = self._state
+        key = (request.url, self.dump_state())
+        if key in self._prefetched_pages:
+            return ""
+        try:
+            conversion_record = []
+            args, kwargs, arguments, button_pressed = self.prepare_args(original_function, args, kwargs,
+                                                                        copy.deepcopy(state), conversion_record)
+            page = original_function(*args, **kwargs)
+            if isinstance(page, Page):
+                self._prefetched_pages.set(key, PrefetchedPage(page, arguments, button_pressed, conversion_record))
+        except Exception as e:
+            logger.warning(f"Could not prefetch {request.url}: {e!r}")
+        return ""
+
+    def get_render_cache(self, original_function) -> Optional[GenerationalCache]:
+        """
+        Gets the cache of rendered components for the given route, creating it if needed.
+        If ``cache_static_chunks`` is not enabled in the configuration, then there is no cache.
+
+        :param original_function: The route function whose page is being rendered.
+        :return: The route's render cache, or None if caching is disabled.
+        """
+        if not self.configuration.cache_static_chunks:
+            return None
+        if original_function not in self._render_caches:
+            self._render_caches[original_function] = GenerationalCache()
+        return self._render_caches[original_function]
+
     def verify_page_result(self, page, original_function):
         """
         Verifies the result of a function execution to ensure it returns a valid `Page`
@@ -627,16 +1195,6 @@ class Server:
                     f"Instead of a list of strings or content objects, the content field was:\n"
                     f" {page.content!r}\n"
                     f"Make sure you return a Page object with the new state and the list of strings/content objects.")
-            else:
-                for item in page.content:
-                    if not isinstance(item, (str, PageContent)):
-                        message = (
-                            f"The server did not return a valid Page() object from {original_function}.\n"
-                            f"Instead of a list of strings or content objects, the content field was:\n"
-                            f" {page.content!r}\n"
-                            f"One of those items is not a string or a content object. Instead, it was:\n"
-                            f" {item!r}\n"
-                            f"Make sure you return a Page object with the new state and the list of strings/content objects.")
 
         if message:
             return self.make_error_page("Error after creating page", ValueError(message), original_function)
@@ -669,6 +1227,27 @@ class Server:
         if message:
             return self.make_error_page("Error after creating page", ValueError(message), original_function)
 
+    def uses_partial_navigation(self) -> bool:
+        """
+        Determines whether buttons and links should replace only the content of the page (using
+        ``fetch`` in the browser), rather than loading an entirely new document. This is only
+        possible when there is a real server to talk to, so it is never used with Skulpt.
+
+        :return: Whether partial navigation is enabled.
+        :rtype: bool
+        """
+        return ((self.configuration.partial_navigation or self.configuration.patch_navigation)
+                and not self.configuration.skulpt)
+
+    def uses_patch_navigation(self) -> bool:
+        """
+        Determines whether partial navigation should send only the parts of the page that changed.
+
+        :return: Whether patch navigation is enabled.
+        :rtype: bool
+        """
+        return self.configuration.patch_navigation and not self.configuration.skulpt
+
     def wrap_page(self, content):
         """
         Wraps provided content in a styled HTML template, applying additional headers,
@@ -685,7 +1264,14 @@ class Server:
             and selected style.
         :rtype: str
         """
-        content = f"<div class='btlw'>{content}</div>"
+        attributes = ""
+        if self.uses_partial_navigation():
+            attributes += " data-btlw-partial='true'"
+        if self.uses_patch_navigation() and self._last_render is not None:
+            attributes += f" data-btlw-version='{self._last_render.version}'"
+        if self.uses_prefetching():
+            attributes += f" data-btlw-prefetch='{self.configuration.prefetch_links}'"
+        content = f"<div class='btlw'{attributes}>{content}</div>"
         style = self.configuration.style
         global_files = get_raw_files("global")
         style_files = get_raw_files(style)
@@ -800,18 +1386,37 @@ class Server:
         :rtype: str
         """
         # Bundle up the necessary files, including the source code
-        student_main_file = seek_file_by_line("start_server")
+        if self._deployment_main_file is None:
+            self._deployment_main_file = seek_file_by_line("start_server")
+        student_main_file = self._deployment_main_file
         if student_main_file is None:
             return TEMPLATE_500.format(title="500 Internal Server Error",
                                        message="Could not find the student's main file.",
                                        error="Could not find the student's main file.",
                                        routes="")
-        bundled_js, skipped, added = bundle_files_into_js(student_main_file, os.path.dirname(student_main_file))
-        return TEMPLATE_SKULPT_DEPLOY.format(website_code=bundled_js,
-                                             cdn_skulpt=self.configuration.cdn_skulpt,
-                                             cdn_skulpt_std=self.configuration.cdn_skulpt_std,
-                                             cdn_skulpt_drafter=self.configuration.cdn_skulpt_drafter,
-                                             cdn_drafter_setup=self.configuration.cdn_drafter_setup)
+        bundled_js, skipped, added = bundle_files_into_js(student_main_file, os.path.dirname(student_main_file),
+                                                          cache=self._deployment_files)
+        page = self._deployment_page
+        if page is None or page.bundled_js != bundled_js:
+            content = TEMPLATE_SKULPT_DEPLOY.format(website_code=bundled_js,
+                                                    cdn_skulpt=self.configuration.cdn_skulpt,
+                                                    cdn_skulpt_std=self.configuration.cdn_skulpt_std,
+                                                    cdn_skulpt_drafter=self.configuration.cdn_skulpt_drafter,
+                                                    cdn_drafter_setup=self.configuration.cdn_drafter_setup)
+            etag = f'"{hashlib.sha1(content.encode("utf-8")).hexdigest()}"'
+            page = self._deployment_page = DeploymentPage(bundled_js, content, etag)
+        response.set_header('ETag', page.etag)
+        response.set_header('Vary', 'Accept-Encoding')
+        if etag_matches(request.get_header('If-None-Match'), page.etag):
+            response.status = 304
+            return ""
+        if 'gzip' not in request.get_header('Accept-Encoding', ''):
+            return page.html
+        if page.compressed is None:
+            page.compressed = gzip.compress(page.html.encode('utf-8'))
+        response.content_type = 'text/html; charset=UTF-8'
+        response.set_header('Content-Encoding', 'gzip')
+        return page.compressed
 
 
 MAIN_SERVER = Server(_custom_name="MAIN_SERVER")
@@ -0,0 +1,173 @@
+"""
+Conversions of uploaded files into the types that route parameters ask for.
+
+Bottle already spools large uploads into temporary files instead of keeping them in memory, so the
+conversions here try not to undo that: sizes are checked without reading the file, files are copied
+and hashed in small blocks, and ``memoryview`` parameters are backed by a memory map of the spooled
+file. A route can then work through a very large upload without ever holding all of it in memory.
+"""
+import hashlib
+import io
+import mmap
+import os
+import pathlib
+import tempfile
+from concurrent.futures import Executor
+from typing import IO, Any, BinaryIO, Callable, Optional
+
+import bottle
+
+# The size of the blocks that uploads are copied and hashed in
+UPLOAD_BLOCK_SIZE = 2 ** 16
+# Parameters with these types are given the uploaded file itself
+FILE_LIKE_TYPES = (BinaryIO, IO, io.IOBase, io.BufferedIOBase, io.RawIOBase)
+
+
+def is_file_like_type(target_type) -> bool:
+    """
+    Checks whether a parameter's type asks for a file object (e.g., ``BinaryIO`` or ``IO[bytes]``).
+    """
+    return target_type in FILE_LIKE_TYPES or getattr(target_type, '__origin__', None) is IO
+
+
+def is_list_type(target_type) -> bool:
+    """
+    Checks whether a parameter's type asks for a list (e.g., ``list`` or ``List[PIL.Image.Image]``),
+    and so can hold every file of a ``FileUpload`` with the ``multiple`` attribute.
+    """
+    return target_type is list or getattr(target_type, '__origin__', None) is list
+
+
+def get_upload_list(value) -> Optional[list]:
+    """
+    Gets the uploaded files in a parameter's value, which is either a single upload or (for a
+    ``FileUpload`` with the ``multiple`` attribute) a list of them.
+
+    :param value: The value of the parameter.
+    :return: The list of uploads, or None if the value is not made of uploads.
+    """
+    if isinstance(value, bottle.FileUpload):
+        return [value]
+    if isinstance(value, list) and value and all(isinstance(item, bottle.FileUpload) for item in value):
+        return value
+    return None
+
+
+def convert_uploads(uploads: list, convert: Callable[[Any], Any], pool: Executor) -> list:
+    """
+    Converts several uploaded files at once in the given pool of threads. Decoding images and
+    text mostly happens outside of Python's global lock, so this is faster than one file at a time.
+    If any of the files cannot be converted, the errors of all of them are reported together.
+
+    :param uploads: The uploaded files.
+    :param convert: The function that converts a single upload.
+    :param pool: The pool of threads to convert the uploads in.
+    :return: The converted values, in the same order as the uploads.
+    :raises ValueError: If any of the uploads could not be converted.
+    """
+    if len(uploads) == 1:
+        return [convert(uploads[0])]
+    futures = [pool.submit(convert, upload) for upload in uploads]
+    results, errors = [], []
+    for upload, future in zip(uploads, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            errors.append(f"  {upload.filename}: {e}")
+    if errors:
+        raise ValueError(f"Could not convert {len(errors)} of the {len(uploads)} uploaded files:\n" + "\n".join(errors))
+    return results
+
+
+def get_upload_size(upload) -> int:
+    """
+    Finds the size of an uploaded file by seeking to its end, rather than reading it.
+
+    :param upload: The uploaded file (a ``bottle.FileUpload``).
+    :return: The size of the file, in bytes.
+    """
+    upload.file.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    upload.file.seek(0)
+    return size
+
+
+def check_upload_size(upload, limit: int):
+    """
+    Makes sure that an uploaded file is not larger than the configured limit.
+
+    :param upload: The uploaded file (a ``bottle.FileUpload``).
+    :param limit: The largest allowed size in bytes; if 0 (or less), then any size is allowed.
+    :raises ValueError: If the file is too large.
+    """
+    if limit > 0:
+        size = get_upload_size(upload)
+        if size > limit:
+            raise ValueError(f"The file {upload.filename} is {size} bytes, but uploads can be at most {limit} bytes. "
+                             f"You can change the max_upload_size setting to allow larger files.")
+
+
+def open_upload(upload) -> BinaryIO:
+    """
+    Gives the uploaded file itself, rewound to the start, so that it can be read a little at a time.
+    """
+    upload.file.seek(0)
+    return upload.file
+
+
+def read_upload_text(upload) -> str:
+    """
+    Decodes an uploaded file as UTF-8, a block at a time, so that the raw bytes are never
+    held in memory alongside the decoded text.
+
+    :raises ValueError: If the file is not valid UTF-8.
+    """
+    wrapper = io.TextIOWrapper(open_upload(upload), encoding='utf-8')
+    try:
+        return wrapper.read()
+    except UnicodeDecodeError as e:
+        raise ValueError(f"Could not decode file {upload.filename} as utf-8. Perhaps the file is not the type "
+                         f"that you expected, or the parameter type is inappropriate?") from e
+    finally:
+        # Otherwise, the wrapper would close the upload when it is garbage collected
+        wrapper.detach()
+
+
+def view_upload(upload) -> memoryview:
+    """
+    Gives read-only access to the bytes of an uploaded file. If the upload was spooled to a temporary
+    file, then the view is backed by a memory map of that file, so its pages are only loaded as they are used.
+    """
+    file = open_upload(upload)
+    if isinstance(file, io.BytesIO):
+        return file.getbuffer().toreadonly()
+    try:
+        return memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        # Empty files cannot be mapped, and some file objects have no file descriptor at all
+        return memoryview(file.read())
+
+
+def save_upload(upload, folder: str) -> pathlib.Path:
+    """
+    Copies an uploaded file into the given folder, a block at a time, while computing its SHA-256 hash.
+    The copy is stored as ``<folder>/<hash>/<filename>``, so uploading the same file again reuses the copy.
+
+    :param upload: The uploaded file (a ``bottle.FileUpload``).
+    :param folder: The folder to keep the uploaded files in; it is created if needed.
+    :return: The path of the copy.
+    """
+    os.makedirs(folder, exist_ok=True)
+    digest = hashlib.sha256()
+    source = open_upload(upload)
+    with tempfile.NamedTemporaryFile(dir=folder, delete=False) as temporary:
+        for block in iter(lambda: source.read(UPLOAD_BLOCK_SIZE), b""):
+            digest.update(block)
+            temporary.write(block)
+    target = pathlib.Path(folder, digest.hexdigest(), upload.filename)
+    if target.exists():
+        os.remove(temporary.name)
+    else:
+        target.parent.mkdir(exist_ok=True)
+        os.replace(temporary.name, target)
+    return target
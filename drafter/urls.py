@@ -1,7 +1,29 @@
 from typing import Any, Tuple, Dict
+from functools import lru_cache
 import re
 from urllib.parse import urlencode, urlparse, parse_qs, quote_plus
 
+from drafter.constants import SUBMIT_BUTTON_KEY
+
+
+def _has_url_extras(url: str) -> bool:
+    # A URL without a query, fragment, or path parameters can be extended without parsing it
+    return '?' in url or '#' in url or ';' in url
+
+
+@lru_cache(maxsize=4096)
+def make_submit_url(url: str, button_text: str) -> str:
+    """
+    Creates the URL that a button or link submits to, which tells the server which button was pressed.
+    Pages often have many buttons with the same target and text, so the result is cached.
+
+    :param url: The URL of the button's target.
+    :param button_text: The text of the button.
+    :return: The URL with the button's text added as a query parameter.
+    """
+    return merge_url_query_params(url, {SUBMIT_BUTTON_KEY: button_text})
+
+
 def merge_url_query_params(url: str, additional_params: dict) -> str:
     """
     Merges additional parameters into a URL. If a parameter already exists, it will be overwritten.
@@ -11,6 +33,9 @@ def merge_url_query_params(url: str, additional_params: dict) -> str:
     :param additional_params: The parameters to merge into the URL.
     :return: The URL with the additional parameters
     """
+    if not _has_url_extras(url):
+        # Most URLs are plain routes (e.g., "/index"), so there is nothing to merge with
+        return f"{url}?{urlencode(additional_params, doseq=True)}"
     url_components = urlparse(url)
     original_params = parse_qs(url_components.query, keep_blank_values=True)
     merged_params = dict(**original_params)
@@ -27,6 +52,8 @@ def remove_url_query_params(url: str, params_to_remove: set) -> str:
     :param params_to_remove: The parameters to remove from the URL
     :return: The URL with the parameters removed
     """
+    if not _has_url_extras(url):
+        return url
     url_components = urlparse(url)
     original_params = parse_qs(url_components.query, keep_blank_values=True)
     merged_params = {k: v for k, v in original_params.items() if k not in params_to_remove}
@@ -76,19 +103,22 @@ def friendly_urls(url: str) -> str:
     return url
 
 
-URL_REGEX = r"^(?:http(s)?://)[\w.-]+(?:\.[\w\.-]+)+[\w\-\._~:/?#[\]@!\$&'\(\)\*\+,;=.]+$"
+URL_REGEX = re.compile(r"^(?:http(s)?://)[\w.-]+(?:\.[\w\.-]+)+[\w\-\._~:/?#[\]@!\$&'\(\)\*\+,;=.]+$")
+# URLs with other schemes (e.g., ``mailto:`` or ``tel:``) are opened by the browser, not the server
+OTHER_SCHEME_REGEX = re.compile(r"^/?(?!(?:https?|file):)[a-zA-Z][a-zA-Z0-9+.-]*:")
 
 
+@lru_cache(maxsize=1024)
 def check_invalid_external_url(url: str) -> str:
     """
     Checks if a URL is a valid external URL. If it is not, it will return an error message. If it is,
-    it will return an empty string.
+    it will return an empty string. Results are cached, since the same URLs are checked on every page load.
 
     :param url: The URL to check
     :return: An error message if the URL is invalid, otherwise an empty string
     """
     if url.startswith("file://"):
         return "The URL references a local file on your computer, not a file on a server."
-    if re.match(URL_REGEX, url) is not None:
+    if URL_REGEX.match(url) is not None:
         return "is a valid external url"
     return ""
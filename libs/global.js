@@ -1,36 +1,326 @@
-let snippets = document.getElementsByClassName('copyable');
 const buttonText = "📋";
-console.log(snippets);
-for (let i = 0; i < snippets.length; i++) {
-    code = snippets[i].textContent;
-    //snippets[i].classList.add('hljs'); // append copy button to pre tag
-    snippets[i].innerHTML = '<button class="copy-button">'+buttonText+'</button>' + snippets[i].innerHTML; // append copy button
-    snippets[i].getElementsByClassName("copy-button")[0].addEventListener("click", function () {
-        this.innerText = 'Copying..';
-        navigator.clipboard.writeText(code);
-        this.innerText = 'Copied!';
-        button = this;
-        setTimeout(function () {
-            button.innerText = buttonText;
-        }, 1000)
-    });
-}
-
-let expandables = document.getElementsByClassName('expandable');
+
+function setupCopyables(root) {
+    let snippets = root.getElementsByClassName('copyable');
+    for (let i = 0; i < snippets.length; i++) {
+        let code = snippets[i].textContent;
+        //snippets[i].classList.add('hljs'); // append copy button to pre tag
+        snippets[i].innerHTML = '<button class="copy-button">'+buttonText+'</button>' + snippets[i].innerHTML; // append copy button
+        snippets[i].getElementsByClassName("copy-button")[0].addEventListener("click", function () {
+            this.innerText = 'Copying..';
+            navigator.clipboard.writeText(code);
+            this.innerText = 'Copied!';
+            let button = this;
+            setTimeout(function () {
+                button.innerText = buttonText;
+            }, 1000)
+        });
+    }
+}
+
 // Any span with the expandable class will be turned into "...", and can be clicked
 // to expand the rest of the content.
-for (let i = 0; i < expandables.length; i++) {
-    let expandable = expandables[i];
-    let content = expandable.textContent;
-    if (content.length > 100) {
-        expandable.textContent = content.slice(0, 100) + '...';
-        expandable.style.cursor = 'pointer';
-        expandable.addEventListener('click', function () {
-            if (expandable.textContent.endsWith('...')) {
-                expandable.textContent = content;
+function setupExpandables(root) {
+    let expandables = root.getElementsByClassName('expandable');
+    for (let i = 0; i < expandables.length; i++) {
+        let expandable = expandables[i];
+        let content = expandable.textContent;
+        if (content.length > 100) {
+            expandable.textContent = content.slice(0, 100) + '...';
+            expandable.style.cursor = 'pointer';
+            expandable.addEventListener('click', function () {
+                if (expandable.textContent.endsWith('...')) {
+                    expandable.textContent = content;
+                } else {
+                    expandable.textContent = content.slice(0, 100) + '...';
+                }
+            });
+        }
+    }
+}
+
+// Any input with a data-btlw-search attribute is a SelectBox with too many options to send
+// at once, so we ask the server for matching options as the user types.
+function setupSearchables(root) {
+    let searchables = root.querySelectorAll('input[data-btlw-search]');
+    for (let i = 0; i < searchables.length; i++) {
+        let searchable = searchables[i];
+        let datalist = document.getElementById(searchable.getAttribute('list'));
+        let limit = searchable.dataset.btlwSearchLimit;
+        let pending = null;
+        searchable.addEventListener('input', function () {
+            clearTimeout(pending);
+            pending = setTimeout(function () {
+                let url = searchable.dataset.btlwSearch + '?q=' + encodeURIComponent(searchable.value) +
+                    '&limit=' + encodeURIComponent(limit);
+                fetch(url).then(function (response) {
+                    if (!response.ok) {
+                        // The server no longer has these options (e.g., it restarted), so the page must be reloaded
+                        throw new Error(response.status + ' ' + response.statusText);
+                    }
+                    return response.json();
+                }).then(function (options) {
+                    datalist.replaceChildren(...options.map(function (option) {
+                        let element = document.createElement('option');
+                        element.value = option;
+                        return element;
+                    }));
+                }).catch(function (error) {
+                    console.error('Could not search the options:', error);
+                });
+            }, 150);
+        });
+    }
+}
+
+// Only links to other pages of this site can be followed without reloading or prefetched;
+// the special pages (like the reset link) start with "--" and must only run when clicked.
+function isSiteLink(link) {
+    return !link.target && !link.hasAttribute('download') && link.origin === window.location.origin &&
+        !link.getAttribute('href').startsWith('#');
+}
+
+// If the server enabled prefetching, then the pages that links point to are prepared ahead of time
+// when the user hovers over them (or, in "visible" mode, as soon as they are scrolled into view).
+const PREFETCH_HEADER = 'X-Drafter-Prefetch';
+let prefetchMode = (document.querySelector('.btlw[data-btlw-prefetch]') || {dataset: {}}).dataset.btlwPrefetch;
+let prefetchedUrls = new Set();
+let prefetchObserver = null;
+
+function prefetch(link) {
+    if (prefetchedUrls.has(link.href)) {
+        return;
+    }
+    prefetchedUrls.add(link.href);
+    fetch(link.href, {headers: {[PREFETCH_HEADER]: '1'}}).catch(function (error) {
+        console.error('Could not prefetch the page:', error);
+    });
+}
+
+function setupPrefetching(root) {
+    if (!prefetchMode) {
+        return;
+    }
+    if (prefetchMode === 'visible' && !prefetchObserver && 'IntersectionObserver' in window) {
+        prefetchObserver = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    prefetchObserver.unobserve(entry.target);
+                    prefetch(entry.target);
+                }
+            });
+        });
+    }
+    root.querySelectorAll('a[href]').forEach(function (link) {
+        if (!link.closest('.btlw') || !isSiteLink(link) || link.pathname.startsWith('/--')) {
+            return;
+        }
+        link.addEventListener('mouseenter', function () {
+            prefetch(link);
+        });
+        if (prefetchObserver) {
+            prefetchObserver.observe(link);
+        }
+    });
+}
+
+function setupPage(root) {
+    setupCopyables(root);
+    setupExpandables(root);
+    setupSearchables(root);
+    setupPrefetching(root);
+}
+
+setupPage(document);
+
+// Buttons with a data-btlw-fields attribute only need some of the fields on the page (the ones that
+// their route accepts), so the other fields are disabled just long enough to leave them out of the submission.
+const LABEL_SEPARATOR = '$@~@$';
+const JSON_DECODE_SYMBOL = '$@JSON~@$';
+
+function isFieldNeeded(name, fields, submitter) {
+    if (name.startsWith('--')) {
+        return true;
+    }
+    if (name.startsWith(JSON_DECODE_SYMBOL)) {
+        name = name.slice(JSON_DECODE_SYMBOL.length);
+    } else if (name.includes(LABEL_SEPARATOR)) {
+        // Arguments of a particular button, which are only needed if it is the one that was pressed
+        let [label, argument] = name.split(LABEL_SEPARATOR, 2);
+        return label === submitter.value && fields.has(argument);
+    }
+    return fields.has(name);
+}
+
+document.addEventListener('submit', function (event) {
+    let submitter = event.submitter;
+    if (!submitter || submitter.dataset.btlwFields === undefined) {
+        return;
+    }
+    let fields = new Set(submitter.dataset.btlwFields.split(' '));
+    let disabled = [];
+    Array.from(event.target.elements).forEach(function (element) {
+        if (element.name && element !== submitter && !element.disabled &&
+            !isFieldNeeded(element.name, fields, submitter)) {
+            element.disabled = true;
+            disabled.push(element);
+        }
+    });
+    setTimeout(function () {
+        disabled.forEach(function (element) {
+            element.disabled = false;
+        });
+    }, 0);
+}, true);
+
+// If the server enabled partial navigation, then buttons and links are sent with fetch, and the
+// server replies with just the new content of the page; only the btlw container gets replaced,
+// instead of reloading the whole document (with all of its styles and scripts) on every click.
+// With patch navigation, the server may instead reply with only the chunks of content that changed.
+const PARTIAL_HEADER = 'X-Drafter-Partial';
+const VERSION_HEADER = 'X-Drafter-Version';
+let container = document.querySelector('.btlw[data-btlw-partial]');
+let currentVersion = container ? container.dataset.btlwVersion : undefined;
+let partialNavigationFailed = false;
+
+// Scripts added through innerHTML do not run, so they have to be recreated
+function prepareNewContent(root) {
+    root.querySelectorAll('script').forEach(function (oldScript) {
+        let newScript = document.createElement('script');
+        Array.from(oldScript.attributes).forEach(function (attribute) {
+            newScript.setAttribute(attribute.name, attribute.value);
+        });
+        newScript.textContent = oldScript.textContent;
+        oldScript.replaceWith(newScript);
+    });
+    setupPage(root);
+}
+
+function swapContainer(content) {
+    // The server state has changed, so any earlier prefetching is no longer useful
+    prefetchedUrls.clear();
+    container.innerHTML = content;
+    prepareNewContent(container);
+}
+
+// Each operation replaces the chunks from start to end (as numbered before any changes) with new ones,
+// so they are applied from last to first.
+function applyPatch(patch) {
+    let form = container.querySelector('form');
+    let chunks = Array.from(form.children).filter(function (child) {
+        return child.classList.contains('btlw-chunk');
+    });
+    for (let i = patch.ops.length - 1; i >= 0; i--) {
+        let [start, end, added] = patch.ops[i];
+        let reference = chunks[end] || null;
+        chunks.slice(start, end).forEach(function (chunk) {
+            chunk.remove();
+        });
+        let template = document.createElement('template');
+        template.innerHTML = added.join('\n');
+        let fresh = Array.from(template.content.children);
+        form.insertBefore(template.content, reference);
+        fresh.forEach(prepareNewContent);
+    }
+    let debug = container.querySelector('.btlw-debug');
+    if (debug) {
+        debug.remove();
+    }
+    if (patch.debug) {
+        container.insertAdjacentHTML('beforeend', patch.debug);
+        prepareNewContent(container.querySelector('.btlw-debug'));
+    }
+}
+
+function rememberPage(content, url, replace) {
+    let state = {btlw: content, version: currentVersion};
+    try {
+        if (replace) {
+            history.replaceState(state, '', url);
+        } else {
+            history.pushState(state, '', url);
+        }
+    } catch (error) {
+        // The page was too big to keep in the history, so going back will reload it instead
+        if (!replace) {
+            history.pushState(null, '', url);
+        }
+    }
+}
+
+function navigate(url, options, retry) {
+    options.headers = {[PARTIAL_HEADER]: '1'};
+    if (currentVersion !== undefined) {
+        options.headers[VERSION_HEADER] = currentVersion;
+    }
+    fetch(url, options).then(function (response) {
+        return response.text().then(function (text) {
+            let kind = response.headers.get(PARTIAL_HEADER);
+            if (!kind) {
+                // Probably an error page, which is a complete document of its own
+                document.open();
+                document.write(text);
+                document.close();
+                history.pushState(null, '', response.url);
+                return;
+            }
+            if (kind === 'patch') {
+                prefetchedUrls.clear();
+                applyPatch(JSON.parse(text));
             } else {
-                expandable.textContent = content.slice(0, 100) + '...';
+                swapContainer(text);
             }
+            currentVersion = response.headers.get(VERSION_HEADER) || undefined;
+            rememberPage(container.innerHTML, response.url, false);
+            window.scrollTo(0, 0);
         });
-    }
-}
\ No newline at end of file
+    }).catch(function (error) {
+        console.error('Could not load the page, falling back to a full reload:', error);
+        partialNavigationFailed = true;
+        retry();
+    });
+}
+
+if (container) {
+    rememberPage(container.innerHTML, window.location.href, true);
+
+    document.addEventListener('submit', function (event) {
+        let form = event.target;
+        if (event.defaultPrevented || partialNavigationFailed || !container.contains(form)) {
+            return;
+        }
+        let submitter = event.submitter;
+        let url = (submitter && submitter.hasAttribute('formaction')) ? submitter.formAction : form.action;
+        let data = new FormData(form);
+        if (submitter && submitter.name) {
+            data.append(submitter.name, submitter.value);
+        }
+        event.preventDefault();
+        navigate(url, {method: 'POST', body: data}, function () {
+            form.requestSubmit(submitter);
+        });
+    });
+
+    document.addEventListener('click', function (event) {
+        let link = event.target.closest('a[href]');
+        if (event.defaultPrevented || partialNavigationFailed || !link || !container.contains(link) ||
+            event.button !== 0 || event.ctrlKey || event.metaKey || event.shiftKey || event.altKey ||
+            !isSiteLink(link)) {
+            return;
+        }
+        event.preventDefault();
+        navigate(link.href, {method: 'GET'}, function () {
+            window.location.href = link.href;
+        });
+    });
+
+    window.addEventListener('popstate', function (event) {
+        if (event.state && event.state.btlw !== undefined) {
+            swapContainer(event.state.btlw);
+            // The server only knows about the newest page, so this one cannot be patched
+            currentVersion = event.state.version;
+        } else {
+            window.location.reload();
+        }
+    });
+}
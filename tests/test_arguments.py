@@ -38,4 +38,95 @@ def test_button_arguments(browser, splinter_headless):
         browser.fill("plums", "200")
         browser.find_by_name(SUBMIT_BUTTON_KEY).click()
 
-        assert browser.is_text_present('You bought 5 apples, 7 oranges, 200 plums, and 100 pears. (oranges and pears and more) (ups and downs) (True) (False)')
\ No newline at end of file
+        assert browser.is_text_present('You bought 5 apples, 7 oranges, 200 plums, and 100 pears. (oranges and pears and more) (ups and downs) (True) (False)')
+
+def test_argument_tokens_replace_hidden_inputs():
+    import re
+    from webtest import TestApp
+    from drafter.server import Server
+
+    server = Server(_custom_name="TestServer", debug=False, argument_tokens=True)
+
+    def index(state) -> Page:
+        return Page(state, [
+            TextBox("pears", "7"),
+            *[Button(f"Buy {count}", "buy_page", [Argument("oranges", count), Argument("fruits", "citrus")])
+              for count in range(3)],
+        ])
+
+    def buy_page(state, oranges: int, pears: int, fruits: str) -> Page:
+        return Page(state, [f"You bought {oranges} oranges and {pears} pears ({fruits})."])
+
+    server.add_route("index", index)
+    server.add_route("buy_page", buy_page)
+    server.setup(None)
+    app = TestApp(server.app)
+    page = app.get("/").text
+    assert "type='hidden'" not in page
+    actions = re.findall(r"formaction='([^']*)'", page)
+    assert len(actions) == 3 and len(set(actions)) == 3
+    result = app.post(actions[2], {"pears": "100", SUBMIT_BUTTON_KEY: '"Buy 2"'})
+    assert "You bought 2 oranges and 100 pears (citrus)." in result.text
+
+
+def test_scoped_forms_list_route_fields():
+    from webtest import TestApp
+    from drafter.server import Server
+
+    server = Server(_custom_name="TestServer", debug=False, scoped_forms=True)
+
+    def index(state) -> Page:
+        return Page(state, [TextBox("pears", "7"), TextBox("notes"), Button("Buy", buy_page),
+                            Button("Home", "index")])
+
+    def buy_page(state, pears: int) -> Page:
+        return Page(state, [f"You bought {pears} pears."])
+
+    server.add_route("index", index)
+    server.add_route("buy_page", buy_page)
+    server.setup(None)
+    app = TestApp(server.app)
+    page = app.get("/").text
+    assert "data-btlw-fields='pears'" in page
+    assert "data-btlw-fields=''" in page
+    assert "You bought 7 pears." in app.post("/buy_page", {"pears": "7", SUBMIT_BUTTON_KEY: '"Buy"'}).text
+
+
+def test_scoped_forms_do_not_change_the_buttons():
+    from webtest import TestApp
+    from drafter.server import Server
+
+    server = Server(_custom_name="TestServer", debug=False, scoped_forms=True)
+    buttons = [Button("Buy", "buy_page"), Button("Home", "index")]
+
+    def index(state) -> Page:
+        return Page(state, [TextBox("pears", "7"), Div(buttons[0]), BulletedList([buttons[1]])])
+
+    def buy_page(state, pears: int) -> Page:
+        return Page(state, [f"You bought {pears} pears."])
+
+    server.add_route("index", index)
+    server.add_route("buy_page", buy_page)
+    server.setup(None)
+    page = TestApp(server.app).get("/").text
+    assert "data-btlw-fields='pears'" in page and "data-btlw-fields=''" in page
+    # The same buttons can still be shown by a server without scoped forms
+    assert buttons == [Button("Buy", "buy_page"), Button("Home", "index")]
+    assert all("data-btlw-fields" not in str(button) for button in buttons)
+
+
+def test_get_params_parses_each_request_once():
+    import io
+    from urllib.parse import urlencode
+    from drafter.history import get_params
+    from drafter.setup import request
+
+    body = urlencode([("name", "Zoë & Ada"), ("empty", ""), ("plus", "1+1"), ("name", "later")]).encode('utf-8')
+    request.bind({'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+                  'CONTENT_LENGTH': str(len(body)), 'wsgi.input': io.BytesIO(body),
+                  'QUERY_STRING': 'page=%F0%9F%8D%90&name=first'})
+    expected = dict(request.params.decode('utf-8').items())
+    params = get_params()
+    assert params == expected == {"name": "later", "empty": "", "plus": "1+1", "page": "🍐"}
+    params.pop("page")
+    assert get_params() is params
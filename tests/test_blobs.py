@@ -0,0 +1,101 @@
+import io
+import json
+import os
+from dataclasses import dataclass
+
+import pytest
+from PIL import Image as PILImage
+
+import drafter.blobs
+import drafter.server
+from drafter.blobs import BlobStore, is_blob_reference
+from drafter.history import dehydrate_json, rehydrate_json, image_to_bytes
+from drafter.server import Server
+
+
+@dataclass
+class Album:
+    title: str
+    cover: PILImage.Image
+    raw: bytes
+
+
+def test_binary_state_is_stored_by_reference():
+    cover = PILImage.effect_noise((300, 300), 50)
+    album = Album("Reds", cover, bytes(range(256)) * 100)
+    dumped = json.dumps(dehydrate_json(album))
+    assert len(dumped) < 300
+    assert is_blob_reference(json.loads(dumped)["cover"])
+    # Dumping the same state again reuses the stored blobs
+    assert json.dumps(dehydrate_json(album)) == dumped
+    restored = rehydrate_json(json.loads(dumped), Album)
+    assert restored.title == "Reds"
+    assert restored.raw == album.raw
+    assert restored.cover.tobytes() == cover.tobytes()
+
+
+def test_older_states_with_embedded_images_still_load():
+    cover = PILImage.new("RGB", (2, 2), "blue")
+    old_state = {"title": "Blues", "cover": image_to_bytes(cover).decode('latin1'), "raw": "plain text"}
+    restored = rehydrate_json(old_state, Album)
+    assert restored.cover.tobytes() == cover.tobytes()
+
+
+def test_small_values_are_kept_inline(monkeypatch):
+    album = Album("Dots", PILImage.new("RGB", (4, 4), "green"), b"tiny")
+    dumped = json.dumps(dehydrate_json(album))
+    # A fresh store (e.g., after a restart) has none of the blobs, but they were never needed
+    monkeypatch.setattr(drafter.blobs, "BLOBS", BlobStore())
+    restored = rehydrate_json(json.loads(dumped), Album)
+    assert restored.raw == b"tiny"
+    assert restored.cover.tobytes() == album.cover.tobytes()
+
+
+def test_blobs_are_written_through_to_disk(tmp_path):
+    store = BlobStore(memory_limit=10, folder=str(tmp_path))
+    store.put("first", b"0123456789")
+    store.put("second", b"abcdefghij")
+    assert store.memory_size == 10
+    assert (tmp_path / "first").read_bytes() == b"0123456789"
+    assert (tmp_path / "second").read_bytes() == b"abcdefghij"
+    assert store.get("first") == b"0123456789"
+    assert "second" in store
+    assert store.get("missing") is None
+    assert store.get("../escape") is None
+
+
+def test_blob_folder_keeps_restorable_state_between_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(drafter.blobs, "BLOBS", BlobStore())
+    monkeypatch.setattr(drafter.server, "BLOBS", drafter.blobs.BLOBS)
+    album = Album("Noise", PILImage.effect_noise((200, 200), 50), bytes(range(256)) * 100)
+    server = Server(_custom_name="TestServer", blob_folder=str(tmp_path / "blobs"))
+    server.apply_blob_folder()
+    dumped = json.dumps(dehydrate_json(album))
+    # A restarted server starts with an empty store, but the same folder
+    monkeypatch.setattr(drafter.blobs, "BLOBS", BlobStore(folder=str(tmp_path / "blobs")))
+    restored = rehydrate_json(json.loads(dumped), Album)
+    # The image is read from memory, rather than holding the blob's file open until it is used
+    assert not isinstance(restored.cover.fp, io.BufferedReader)
+    assert restored.raw == album.raw
+    assert restored.cover.tobytes() == album.cover.tobytes()
+    # Without the folder, the state can no longer be restored
+    monkeypatch.setattr(drafter.blobs, "BLOBS", BlobStore(folder=str(tmp_path / "other")))
+    with pytest.raises(ValueError, match="blob_folder"):
+        rehydrate_json(json.loads(dumped), Album)
+
+
+def test_blob_folder_is_pruned_to_the_disk_limit(tmp_path):
+    store = BlobStore(memory_limit=0, folder=str(tmp_path), disk_limit=40)
+    for number, name in enumerate(["first", "second", "third", "fourth"]):
+        store.put(name, bytes(10))
+        os.utime(tmp_path / name, (number, number))
+    # Reading a blob marks it as recently used
+    assert store.get("first") == bytes(10)
+    store.put("fifth", bytes(10))
+    assert sorted(os.listdir(tmp_path)) == ["fifth", "first", "fourth"]
+    assert store.disk_size == 30
+    # A folder left over from an earlier run is pruned as soon as it is used again
+    smaller = BlobStore(disk_limit=20)
+    smaller.use_folder(str(tmp_path))
+    assert "fourth" not in os.listdir(tmp_path)
+    assert smaller.disk_size <= 15
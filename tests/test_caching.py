@@ -0,0 +1,36 @@
+from drafter.caching import BoundedCache
+
+
+def test_bounded_cache_evicts_least_recently_used():
+    cache = BoundedCache(2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 0)
+
+
+def test_bounded_cache_expires_entries():
+    cache = BoundedCache(2, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.pop("a", "gone") == "gone"
+    assert len(cache) == 0
+    assert BoundedCache(2, ttl=60).set("a", 1) == 1
+
+
+def test_bounded_cache_limits_total_bytes():
+    cache = BoundedCache(100, maxbytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"5678")
+    cache.set("a", b"12")
+    assert cache.total_bytes == 6
+    cache.set("c", b"90123")
+    assert "b" not in cache and cache.get("a") == b"12"
+    assert cache.total_bytes == 7
+    # An entry larger than the limit is still kept, on its own
+    cache.set("d", b"x" * 20)
+    assert len(cache) == 1 and cache.total_bytes == 20
+    assert cache.pop("d") and cache.total_bytes == 0
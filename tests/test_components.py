@@ -0,0 +1,202 @@
+from tests.helpers import *
+import io
+from drafter.caching import GenerationalCache
+from drafter.components import structural_key
+from drafter.configuration import ServerConfiguration
+
+
+def test_components_compare_by_value():
+    assert Page(None, [Text("Hi"), Header("Title", 2), Div("a", Row("b")), LineBreak()]) == \
+           Page(None, [Text("Hi"), Header("Title", 2), Div("a", Row("b")), LineBreak()])
+    assert Text("Hi") != Text("Bye")
+    assert Text("Hi", style_color="red") != Text("Hi")
+
+
+def test_components_do_not_share_updated_settings():
+    first, second = Text("One"), Text("Two")
+    first.update_style("color", "red")
+    assert str(first) == "<span  style='color: red'>One</span>"
+    assert str(second) == "Two"
+    assert not hasattr(second, "__dict__")
+
+
+def test_rows_share_empty_settings():
+    first, second = Row("a"), Row("b")
+    assert first.extra_settings is second.extra_settings
+    first.update_style("color", "red")
+    assert str(first) == "<div  style='display: flex; flex-direction: row; align-items: center; color: red'>a</div>"
+    assert str(second) == "<div  style='display: flex; flex-direction: row; align-items: center'>b</div>"
+
+
+def test_row_settings_override_its_layout():
+    updated = Row("a").update_style("align_items", "start")
+    assert "align-items: start" in str(updated) and "center" not in str(updated)
+    given = Row("a", style_flex_direction="column", style_align_items="end")
+    assert str(given) == "<div  style='display: flex; flex-direction: column; align-items: end'>a</div>"
+
+
+def test_memo_reuses_rendered_content():
+    calls = []
+
+    def build_help():
+        calls.append(True)
+        return ["Some very long help text", Text("More help")]
+
+    first = str(Memo("help-v1", build_help))
+    second = str(Div(Memo("help-v1", build_help)))
+    assert first == "<p>Some very long help text</p>\nMore help"
+    assert second == f"<div >{first}</div>"
+    assert len(calls) == 1
+    str(Memo(["help", 2], build_help))
+    str(Memo(["help", 2], build_help))
+    assert len(calls) == 2
+    assert Memo("help-v1", build_help) == Memo("help-v1", build_help)
+
+
+def test_memo_keeps_closures_and_configurations_apart():
+    def make_builder(name):
+        return lambda: [f"Hello, {name}"]
+
+    assert str(Memo("greeting", make_builder("Ada"))) == "<p>Hello, Ada</p>"
+    assert str(Memo("greeting", make_builder("Grace"))) == "<p>Hello, Grace</p>"
+    # A new closure with the same captured values reuses the rendered content
+    assert Memo("greeting", make_builder("Ada")).cache_key() == Memo("greeting", make_builder("Ada")).cache_key()
+
+    from PIL import Image as PILImage
+    picture = PILImage.new("RGB", (2, 2), "red")
+    served = Memo("picture", lambda: [Image(picture)]).render(None, ServerConfiguration())
+    embedded = Memo("picture", lambda: [Image(picture)]).render(None, ServerConfiguration(serve_generated_images=False))
+    assert "/--img/" in served and "base64" in embedded
+
+
+def test_structural_key_matches_identical_components():
+    assert structural_key(Div("A", Button("Go", "next"))) == structural_key(Div("A", Button("Go", "next")))
+    assert structural_key(Div("A", Button("Go", "next"))) != structural_key(Div("A", Button("Go", "back")))
+    assert structural_key(Text("1")) != structural_key(Text(1))
+    assert structural_key(Table([[1, 2], [3, 4]])) is not None
+    assert structural_key(Text("x", style_color="red")) != structural_key(Text("x", style_color="blue"))
+    assert structural_key(Memo("help", list)) is None
+
+
+def test_render_cache_reuses_unchanged_components():
+    configuration = ServerConfiguration()
+    cache = GenerationalCache()
+    first = Page(None, ["Hello", Table([[1, 2]]), Text("Count: 1")])
+    second = Page(None, ["Hello", Table([[1, 2]]), Text("Count: 2")])
+    assert first.render_content(None, configuration, cache) == first.render_content(None, configuration)
+    assert second.render_content(None, configuration, cache) == second.render_content(None, configuration)
+    assert cache.hits == 1
+    assert cache.misses == 3
+    # The HTML of "Count: 1" is forgotten, since it was not used in the latest render
+    assert len(cache) == 2
+
+
+def test_form_encoding_depends_on_file_inputs():
+    configuration = ServerConfiguration()
+    plain = Page(None, [TextBox("name"), Button("Go", "index")]).render_content(None, configuration)
+    assert "enctype='application/x-www-form-urlencoded'" in plain
+    nested = Page(None, [Div(FileUpload("photo"))]).render_content(None, configuration)
+    assert "enctype='multipart/form-data'" in nested
+    in_table = Page(None, [Table([[FileUpload("photo")]])]).render_content(None, configuration)
+    assert "enctype='multipart/form-data'" in in_table
+
+
+def test_pil_images_are_served_by_content():
+    from PIL import Image as PILImage
+    from webtest import TestApp
+    from drafter.server import Server
+
+    picture = PILImage.new("RGB", (40, 30), "red")
+    same_picture = PILImage.new("RGB", (40, 30), "red")
+    configuration = ServerConfiguration()
+    rendered = Image(picture).render(None, configuration)
+    assert rendered == Image(same_picture).render(None, configuration)
+    assert rendered.startswith("<img src='/--img/") and "base64" not in rendered
+    assert "data:image/png;base64" in Image(picture).render(None, ServerConfiguration(serve_generated_images=False))
+
+    server = Server(_custom_name="TestServer", debug=False)
+    server.add_route("index", lambda: Page(None, [Image(picture)]))
+    server.setup(None)
+    app = TestApp(server.app)
+    url = rendered.split("'")[1]
+    served = app.get(url)
+    assert served.content_type == "image/png" and "immutable" in served.headers["Cache-Control"]
+    assert PILImage.open(io.BytesIO(served.body)).size == (40, 30)
+    app.get(url, headers={"If-None-Match": served.headers["ETag"]}, status=304)
+    app.get("/--img/missing.png", status=404)
+
+
+def test_pages_with_many_generated_images_serve_all_of_them():
+    from PIL import Image as PILImage
+    from webtest import TestApp
+    from drafter.server import Server
+
+    pictures = [PILImage.new("RGB", (8, 8), (index, 0, 0)) for index in range(100)]
+    server = Server(_custom_name="TestServer", debug=False)
+    server.add_route("index", lambda: Page(None, [Image(picture) for picture in pictures]))
+    server.setup(None)
+    app = TestApp(server.app)
+    urls = [part.split("'")[0] for part in app.get("/").text.split("<img src='")[1:]]
+    assert len(set(urls)) == 100
+    for url in urls:
+        assert app.get(url).content_type == "image/png"
+
+
+def test_responsive_images_use_resized_copies(tmp_path, monkeypatch):
+    from PIL import Image as PILImage
+    from webtest import TestApp
+    from drafter.server import Server
+
+    (tmp_path / "photos").mkdir()
+    PILImage.new("RGB", (800, 600), "blue").save(tmp_path / "photos" / "lake.png")
+    configuration = ServerConfiguration(responsive_images=True)
+    rendered = Image("lake.png", 200).render(None, configuration)
+    assert "loading='lazy'" in rendered
+    assert "src='images/lake.png?w=200&format=webp'" in rendered
+    assert "images/lake.png?w=400&format=webp 2x" in rendered
+    assert "320w" in Image("lake.png").render(None, configuration)
+
+    monkeypatch.chdir(tmp_path)
+    server = Server(_custom_name="TestServer", debug=False, src_image_folder="photos",
+                    image_cache_folder=str(tmp_path / "cache"))
+    server.add_route("index", lambda: Page(None, ["Hi"]))
+    server.setup(None)
+    app = TestApp(server.app)
+    resized = app.get("/images/lake.png?w=200&format=webp")
+    assert resized.content_type == "image/webp"
+    assert PILImage.open(io.BytesIO(resized.body)).size == (200, 150)
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    app.get("/images/lake.png?w=200&format=webp")
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+    app.get("/images/lake.png?w=huge", status=400)
+    app.get("/images/../lake.png?w=20", status=403)
+
+
+def test_image_files_are_served_with_validators(tmp_path, monkeypatch):
+    from webtest import TestApp
+    from drafter.server import Server
+
+    (tmp_path / "photos").mkdir()
+    (tmp_path / "photos" / "cat.jpg").write_bytes(b"not really a jpeg")
+    monkeypatch.chdir(tmp_path)
+
+    def make_app(**settings):
+        server = Server(_custom_name="TestServer", debug=False, src_image_folder="photos", **settings)
+        server.add_route("index", lambda: Page(None, ["Hi"]))
+        server.setup(None)
+        return TestApp(server.app)
+
+    app = make_app(image_cache_control="public, max-age=60")
+    first = app.get("/images/cat.jpg")
+    assert first.content_type == "image/jpeg"
+    assert first.headers["Cache-Control"] == "public, max-age=60"
+    etag = first.headers["ETag"]
+    assert etag.startswith('"') and "Last-Modified" in first.headers
+    assert app.get("/images/cat.jpg", headers={"If-None-Match": f'"other", W/{etag}'}, status=304).body == b""
+    partial = app.get("/images/cat.jpg", headers={"Range": "bytes=0-2"}, status=206)
+    assert partial.body == b"not"
+
+    offloaded = make_app(image_sendfile_header="X-Accel-Redirect", image_sendfile_prefix="/protected")
+    response = offloaded.get("/images/cat.jpg")
+    assert response.body == b""
+    assert response.headers["X-Accel-Redirect"] == "/protected" + (tmp_path / "photos" / "cat.jpg").as_posix()
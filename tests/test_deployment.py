@@ -0,0 +1,49 @@
+import gzip
+
+from webob import Request
+from webtest import TestApp
+
+from tests.helpers import *
+from drafter.server import Server, bundle_files_into_js
+
+
+def make_project(folder):
+    (folder / "main.py").write_text("print('</script>')\n")
+    (folder / "data").mkdir()
+    (folder / "data" / "words.txt").write_text("apple\n")
+    for excluded in (".git", "venv", "__pycache__"):
+        (folder / excluded).mkdir()
+        (folder / excluded / "ignored.py").write_text("nothing to see\n")
+    return str(folder / "main.py")
+
+
+def test_bundles_skip_excluded_folders_and_reuse_unchanged_files(tmp_path, monkeypatch):
+    main_file = make_project(tmp_path)
+    cache = {}
+    bundled, skipped, added = bundle_files_into_js(main_file, str(tmp_path), cache=cache)
+    assert sorted(added) == sorted([main_file, str(tmp_path / "data" / "words.txt")])
+    assert 'Sk.builtinFiles.files["main.py"] = "print(\'<\\/script>\')\\n";' in bundled
+    assert "ignored" not in bundled
+
+    main_entry = cache[main_file]
+    (tmp_path / "data" / "words.txt").write_text("apple\nbanana\n")
+    again, _, _ = bundle_files_into_js(main_file, str(tmp_path), cache=cache)
+    assert "banana" in again
+    # The main file did not change, so it was not read again
+    assert cache[main_file] is main_entry
+
+def test_deployment_page_is_compressed_and_cached(tmp_path):
+    server = Server(_custom_name="TestServer", debug=False)
+    server.add_route("index", lambda: Page(None, ["Hi"]))
+    server.setup(None)
+    server._deployment_main_file = make_project(tmp_path)
+    app = TestApp(server.app)
+    # WebTest would decompress the response by itself, so the app is called through WebOb directly
+    response = Request.blank("/--test-deployment", headers={"Accept-Encoding": "gzip"}).get_response(server.app)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Sk.builtinFiles.files" in gzip.decompress(response.body).decode("utf-8")
+    app.get("/--test-deployment", headers={"If-None-Match": response.headers["ETag"]}, status=304)
+    (tmp_path / "data" / "words.txt").write_text("cherry\n")
+    changed = app.get("/--test-deployment")
+    assert changed.headers["ETag"] != response.headers["ETag"]
+    assert "cherry" in changed.text
@@ -0,0 +1,75 @@
+from webtest import TestApp
+
+from tests.helpers import *
+import drafter.caching
+from drafter.configuration import ServerConfiguration
+from drafter.downloads import DOWNLOAD_TTL, DOWNLOAD_BYTES, DOWNLOADS, register_download
+from drafter.server import Server
+
+
+def make_download_app(*downloads, **configuration):
+    server = Server(_custom_name="TestServer", debug=False, **configuration)
+    server.add_route("index", lambda: Page(None, list(downloads)))
+    server.setup(None)
+    return TestApp(server.app)
+
+
+def download_urls(page):
+    return [part.split('"')[0] for part in page.text.split('href="/--download/')[1:]]
+
+
+def test_downloads_are_served_instead_of_embedded():
+    report = "name,count\n" + "apple,1\n" * 10000
+    app = make_download_app(Download("Report", "résumé report.csv", report, "text/csv"),
+                            Download("Stream", "lines.txt", (f"line {i}\n" for i in range(3))))
+    page = app.get("/")
+    assert "apple,1" not in page.text
+    report_url, stream_url = download_urls(page)
+    # The same content gets the same link every time the page is shown
+    assert download_urls(app.get("/"))[0] == report_url
+
+    full = app.get("/--download/" + report_url)
+    assert full.content_type == "text/csv"
+    assert full.text == report
+    assert full.headers["Content-Disposition"] == (
+        "attachment; filename=\"r?sum? report.csv\"; filename*=UTF-8''r%C3%A9sum%C3%A9%20report.csv")
+    part = app.get("/--download/" + report_url, headers={"Range": "bytes=5-9"}, status=206)
+    assert part.text == "count"
+    assert part.headers["Content-Range"] == f"bytes 5-9/{len(report)}"
+    app.get("/--download/" + report_url, headers={"If-None-Match": full.headers["ETag"]}, status=304)
+
+    stream = download_urls(app.get("/"))[1]
+    assert app.get("/--download/" + stream).text == "line 0\nline 1\nline 2\n"
+    app.get("/--download/" + stream, status=404)
+
+
+def test_downloads_without_a_server_use_quoted_data_urls():
+    configuration = ServerConfiguration(skulpt=True)
+    link = Download("Notes", "notes.txt", "a & b <c>\n").render(None, configuration)
+    assert 'href="data:text/plain,a%20%26%20b%20%3Cc%3E%0A"' in link
+    assert 'href="data:application/octet-stream;base64,AAE="' in str(Download("Raw", "raw.bin", b"\x00\x01",
+                                                                             "application/octet-stream"))
+
+
+def test_showing_a_download_again_keeps_its_link_working(monkeypatch):
+    app = make_download_app(Download("Notes", "notes.txt", "some notes"), cache_static_chunks=True)
+    url = download_urls(app.get("/"))[0]
+    now = drafter.caching.monotonic()
+    monkeypatch.setattr(drafter.caching, "monotonic", lambda: now + DOWNLOAD_TTL * 0.75)
+    assert download_urls(app.get("/"))[0] == url
+    monkeypatch.setattr(drafter.caching, "monotonic", lambda: now + DOWNLOAD_TTL * 1.5)
+    assert app.get("/--download/" + url).text == "some notes"
+    monkeypatch.setattr(drafter.caching, "monotonic", lambda: now + DOWNLOAD_TTL * 3)
+    app.get("/--download/" + url, status=404)
+
+
+def test_downloads_are_bounded_by_size():
+    DOWNLOADS.clear()
+    half = b"x" * (DOWNLOAD_BYTES // 2)
+    first = register_download(half, "application/octet-stream", "first.bin")
+    second = register_download(half + b"y", "application/octet-stream", "second.bin")
+    # The first download is forgotten to make room for the second, even though few downloads are stored
+    assert DOWNLOADS.get(first) is None
+    assert len(DOWNLOADS.get(second)) == len(half) + 1
+    assert DOWNLOADS.total_bytes <= DOWNLOAD_BYTES
+    DOWNLOADS.clear()
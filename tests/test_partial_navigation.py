@@ -0,0 +1,182 @@
+from dataclasses import dataclass
+from urllib.parse import urljoin
+
+from bottle import Bottle
+from webtest import TestApp
+
+from tests.helpers import *
+from drafter.constants import PARTIAL_NAVIGATION_HEADER, PAGE_VERSION_HEADER, PREFETCH_HEADER
+from drafter.patching import diff_chunks
+from drafter.server import Server, start_server
+
+
+@dataclass
+class Counter:
+    count: int
+
+
+def make_counter_app(**configuration):
+    server = Server(_custom_name="TestServer", debug=False, **configuration)
+
+    def index(state: Counter) -> Page:
+        return Page(state, [Text(f"Count: {state.count}"), Button("Add", add)])
+
+    def add(state: Counter) -> Page:
+        state.count += 1
+        return index(state)
+
+    server.add_route("index", index)
+    server.add_route("add", add)
+    server.setup(Counter(0))
+    return TestApp(server.app)
+
+
+def test_partial_navigation_returns_only_content():
+    app = make_counter_app(partial_navigation=True)
+    full = app.get("/")
+    assert "data-btlw-partial='true'" in full.text
+    assert "<html>" in full.text
+    partial = app.post("/add", headers={PARTIAL_NAVIGATION_HEADER: "1"})
+    assert partial.headers[PARTIAL_NAVIGATION_HEADER] == "1"
+    assert "<html>" not in partial.text
+    assert "Count: 1" in partial.text
+    assert len(partial.text) < len(full.text) / 2
+
+
+def test_partial_navigation_is_opt_in():
+    app = make_counter_app()
+    assert "data-btlw-partial='true'" not in app.get("/").text
+    response = app.post("/add", headers={PARTIAL_NAVIGATION_HEADER: "1"})
+    assert "<html>" in response.text
+    assert PARTIAL_NAVIGATION_HEADER not in response.headers
+
+
+def test_patch_navigation_sends_only_changed_chunks():
+    app = make_counter_app(patch_navigation=True)
+    full = app.get("/")
+    version = full.headers[PAGE_VERSION_HEADER]
+    assert f"data-btlw-version='{version}'" in full.text
+    patched = app.post("/add", headers={PARTIAL_NAVIGATION_HEADER: "1", PAGE_VERSION_HEADER: version})
+    assert patched.headers[PARTIAL_NAVIGATION_HEADER] == "patch"
+    assert len(patched.json["ops"]) == 1
+    start, end, added = patched.json["ops"][0]
+    assert (start, end) == (0, 1)
+    assert added == ["<div class='btlw-chunk' style='display: contents'>Count: 1</div>"]
+    # A browser showing an older version of the page gets all of the content instead
+    stale = app.post("/add", headers={PARTIAL_NAVIGATION_HEADER: "1", PAGE_VERSION_HEADER: version})
+    assert stale.headers[PARTIAL_NAVIGATION_HEADER] == "1"
+    assert "Count: 2" in stale.text
+
+
+def test_patch_navigation_sends_full_content_when_file_upload_added():
+    server = Server(_custom_name="TestServer", debug=False, patch_navigation=True)
+
+    def index(state: Counter) -> Page:
+        return Page(state, [Text(f"Count: {state.count}"), Button("Add", add)])
+
+    def add(state: Counter) -> Page:
+        state.count += 1
+        return Page(state, [Text(f"Count: {state.count}"), FileUpload("photo"), Button("Add", add)])
+
+    server.add_route("index", index)
+    server.add_route("add", add)
+    server.setup(Counter(0))
+    app = TestApp(server.app)
+    full = app.get("/")
+    assert "application/x-www-form-urlencoded" in full.text
+    version = full.headers[PAGE_VERSION_HEADER]
+    # The form must switch to multipart, which a patch of the chunks alone cannot do
+    response = app.post("/add", headers={PARTIAL_NAVIGATION_HEADER: "1", PAGE_VERSION_HEADER: version})
+    assert response.headers[PARTIAL_NAVIGATION_HEADER] == "1"
+    assert "enctype='multipart/form-data'" in response.text
+
+
+def test_diff_chunks_splices():
+    assert diff_chunks(["a", "b", "c"], ["a", "c", "d"]) == [[1, 2, []], [3, 3, ["d"]]]
+    assert diff_chunks(["a"], ["a"]) == []
+
+
+def test_prefetched_links_do_not_run_twice():
+    calls = []
+    server = Server(_custom_name="TestServer", debug=False, prefetch_links="hover")
+
+    def index(state: Counter) -> Page:
+        return Page(state, [Text(f"Count: {state.count}"), Link("Add", "add"), Link("Plus one", "add")])
+
+    def add(state: Counter) -> Page:
+        calls.append(state.count)
+        state.count += 1
+        return index(state)
+
+    server.add_route("index", index)
+    server.add_route("add", add)
+    server.setup(Counter(0))
+    app = TestApp(server.app)
+    page = app.get("/")
+    assert "data-btlw-prefetch='hover'" in page.text
+    add_url, plus_one_url = [link["href"] for link in page.html.find_all("a") if link["href"].startswith("/add")]
+    for url in (add_url, plus_one_url):
+        assert app.get(url, headers={PREFETCH_HEADER: "1"}, status=204).text == ""
+    assert server._state.count == 0
+    assert calls == [0, 0]
+    # Each link was prepared separately, so the right one is recorded as pressed
+    assert "Count: 1" in app.get(plus_one_url).text
+    assert calls == [0, 0]
+    assert server._page_history[-1][0].button_pressed == "Plus one"
+    # The state changed, so the page has to be created again
+    assert "Count: 2" in app.get(add_url).text
+    assert calls == [0, 0, 1]
+    assert server._page_history[-1][0].button_pressed == "Add"
+
+
+def test_prefetching_does_not_touch_the_server_state():
+    server = Server(_custom_name="TestServer", debug=False, prefetch_links="hover")
+    seen = []
+
+    def index(state: Counter) -> Page:
+        return Page(state, [Link("Add", "add")])
+
+    def add(state: Counter) -> Page:
+        seen.append(state is server._state)
+        state.count += 1
+        return index(state)
+
+    server.add_route("index", index)
+    server.add_route("add", add)
+    server.setup(Counter(0))
+    app = TestApp(server.app)
+    app.get("/add?--submit-button=Add", headers={PREFETCH_HEADER: "1"}, status=204)
+    assert seen == [False] and server._state.count == 0
+
+
+def test_post_redirect_get_serves_stored_result():
+    app = make_counter_app(post_redirect_get=True, partial_navigation=True)
+    submitted = app.post("/add", status=303)
+    assert submitted.location.startswith("http://localhost:80/--page-")
+    result = submitted.follow()
+    assert "Count: 1" in result.text and "<html>" in result.text
+    # Refreshing (or going back to) the result does not run the route again
+    assert "Count: 1" in submitted.follow(headers={PARTIAL_NAVIGATION_HEADER: "1"}).text
+    assert "Count: 1" in app.get("/").text
+    assert app.get("/--page-missing", status=303).location.endswith("/")
+
+
+def test_reset_works_from_a_result_page():
+    app = make_counter_app(post_redirect_get=True)
+    result = app.post("/add", status=303).follow()
+    assert "Count: 1" in result.text
+    reset_link = result.html.find("a", class_="btlw-reset")["href"]
+    reset = app.get(urljoin(result.request.path, reset_link))
+    assert "Count: 0" in reset.text
+    assert "Count: 0" in app.get("/").text
+
+
+def test_post_redirect_get_can_be_enabled_when_running(monkeypatch):
+    server = Server(_custom_name="TestServer", debug=False)
+    server.add_route("index", lambda state: Page(state, [Button("Add", "add")]))
+    server.add_route("add", lambda state: Page(Counter(state.count + 1), [Text(f"Count: {state.count + 1}")]))
+    monkeypatch.setattr(Bottle, "run", lambda self, **kwargs: None)
+    start_server(Counter(0), server=server, post_redirect_get=True)
+    app = TestApp(server.app)
+    submitted = app.post("/add", status=303)
+    assert "Count: 1" in submitted.follow().text
@@ -0,0 +1,67 @@
+import pytest
+
+from webtest import TestApp
+
+from tests.helpers import *
+from drafter.configuration import ServerConfiguration
+from drafter.image_support import GENERATED_IMAGES
+from drafter.server import Server
+
+plt = pytest.importorskip("matplotlib.pyplot")
+
+
+def draw(data, title="Data"):
+    plt.plot(data)
+    plt.title(title)
+    return MatPlotLibPlot()
+
+
+def test_unchanged_plots_are_only_drawn_once(monkeypatch):
+    import drafter.components
+    drawn = []
+    original = drafter.components.render_figure
+    monkeypatch.setattr(drafter.components, "render_figure", lambda *args: drawn.append(1) or original(*args))
+    configuration = ServerConfiguration()
+
+    first = draw([1, 2, 3]).render(None, configuration)
+    again = draw([1, 2, 3]).render(None, configuration)
+    other = draw([1, 2, 4]).render(None, configuration)
+    assert first == again != other
+    assert first.startswith("<img src='/--img/")
+    assert len(drawn) == 2
+    assert plt.get_fignums() == []
+
+    key = first.split("/--img/")[1].split(".png")[0]
+    assert GENERATED_IMAGES.get(key).startswith(b"\x89PNG")
+    plt.plot([5, 6])
+    assert MatPlotLibPlot({"format": "svg"}).render(None, configuration).lstrip().startswith("<?xml")
+
+
+def test_plots_can_be_drawn_in_other_processes():
+    server = Server(_custom_name="TestServer", debug=False, plot_processes=1)
+    server.add_route("index", lambda: Page(None, [draw([3, 1, 2], "In another process")]))
+    server.setup(None)
+    app = TestApp(server.app)
+    page = app.get("/")
+    url = page.text.split("<img src='")[1].split("'")[0]
+    image = app.get(url)
+    assert image.content_type == "image/png"
+    assert image.body.startswith(b"\x89PNG")
+
+
+def test_explicit_figures_can_be_drawn_in_parallel():
+    from concurrent.futures import ThreadPoolExecutor
+    from matplotlib.figure import Figure
+
+    def plot(number):
+        figure = Figure()
+        figure.add_subplot().bar(range(number), range(number))
+        url = MatPlotLibPlot(figure=figure).render(None, ServerConfiguration())
+        return GENERATED_IMAGES.get(url.split("/--img/")[1].split(".png")[0])
+
+    expected = [plot(number) for number in range(1, 9)]
+    GENERATED_IMAGES.clear()
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(plot, range(1, 9))) == expected
+    assert len(set(expected)) == 8
+    assert plt.get_fignums() == []
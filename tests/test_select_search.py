@@ -0,0 +1,71 @@
+import hashlib
+
+from webtest import TestApp
+
+from tests.helpers import *
+from drafter.configuration import ServerConfiguration
+from drafter.search import get_option_index, search_options
+from drafter.server import Server
+
+STUDENTS = [f"Student {i:04}" for i in range(1000)] + ["ada lovelace", "Alan Turing"]
+
+
+def test_option_index_is_cached():
+    first = get_option_index(STUDENTS)
+    second = get_option_index(list(STUDENTS))
+    assert first is second
+
+
+def test_option_index_prefix_search():
+    index = get_option_index(STUDENTS)
+    assert index.search("student 099", 3) == ["Student 0990", "Student 0991", "Student 0992"]
+    assert index.search("A") == ["ada lovelace", "Alan Turing"]
+    assert index.search("Z") == []
+    assert search_options(index.key, "alan") == ["Alan Turing"]
+    assert search_options("missing", "alan") is None
+
+
+def test_option_index_keys_do_not_depend_on_the_process():
+    expected = hashlib.sha1("\0".join(STUDENTS).encode('utf-8')).hexdigest()[:16]
+    assert get_option_index(STUDENTS).key == expected
+
+
+def test_searching_a_forgotten_index_is_not_found():
+    server = Server(_custom_name="TestServer", debug=False)
+    server.add_route("index", lambda: Page(None, [SelectBox("student", STUDENTS, max_options=5)]))
+    server.setup(None)
+    app = TestApp(server.app)
+    search_url = app.get("/").text.split("data-btlw-search='")[1].split("'")[0]
+    assert app.get(search_url, {"q": "alan"}).json == ["Alan Turing"]
+    app.get("/--select-search/0123456789abcdef", {"q": "alan"}, status=404)
+
+
+def test_large_select_box_only_sends_some_options():
+    box = SelectBox("student", STUDENTS, "Student 0500", max_options=5)
+    rendered = box.render(None, ServerConfiguration())
+    assert rendered.count("<option") == 5
+    assert "data-btlw-search=" in rendered
+    assert "value='Student 0500'" in rendered
+    assert str(SelectBox("student", STUDENTS[:3])).count("<option") == 3
+    assert box == SelectBox("student", STUDENTS, "Student 0500", max_options=5)
+    assert box != SelectBox("student", STUDENTS, "Student 0500", max_options=6)
+
+
+def test_select_box_without_a_server_sends_every_option():
+    box = SelectBox("student", STUDENTS, max_options=5)
+    for rendered in (str(box), box.render(None, ServerConfiguration(skulpt=True))):
+        assert rendered.count("<option") == len(STUDENTS)
+        assert "data-btlw-search=" not in rendered
+
+
+def test_cached_select_box_keeps_its_option_index():
+    server = Server(_custom_name="TestServer", debug=False, cache_static_chunks=True)
+    server.add_route("index", lambda: Page(None, [SelectBox("student", STUDENTS, max_options=5)]))
+    server.setup(None)
+    app = TestApp(server.app)
+    search_url = app.get("/").text.split("data-btlw-search='")[1].split("'")[0]
+    # Another page's lists push this index out of the cache, but showing the page again brings it back
+    for size in range(100):
+        get_option_index(STUDENTS[:size])
+    app.get("/")
+    assert search_options(search_url.rsplit("/", 1)[1], "alan") == ["Alan Turing"]
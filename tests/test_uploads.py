@@ -0,0 +1,106 @@
+import io
+import pathlib
+from typing import BinaryIO, List
+
+from PIL import Image as PILImage
+
+from webtest import TestApp
+
+from tests.helpers import *
+from drafter.server import Server
+
+
+def make_upload_app(**configuration):
+    server = Server(_custom_name="TestServer", debug=False, **configuration)
+
+    def index() -> Page:
+        return Page(None, [FileUpload("data")])
+
+    def view(data: memoryview) -> Page:
+        return Page(None, [f"Lines: {len(bytes(data).splitlines())}"])
+
+    def stream(data: BinaryIO) -> Page:
+        return Page(None, [f"First: {data.readline().decode().strip()}"])
+
+    def save(data: pathlib.Path) -> Page:
+        return Page(None, [f"Saved: {data.name} {data.read_bytes().decode()}"])
+
+    def text(data: str) -> Page:
+        return Page(None, [f"Text: {data}"])
+
+    def texts(data: List[str]) -> Page:
+        return Page(None, [f"Texts: {' + '.join(data)}"])
+
+    def untyped(data) -> Page:
+        return Page(None, [f"Untyped: {data.filename}"])
+
+    def image(data: PILImage.Image) -> Page:
+        return Page(None, [f"Size: {data.size}"])
+
+    def images(data: List[PILImage.Image]) -> Page:
+        return Page(None, [f"Sizes: {[image.size for image in data]}"])
+
+    for function in (index, view, stream, save, text, texts, untyped, image, images):
+        server.add_route(function.__name__, function)
+    server.setup(None)
+    return TestApp(server.app)
+
+
+def test_uploads_convert_without_reading_into_memory(tmp_path):
+    app = make_upload_app(upload_folder=str(tmp_path))
+    big = b"name,count\n" + b"apple,1\n" * 50000
+    upload = [("data", "fruit.csv", big)]
+    assert "Lines: 50001" in app.post("/view", upload_files=upload).text
+    assert "First: name,count" in app.post("/stream", upload_files=upload).text
+    assert "Saved: small.txt hello" in app.post("/save", upload_files=[("data", "small.txt", b"hello")]).text
+    app.post("/save", upload_files=[("data", "small.txt", b"hello")])
+    assert len(list(tmp_path.iterdir())) == 1
+    assert "Text: héllo" in app.post("/text", upload_files=[("data", "a.txt", "héllo".encode())]).text
+
+
+def test_uploads_over_the_limit_are_refused():
+    app = make_upload_app(max_upload_size=10)
+    assert "Text: short" in app.post("/text", upload_files=[("data", "a.txt", b"short")]).text
+    response = app.post("/text", upload_files=[("data", "a.txt", b"much too long")], expect_errors=True)
+    assert "uploads can be at most 10 bytes" in response.text
+
+
+def make_png(width, height):
+    with io.BytesIO() as output:
+        PILImage.new("RGB", (width, height)).save(output, format="PNG")
+        return output.getvalue()
+
+
+def test_multiple_uploads_become_lists(tmp_path, monkeypatch):
+    # Representing the uploaded images for the page history saves them into the image folder
+    monkeypatch.chdir(tmp_path)
+    app = make_upload_app()
+    two_files = [("data", "a.txt", b"first"), ("data", "b.txt", b"second")]
+    assert "Texts: first + second" in app.post("/texts", upload_files=two_files).text
+    assert "Texts: only" in app.post("/texts", upload_files=[("data", "a.txt", b"only")]).text
+    # Without a list annotation, the last file is still used
+    assert "Text: second" in app.post("/text", upload_files=two_files).text
+    assert "Untyped: b.txt" in app.post("/untyped", upload_files=two_files).text
+    pictures = [("data", "a.png", make_png(3, 4)), ("data", "b.png", make_png(5, 6))]
+    assert "Sizes: [(3, 4), (5, 6)]" in app.post("/images", upload_files=pictures).text
+    broken = pictures + [("data", "c.png", b"not an image"), ("data", "d.txt", b"nor this")]
+    response = app.post("/images", upload_files=broken, expect_errors=True)
+    assert "Could not convert 2 of the 4 uploaded files" in response.text
+    assert "c.png" in response.text and "d.txt" in response.text
+
+
+def make_jpeg(width, height):
+    with io.BytesIO() as output:
+        PILImage.new("RGB", (width, height), "green").save(output, format="JPEG")
+        return output.getvalue()
+
+
+def test_uploaded_images_are_decoded_at_a_limited_size(tmp_path, monkeypatch):
+    # Representing the uploaded images for the page history saves them into the image folder
+    monkeypatch.chdir(tmp_path)
+    app = make_upload_app(max_upload_image_size=100, max_upload_image_pixels=2_000_000)
+    assert "Size: (100, 50)" in app.post("/image", upload_files=[("data", "a.jpg", make_jpeg(800, 400))]).text
+    assert "Size: (60, 100)" in app.post("/image", upload_files=[("data", "a.png", make_png(300, 500))]).text
+    assert "Size: (30, 20)" in app.post("/image", upload_files=[("data", "a.png", make_png(30, 20))]).text
+    response = app.post("/image", upload_files=[("data", "a.png", make_png(2000, 1001))], expect_errors=True)
+    assert "more than the 2000000 pixels allowed" in response.text
@@ -0,0 +1,13 @@
+from drafter.urls import merge_url_query_params, remove_url_query_params, make_submit_url
+
+
+def test_merge_url_query_params():
+    assert merge_url_query_params("/index", {"a": "Hi there"}) == "/index?a=Hi+there"
+    assert merge_url_query_params("/index?a=1&b=2", {"a": "3"}) == "/index?a=3&b=2"
+    assert merge_url_query_params("/index#top", {"a": "1"}) == "/index?a=1#top"
+    assert make_submit_url("/index", "Go!") == "/index?--submit-button=Go%21"
+
+
+def test_remove_url_query_params():
+    assert remove_url_query_params("http://localhost:8080/index", {"a"}) == "http://localhost:8080/index"
+    assert remove_url_query_params("/index?a=1&b=2", {"a"}) == "/index?b=2"
@@ -0,0 +1,115 @@
+import pytest
+
+from tests.helpers import *
+
+
+def make_server():
+    server = Server(_custom_name="VERIFY_SERVER")
+
+    @route(server=server)
+    def index(state) -> Page:
+        return Page(state, ["Hello"])
+
+    @route(server=server)
+    def second(state) -> Page:
+        return Page(state, ["Second"])
+
+    return server
+
+
+def test_nested_links_are_verified():
+    server = make_server()
+    page = Page(None, [Div("Go to", Row(Link("the second page", "second"), Button("Home", "index")))])
+    assert page.verify_content(server)
+
+    broken = Page(None, [Div("Go to", Row(Link("nowhere", "missing_page")))])
+    with pytest.raises(ValueError, match="non-existent page `/missing_page`"):
+        broken.verify_content(server)
+
+    broken_button = Page(None, [BulletedList([Button("Missing", "missing_button")])])
+    with pytest.raises(ValueError, match="non-existent page `/missing_button`"):
+        broken_button.verify_content(server)
+
+
+def test_external_links_are_verified():
+    server = make_server()
+    assert Page(None, [Link("Example", "https://example.com")]).verify_content(server)
+    with pytest.raises(ValueError, match="local file"):
+        Page(None, [Div(Link("Local", "file://secret.txt"))]).verify_content(server)
+
+
+def test_url_checks_are_cached_until_routes_change():
+    server = make_server()
+    assert server.check_url("/third") is None
+
+    @route(server=server)
+    def third(state) -> Page:
+        return Page(state, ["Third"])
+
+    assert server.check_url("/third") == ""
+    assert server.check_url("/?--submit-button=%22Home%22") == ""
+
+
+@pytest.mark.parametrize("url", ["#top", "second#details", "/second?x=1#details", "index#top",
+                                 "mailto:someone@example.com", "tel:+15555555555",
+                                 "--reset", "/--test-deployment", "https://example.com/page#section"])
+def test_fragments_other_schemes_and_special_routes_are_valid(url):
+    server = make_server()
+    assert Page(None, [Link("Go", url), Button("Go", url)]).verify_content(server)
+
+
+@pytest.mark.parametrize("url", ["--rest", "/--reset-everything", "/--select-search"])
+def test_only_real_special_routes_are_valid(url):
+    server = make_server()
+    with pytest.raises(ValueError, match="non-existent page"):
+        Page(None, [Link("Go", url)]).verify_content(server)
+
+
+def test_fragments_do_not_hide_missing_pages():
+    server = make_server()
+    with pytest.raises(ValueError, match="non-existent page `/missing#top`"):
+        Page(None, [Link("Missing", "missing#top")]).verify_content(server)
+
+
+def test_content_is_type_checked_once_more_before_rendering():
+    server = make_server()
+    page = Page(None, ["Fine"])
+    page.content.append(5)
+    with pytest.raises(ValueError, match="Found int at index 1"):
+        page.verify_content(server)
+
+
+def test_route_graph_reports_dangling_targets():
+    server = make_server()
+
+    @route(server=server)
+    def third(state) -> Page:
+        return Page(state, [
+            Button("Back", "index"),
+            Link("Second", "second"),
+            Div(Link("Broken", "does_not_exist")),
+            Image("https://example.com/image.png"),
+            Image("no_such_image.png"),
+        ])
+
+    server.setup(None)
+    assert server.route_graph["/third"] == {"/", "/second", "/does_not_exist",
+                                           "https://example.com/image.png", "no_such_image.png"}
+    warnings = server.verify_route_graph()
+    assert len(warnings) == 2
+    assert "non-existent page `/does_not_exist`" in warnings[0]
+    assert "`no_such_image.png` that could not be found" in warnings[1]
+
+
+
+def test_route_graph_targets_are_not_checked_again():
+    server = make_server()
+
+    @route(server=server)
+    def third(state) -> Page:
+        return Page(state, [Link("Second", "second")])
+
+    server.setup(None)
+    server._url_problems.clear()
+    assert server.check_url("/second") == ""
+    assert server._url_problems.misses == 0 and len(server._url_problems) == 0
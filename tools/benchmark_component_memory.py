@@ -0,0 +1,45 @@
+"""
+Measures how much memory it takes to build a page with many components.
+
+Run from the repository root:
+
+    python tools/benchmark_component_memory.py --count 50000
+"""
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from drafter import Page, Text, LineBreak, Argument, Button, Span, Header, TextBox
+
+
+def build_page(count):
+    kinds = [
+        lambda i: Text(f"Item {i}"),
+        lambda i: LineBreak(),
+        lambda i: Argument("item", i),
+        lambda i: Span(f"Cell {i}"),
+        lambda i: Header(f"Heading {i}", 2),
+        lambda i: TextBox(f"box_{i}", i),
+        lambda i: Button(f"Button {i}", "index"),
+        lambda i: Text(f"Styled {i}", style_color="red"),
+    ]
+    return Page(None, [kinds[i % len(kinds)](i) for i in range(count)])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the memory used by page components")
+    parser.add_argument("--count", type=int, default=50_000, help="Number of components on the page")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    page = build_page(args.count)
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    used = after - before
+    print(f"{args.count} components: {used / 1024 / 1024:.2f} MiB "
+          f"({used / args.count:.0f} bytes per component, peak {peak / 1024 / 1024:.2f} MiB)")
@@ -0,0 +1,70 @@
+"""
+Measures how long it takes to turn a submitted form into the parameters of a route, for a page with
+many buttons (each with its own arguments) and many text boxes.
+
+Run from the repository root:
+
+    python tools/benchmark_parameters.py --buttons 500 --boxes 200
+"""
+import argparse
+import io
+import json
+import re
+import sys
+import timeit
+from html import unescape
+from pathlib import Path
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from drafter import Page, Argument, Button, TextBox
+from drafter.configuration import ServerConfiguration
+from drafter.constants import SUBMIT_BUTTON_KEY
+from drafter.history import get_params, remap_hidden_form_parameters
+from drafter.setup import request
+
+INPUT_PATTERN = re.compile(r"<input[^>]*name='([^']*)'[^>]*value='([^']*)'")
+
+
+def build_form_body(buttons, boxes):
+    page = Page(None, [
+        *[TextBox(f"box_{i}", f"Value {i}") for i in range(boxes)],
+        *[Button(f"Choose {i}", "index", [Argument("item", i), Argument("label", f"Item {i}"),
+                                          Argument("selected", i % 2 == 0)])
+          for i in range(buttons)],
+    ])
+    content = page.render_content(None, ServerConfiguration())
+    fields = [(unescape(name), unescape(value)) for name, value in INPUT_PATTERN.findall(content)]
+    fields.append((SUBMIT_BUTTON_KEY, f'"Choose {buttons // 2}"'))
+    return urlencode(fields).encode('utf-8'), len(fields)
+
+
+def handle_request(body):
+    request.bind({
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'QUERY_STRING': '',
+    })
+    # The server reads the parameters once to restore the state, and once to prepare the arguments
+    get_params()
+    params = get_params()
+    button_pressed = json.loads(params[SUBMIT_BUTTON_KEY])
+    kwargs = {key: value for key, value in params.items() if key != SUBMIT_BUTTON_KEY}
+    return remap_hidden_form_parameters(kwargs, button_pressed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the parsing of submitted form parameters")
+    parser.add_argument("--buttons", type=int, default=500, help="Number of buttons with arguments on the page")
+    parser.add_argument("--boxes", type=int, default=200, help="Number of text boxes on the page")
+    parser.add_argument("--repeat", type=int, default=50, help="Number of requests to time")
+    args = parser.parse_args()
+
+    body, field_count = build_form_body(args.buttons, args.boxes)
+    parameters = handle_request(body)
+    elapsed = timeit.timeit(lambda: handle_request(body), number=args.repeat)
+    print(f"{field_count} fields ({len(body) / 1024:.0f} KiB), {len(parameters)} parameters: "
+          f"{elapsed / args.repeat * 1000:.2f} ms per request")
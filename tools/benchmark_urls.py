@@ -0,0 +1,45 @@
+"""
+Measures how long it takes to build the URLs of buttons and links, on a page with many of them,
+and to clean up the URL of each incoming request.
+
+Run from the repository root:
+
+    python tools/benchmark_urls.py --buttons 2000
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from drafter import Page, Button, Link
+from drafter.configuration import ServerConfiguration
+from drafter.constants import RESTORABLE_STATE_KEY, SUBMIT_BUTTON_KEY
+from drafter.urls import remove_url_query_params
+
+
+def build_page(count):
+    return Page(None, [
+        Button(f"Edit {i % 50}", "edit_item") if i % 2 else Link(f"View {i % 50}", "view_item")
+        for i in range(count)
+    ])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the construction of button and link URLs")
+    parser.add_argument("--buttons", type=int, default=2000, help="Number of buttons and links on the page")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of times to time each task")
+    args = parser.parse_args()
+
+    page = build_page(args.buttons)
+    configuration = ServerConfiguration()
+    elapsed = timeit.timeit(lambda: page.render_content(None, configuration), number=args.repeat)
+    print(f"Rendering {args.buttons} buttons and links: {elapsed / args.repeat * 1000:.2f} ms per page")
+
+    request_urls = ["http://localhost:8080/edit_item", "http://localhost:8080/",
+                    f"http://localhost:8080/view_item?{SUBMIT_BUTTON_KEY}=%22View+3%22"]
+    removed = {RESTORABLE_STATE_KEY, SUBMIT_BUTTON_KEY}
+    count = 10_000
+    elapsed = timeit.timeit(lambda: [remove_url_query_params(url, removed) for url in request_urls], number=count)
+    print(f"Cleaning request URLs: {elapsed / (count * len(request_urls)) * 1_000_000:.2f} µs per URL")